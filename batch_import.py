@@ -0,0 +1,186 @@
+# batch_import.py
+"""
+Headless Massen-Import archivierter PDFs (z. B. Jahresend-Nachträge).
+
+Beispiele:
+    python batch_import.py archiv/2024
+    python batch_import.py "archiv/2024/*.pdf" --workers 6 --txn-rows 50000
+
+Worker-Prozesse parsen die Dateien parallel; nur der Hauptprozess schreibt
+(Single Writer, ein BulkWriter über den ganzen Lauf) und sammelt die Zeilen
+mehrerer Dateien in grossen Transaktionen.
+Bereits importierte Dateien (gleicher SHA-256 in import_runs) werden übersprungen,
+ein abgebrochener Lauf kann also einfach neu gestartet werden.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from utils.extractor import extract_table_rows_with_article
+from utils.parser import parse_pdf_to_dataframe_dynamic_layout
+from utils.importer import (
+    ALLOWED_COLS, NATURAL_KEY_PDF, BulkWriter, ImportResult, add_natural_key, dataframe_to_records,
+)
+from utils.logger import log_stage
+from utils.upload_store import sha256_file, imported_hashes, record_import_run
+
+def finde_pdfs(muster: list[str]) -> list[Path]:
+    """Verzeichnisse (rekursiv) und Glob-Muster zu einer sortierten PDF-Liste auflösen."""
+    dateien = set()
+    for m in muster:
+        p = Path(m)
+        if p.is_dir():
+            dateien.update(p.rglob("*.pdf"))
+            dateien.update(p.rglob("*.PDF"))
+        else:
+            dateien.update(Path(x) for x in glob.glob(m, recursive=True) if x.lower().endswith(".pdf"))
+    return sorted(dateien)
+
+def parse_datei(pfad: str, sha256: str):
+    """Worker: PDF extrahieren und parsen, Ergebnis als SQLite-taugliche Tupel zurückgeben."""
+    start = time.perf_counter()
+    rows = extract_table_rows_with_article(pfad, workers=1)
+    parsed_df = parse_pdf_to_dataframe_dynamic_layout(rows, keep_tokens=False)
+    if parsed_df.empty:
+        records = []
+    else:
+        _, records = dataframe_to_records(add_natural_key(parsed_df, NATURAL_KEY_PDF), ALLOWED_COLS)
+    return pfad, sha256, records, time.perf_counter() - start
+
+def batch_import(muster: list[str], workers: int, txn_rows: int, force: bool = False) -> list[dict]:
+    dateien = finde_pdfs(muster)
+    if not dateien:
+        print("❗ Keine PDF-Dateien gefunden.")
+        return []
+
+    # Ein Writer für den ganzen Lauf: Artikel-Cache über alle Dateien, Zeilen/s und
+    # Stichtag-Ergänzung beim Schliessen wie bei jedem anderen Import
+    try:
+        with BulkWriter(ALLOWED_COLS, atomic=True, label="Batch-Import") as writer:
+            return _schreibe_dateien(writer, dateien, workers, txn_rows, force)
+    except KeyboardInterrupt:
+        print("⏹️ Abgebrochen – nicht committete Dateien werden beim nächsten Lauf erneut importiert.")
+        raise
+
+def _schreibe_dateien(writer: BulkWriter, dateien: list[Path], workers: int, txn_rows: int, force: bool) -> list[dict]:
+    conn = writer.conn
+    erledigt = set() if force else imported_hashes(conn)
+
+    summary = []
+    offen = []
+    for pfad in dateien:
+        sha256 = sha256_file(str(pfad))
+        if sha256 in erledigt:
+            summary.append({"datei": str(pfad), "status": "übersprungen", "zeilen": 0})
+            continue
+        erledigt.add(sha256)  # Duplikate innerhalb des Laufs nur einmal importieren
+        offen.append((str(pfad), sha256))
+
+    total = len(offen)
+    print(f"📂 {len(dateien)} Dateien gefunden, {total} zu importieren, {len(dateien) - total} übersprungen.")
+    log_stage("document", "📂 Batch-Import: %d Dateien, %d zu importieren", len(dateien), total)
+
+    # Puffer der aktuellen Transaktion: Dateien werden erst nach dem Commit als 'ok' gezählt
+    txn_dateien = []
+    txn_zeilen = 0
+    fertig = 0
+    geschrieben = 0
+    gestartet = time.perf_counter()
+
+    def commit():
+        nonlocal txn_dateien, txn_zeilen, geschrieben
+        if not txn_dateien:
+            return
+        writer.commit()
+        for eintrag in txn_dateien:
+            summary.append(eintrag)
+        geschrieben += txn_zeilen
+        log_stage(
+            "document", "💾 Batch-Commit: %d Dateien, %d Zeilen (%.0f Zeilen/s)",
+            len(txn_dateien), txn_zeilen, geschrieben / max(time.perf_counter() - gestartet, 1e-9)
+        )
+        txn_dateien, txn_zeilen = [], 0
+
+    def lauf_eintragen(pfad, sha256, status, anzahl=None):
+        # import_runs in derselben Transaktion wie die Zeilen → nach Abbruch ist der Stand konsistent
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        record_import_run(conn, sha256, os.path.basename(pfad), status, anzahl, forced=force)
+
+    def schreiben(future, pfad, sha256):
+        nonlocal txn_zeilen, fertig
+        fertig += 1
+        try:
+            _, _, records, dauer = future.result()
+        except Exception as e:
+            lauf_eintragen(pfad, sha256, "error")
+            txn_dateien.append({"datei": pfad, "status": "fehler", "zeilen": 0, "meldung": str(e)})
+            print(f"[{fertig}/{total}] ❌ {pfad}: {e}")
+            return
+        vorher = writer.result
+        writer.write(records)
+        result = ImportResult(*(a - b for a, b in zip(writer.flush(), vorher)))
+        anzahl = result.rows
+        lauf_eintragen(pfad, sha256, "ok", anzahl)
+        txn_dateien.append({"datei": pfad, "status": "ok", "zeilen": anzahl, **result._asdict()})
+        txn_zeilen += anzahl
+        rate = fertig / max(time.perf_counter() - gestartet, 1e-9)
+        print(
+            f"[{fertig}/{total}] ✅ {pfad}: {anzahl} Zeilen, {result.inserted} neu, {result.updated} aktualisiert "
+            f"({dauer:.1f}s, {rate:.2f} Dateien/s)"
+        )
+        if txn_zeilen >= txn_rows:
+            commit()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        warteschlange = iter(offen)
+        pending = {}
+        while True:
+            # Begrenzter Vorlauf, damit geparste Ergebnisse nicht unbegrenzt im Speicher warten
+            for pfad, sha256 in warteschlange:
+                pending[pool.submit(parse_datei, pfad, sha256)] = (pfad, sha256)
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            # In Fertigstellungs-Reihenfolge schreiben: eine langsame (OCR-)Datei hält die
+            # übrigen nicht auf; natural_key macht die Reihenfolge der Writes egal
+            fertige, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in fertige:
+                schreiben(future, *pending.pop(future))
+    commit()
+    return summary
+
+def drucke_summary(summary: list[dict]):
+    print("\n📋 Zusammenfassung")
+    for eintrag in summary:
+        meldung = f"  ({eintrag['meldung']})" if eintrag.get("meldung") else ""
+        print(f"  {eintrag['status']:<14} {eintrag['zeilen']:>8}  {eintrag['datei']}{meldung}")
+    ok = [e for e in summary if e["status"] == "ok"]
+    fehler = [e for e in summary if e["status"] == "fehler"]
+    print(
+        f"\n✅ {len(ok)} importiert ({sum(e['zeilen'] for e in ok)} Zeilen: "
+        f"{sum(e['inserted'] for e in ok)} neu, {sum(e['updated'] for e in ok)} aktualisiert, "
+        f"{sum(e['skipped'] for e in ok)} unverändert), "
+        f"⏭️ {sum(e['status'] == 'übersprungen' for e in summary)} übersprungen, ❌ {len(fehler)} Fehler"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Massen-Import von PDF-Berichten in bewegungen.")
+    parser.add_argument("pfade", nargs="+", help="Verzeichnis(se) oder Glob-Muster, z. B. 'archiv/*.pdf'")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Anzahl Parser-Prozesse")
+    parser.add_argument("--txn-rows", type=int, default=20000, help="Zeilen pro Schreib-Transaktion")
+    parser.add_argument("--force", action="store_true", help="Auch bereits importierte Dateien erneut importieren")
+    args = parser.parse_args()
+
+    summary = batch_import(args.pfade, max(1, args.workers), max(1, args.txn_rows), args.force)
+    drucke_summary(summary)
+    if any(e["status"] == "fehler" for e in summary):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
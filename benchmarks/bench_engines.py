@@ -0,0 +1,116 @@
+# benchmarks/bench_engines.py
+"""
+Vergleich der Extraktions-Engines (utils/engines.py) auf einem PDF-Korpus.
+
+Pro Engine und Berichtstyp (Layout): Durchsatz, gefundene Zeilen und Anteil
+dirty-Zeilen. Am Ende wird pro Berichtstyp die schnellste Engine empfohlen,
+deren dirty-Rate unter --max-dirty liegt.
+
+    python -m benchmarks.bench_engines                          # synthetische Berichte (Layout a + b)
+    python -m benchmarks.bench_engines archiv/2024 --repeat 1   # echter Korpus
+    python -m benchmarks.bench_engines archiv --engines blocks words
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+# Vor den utils-Imports: ohne Token-Tracing, Seiten-Cache und OCR messen
+_TMP = tempfile.mkdtemp(prefix="drugs_bot_engines_")
+os.environ.setdefault("LOG_PATH", os.path.join(_TMP, "bench.log"))
+os.environ.setdefault("LOG_TOKEN_TRACE", "0")
+os.environ.setdefault("LOG_LEVEL_ROW", "OFF")
+os.environ["PAGE_CACHE"] = "0"
+os.environ["OCR"] = "0"
+
+import fitz  # noqa: E402
+from batch_import import finde_pdfs  # noqa: E402
+from benchmarks.synthetic_pdf import generate_report  # noqa: E402
+from utils.engines import engine_names  # noqa: E402
+from utils.extractor import extract_table_rows_with_article  # noqa: E402
+from utils.parser import parse_pdf_to_dataframe_dynamic_layout  # noqa: E402
+
+def run_engine(pdf_path: str, engine: str, repeat: int) -> dict:
+    """Bestzeit über repeat Durchläufe (sequentiell, ohne Cache) + Zeilen/dirty je Layout."""
+    best = float("inf")
+    rows = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        rows = extract_table_rows_with_article(pdf_path, workers=1, use_cache=False, engine=engine)
+        best = min(best, time.perf_counter() - t)
+
+    per_layout = defaultdict(lambda: {"rows": 0, "dirty": 0})
+    if rows:
+        parsed_df = parse_pdf_to_dataframe_dynamic_layout(rows)
+        for layout, gruppe in parsed_df.groupby("liste"):
+            per_layout[layout]["rows"] = len(gruppe)
+            per_layout[layout]["dirty"] = int(gruppe["dirty"].sum())
+    return {"seconds": best, "layouts": dict(per_layout)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Extraktions-Engines vergleichen.")
+    parser.add_argument("pfade", nargs="*", help="PDF-Verzeichnisse/Glob-Muster (leer = synthetische Berichte)")
+    parser.add_argument("--engines", nargs="+", default=engine_names(), choices=engine_names())
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=50, help="Seiten pro synthetischem Bericht")
+    parser.add_argument("--max-dirty", type=float, default=0.01, help="höchste akzeptierte dirty-Rate für die Empfehlung")
+    args = parser.parse_args()
+
+    if args.pfade:
+        dateien = [str(p) for p in finde_pdfs(args.pfade)]
+    else:
+        dateien = []
+        for layout in ("a", "b"):
+            pfad = os.path.join(_TMP, f"synth_{layout}.pdf")
+            generate_report(pfad, layout, args.pages)
+            dateien.append(pfad)
+    if not dateien:
+        print("❗ Keine PDF-Dateien gefunden.")
+        return
+
+    seiten = 0
+    for pfad in dateien:
+        with fitz.open(pfad) as doc:
+            seiten += doc.page_count
+
+    # summen[engine][layout] = {"seconds", "rows", "dirty"}; Zeit anteilig nach Zeilen je Layout
+    summen = defaultdict(lambda: defaultdict(lambda: {"seconds": 0.0, "rows": 0, "dirty": 0}))
+    gesamtzeit = defaultdict(float)
+    for engine in args.engines:
+        for pfad in dateien:
+            result = run_engine(pfad, engine, args.repeat)
+            gesamtzeit[engine] += result["seconds"]
+            zeilen = sum(v["rows"] for v in result["layouts"].values()) or 1
+            for layout, werte in result["layouts"].items():
+                s = summen[engine][layout]
+                s["seconds"] += result["seconds"] * werte["rows"] / zeilen
+                s["rows"] += werte["rows"]
+                s["dirty"] += werte["dirty"]
+
+    print(f"\n📂 {len(dateien)} Dateien, {seiten} Seiten, {args.repeat}× pro Engine (Bestzeit)")
+    print(f"\n{'Engine':<8} {'Layout':<7} {'Zeilen':>8} {'Zeilen/s':>10} {'dirty':>7} {'dirty %':>8}")
+    for engine in args.engines:
+        for layout in sorted(summen[engine]):
+            s = summen[engine][layout]
+            rate = s["rows"] / s["seconds"] if s["seconds"] else 0
+            anteil = s["dirty"] / s["rows"] * 100 if s["rows"] else 0
+            print(f"{engine:<8} {layout:<7} {s['rows']:>8} {rate:>10.0f} {s['dirty']:>7} {anteil:>7.1f}%")
+        print(f"{engine:<8} {'gesamt':<7} {'':>8} {seiten / gesamtzeit[engine] if gesamtzeit[engine] else 0:>10.1f} Seiten/s")
+
+    print("\n🏁 Empfehlung pro Berichtstyp (dirty ≤ {:.1f} %):".format(args.max_dirty * 100))
+    layouts = sorted({layout for engine in args.engines for layout in summen[engine]})
+    for layout in layouts:
+        kandidaten = []
+        for engine in args.engines:
+            s = summen[engine].get(layout)
+            if s and s["rows"] and s["dirty"] / s["rows"] <= args.max_dirty:
+                kandidaten.append((s["rows"] / s["seconds"] if s["seconds"] else 0, engine))
+        if kandidaten:
+            rate, engine = max(kandidaten)
+            print(f"  Layout {layout}: {engine} ({rate:.0f} Zeilen/s)")
+        else:
+            print(f"  Layout {layout}: keine Engine unter der dirty-Schwelle")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmark der Import-Pipeline auf synthetischen Berichten.
+
+Misst jede Stufe einzeln (extract → tokenize → parse → insert), gibt Zeilen/s
+und Peak-Speicher aus und vergleicht mit einer gespeicherten Baseline.
+
+    python -m benchmarks.bench_pipeline                   # messen + mit Baseline vergleichen
+    python -m benchmarks.bench_pipeline --save-baseline   # Baseline neu schreiben
+    python -m benchmarks.bench_pipeline --pages 200 --rows 40 --repeat 5
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Vor den utils-Imports: Benchmark-Umgebung ohne Token-Tracing, Seiten-Cache und echte DB
+_TMP = tempfile.mkdtemp(prefix="drugs_bot_bench_")
+os.environ.setdefault("LOG_PATH", os.path.join(_TMP, "bench.log"))
+os.environ.setdefault("LOG_TOKEN_TRACE", "0")
+os.environ.setdefault("LOG_LEVEL_ROW", "OFF")
+os.environ["PAGE_CACHE"] = "0"
+os.environ["DB_PATH"] = os.path.join(_TMP, "bench.db")
+
+import fitz  # noqa: E402
+from benchmarks.synthetic_pdf import generate_report  # noqa: E402
+from utils.rows import rows_from_page_text  # noqa: E402
+from utils.lieferanten import get_lieferanten_matcher  # noqa: E402
+from utils.parser import parse_pdf_to_dataframe_dynamic_layout  # noqa: E402
+from utils.db import DB_PATH  # noqa: E402
+from utils.importer import run_import  # noqa: E402
+from utils.migrations import migrate  # noqa: E402
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+STAGES = ("extract", "tokenize", "parse", "insert")
+
+def _reset_db():
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(DB_PATH + suffix)
+        except FileNotFoundError:
+            pass
+    # Wegwerf-DB mit dem echten Schema (inkl. Indizes) anlegen
+    conn = sqlite3.connect(DB_PATH)
+    migrate(conn)
+    conn.close()
+
+def stage_extract(pdf_path: str):
+    pages = []
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            pages.append((page.get_text("text"), [block[4] for block in page.get_text("blocks")]))
+    return pages
+
+def stage_tokenize(pages):
+    lieferanten = get_lieferanten_matcher()
+    rows = []
+    for text, block_texts in pages:
+        rows.extend(rows_from_page_text(text, block_texts, lieferanten))
+    return rows
+
+def stage_parse(rows):
+    return parse_pdf_to_dataframe_dynamic_layout(rows)
+
+def stage_insert(parsed_df):
+    return run_import(parsed_df).inserted
+
+def run_pipeline(pdf_path: str, repeat: int, memory: bool) -> dict:
+    """Bestzeit über repeat Durchläufe pro Stufe, optional Peak-Speicher (tracemalloc)."""
+    best = {stage: float("inf") for stage in STAGES}
+    counts = {}
+    for _ in range(repeat):
+        t = time.perf_counter()
+        pages = stage_extract(pdf_path)
+        best["extract"] = min(best["extract"], time.perf_counter() - t)
+
+        t = time.perf_counter()
+        rows = stage_tokenize(pages)
+        best["tokenize"] = min(best["tokenize"], time.perf_counter() - t)
+
+        t = time.perf_counter()
+        parsed_df = stage_parse(rows)
+        best["parse"] = min(best["parse"], time.perf_counter() - t)
+
+        _reset_db()
+        t = time.perf_counter()
+        inserted = stage_insert(parsed_df)
+        best["insert"] = min(best["insert"], time.perf_counter() - t)
+
+        counts = {
+            "pages": len(pages),
+            "rows": len(rows),
+            "parsed": len(parsed_df),
+            "inserted": inserted,
+            "dirty": int(parsed_df["dirty"].sum()) if "dirty" in parsed_df else 0,
+        }
+
+    peaks = {}
+    if memory:
+        tracemalloc.start()
+        data = pdf_path
+        for stage, func in zip(STAGES, (stage_extract, stage_tokenize, stage_parse, stage_insert)):
+            if stage == "insert":
+                _reset_db()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            data = func(data)
+            peaks[stage] = (tracemalloc.get_traced_memory()[1] - base) / (1024 * 1024)
+        tracemalloc.stop()
+
+    result = {}
+    for stage in STAGES:
+        seconds = best[stage]
+        result[stage] = {
+            "seconds": round(seconds, 4),
+            "rows_per_s": round(counts["rows"] / seconds, 1) if seconds > 0 else None,
+        }
+        if stage in peaks:
+            result[stage]["peak_mb"] = round(peaks[stage], 2)
+    result["counts"] = counts
+    return result
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressionen: weniger Zeilen/s als Baseline × (1 - tolerance) oder abweichende Zeilenzahlen."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        if result["counts"] != base["counts"]:
+            regressions.append(f"{name}: Zählwerte {result['counts']} ≠ Baseline {base['counts']}")
+        for stage in STAGES:
+            now, before = result[stage]["rows_per_s"], base[stage]["rows_per_s"]
+            if now and before and now < before * (1 - tolerance):
+                regressions.append(f"{name}/{stage}: {now:.0f} Zeilen/s < Baseline {before:.0f} (−{(1 - now / before) * 100:.0f} %)")
+    return regressions
+
+def print_results(results: dict, baseline: dict | None):
+    print(f"\n{'Bericht':<10} {'Stufe':<9} {'Sekunden':>9} {'Zeilen/s':>11} {'Peak MB':>8} {'Δ Baseline':>11}")
+    for name, result in results.items():
+        base = (baseline or {}).get("results", {}).get(name, {})
+        for stage in STAGES:
+            r = result[stage]
+            delta = ""
+            if base.get(stage, {}).get("rows_per_s") and r["rows_per_s"]:
+                delta = f"{(r['rows_per_s'] / base[stage]['rows_per_s'] - 1) * 100:+.0f} %"
+            peak = f"{r['peak_mb']:.1f}" if "peak_mb" in r else "-"
+            print(f"{name:<10} {stage:<9} {r['seconds']:>9.3f} {r['rows_per_s'] or 0:>11.0f} {peak:>8} {delta:>11}")
+        c = result["counts"]
+        print(f"{name:<10} → {c['pages']} Seiten, {c['rows']} Zeilen, {c['dirty']} dirty")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extract/tokenize/parse/insert.")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=40, help="Zeilen pro Seite")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="Peak-Speicher nicht messen")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="erlaubte Verlangsamung (Anteil)")
+    args = parser.parse_args()
+
+    results = {}
+    for layout in ("a", "b"):
+        pdf_path = os.path.join(_TMP, f"synth_{layout}.pdf")
+        generate_report(pdf_path, layout, args.pages, args.rows)
+        results[f"layout_{layout}"] = run_pipeline(pdf_path, args.repeat, not args.no_memory)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != {"pages": args.pages, "rows": args.rows}:
+            print("ℹ️ Baseline mit anderer Konfiguration – kein Vergleich.")
+            baseline = None
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"config": {"pages": args.pages, "rows": args.rows}, "results": results}, f, indent=2)
+        print(f"\n💾 Baseline gespeichert: {args.baseline}")
+        return
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressionen:")
+            for r in regressions:
+                print(f"  {r}")
+            sys.exit(1)
+        print("\n✅ Keine Regression gegenüber der Baseline.")
+
+if __name__ == "__main__":
+    main()
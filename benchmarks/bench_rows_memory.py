@@ -0,0 +1,113 @@
+# benchmarks/bench_rows_memory.py
+"""
+Speicherbedarf der Extraktor-Zeilen: kompakte BewegungsZeile (NamedTuple,
+geteiltes ArtikelMeta pro Seite) gegenüber dem früheren Format
+(row_dict + meta-Dict + Token-Liste pro Zeile), sowie das geparste DataFrame
+mit und ohne Roh-Tokens.
+
+    python -m benchmarks.bench_rows_memory                 # 2500 Seiten × 40 = 100k Zeilen
+    python -m benchmarks.bench_rows_memory --pages 250
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_TMP = tempfile.mkdtemp(prefix="drugs_bot_rows_")
+os.environ.setdefault("LOG_PATH", os.path.join(_TMP, "bench.log"))
+os.environ.setdefault("LOG_TOKEN_TRACE", "0")
+os.environ.setdefault("LOG_LEVEL_ROW", "OFF")
+os.environ["PAGE_CACHE"] = "0"
+
+from benchmarks.synthetic_pdf import generate_report  # noqa: E402
+from utils.extractor import extract_table_rows_with_article  # noqa: E402
+from utils.parser import parse_pdf_to_dataframe_dynamic_layout  # noqa: E402
+
+def legacy_rows(rows) -> list:
+    """Früheres Extraktor-Format nachbauen: (row_dict, meta, layout, dirty) pro Zeile."""
+    legacy = []
+    for r in rows:
+        meta = {
+            "artikel_bezeichnung": r.artikel.artikel_bezeichnung,
+            "belegnummer": r.artikel.belegnummer,
+            "packungsgroesse": r.artikel.packungsgroesse,
+        }
+        row_dict = {
+            "lfdnr": r.lfdnr, "datum": r.datum, "name": r.name, "vorname": r.vorname,
+            "lieferant": r.lieferant, "ein_mge": r.ein_mge, "aus_mge": r.aus_mge,
+            "ein_pack": r.ein_pack, "aus_pack": r.aus_pack, "bg_rez_nr": r.bg_rez_nr,
+            "artikel_bezeichnung": r.artikel.artikel_bezeichnung, "belegnummer": r.artikel.belegnummer,
+            "tokens": list(r.tokens), "liste": r.liste, "dirty": r.dirty, "quelle": r.quelle,
+        }
+        legacy.append((row_dict, meta, r.liste, bool(r.dirty)))
+    return legacy
+
+def container_bytes(rows) -> int:
+    """Objekt-Overhead der Zeilen ohne die (in beiden Formaten geteilten) Strings und Zahlen."""
+    gesehen = set()
+    total = 0
+
+    def add(obj):
+        nonlocal total
+        if id(obj) not in gesehen:
+            gesehen.add(id(obj))
+            total += sys.getsizeof(obj)
+
+    add(rows)
+    for row in rows:
+        add(row)
+        for teil in row:
+            if isinstance(teil, (dict, list, tuple)):
+                add(teil)
+                if isinstance(teil, dict) and "tokens" in teil:
+                    add(teil["tokens"])
+    return total
+
+def value_bytes(rows) -> int:
+    """Gemeinsamer Anteil: alle unterschiedlichen Strings in den Zeilen."""
+    gesehen = {}
+    for row in rows:
+        for wert in (*row[:10], *row.tokens, row.artikel.artikel_bezeichnung, row.artikel.belegnummer, row.liste):
+            if isinstance(wert, str):
+                gesehen[id(wert)] = sys.getsizeof(wert)
+    return sum(gesehen.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Speicher der Zeilen-Records messen.")
+    parser.add_argument("--pages", type=int, default=2500)
+    parser.add_argument("--rows", type=int, default=40, help="Zeilen pro Seite")
+    parser.add_argument("--engine", default="blocks")
+    args = parser.parse_args()
+
+    pdf_path = os.path.join(_TMP, "synth_a.pdf")
+    generate_report(pdf_path, "a", args.pages, args.rows)
+
+    t = time.perf_counter()
+    rows = extract_table_rows_with_article(pdf_path, workers=1, use_cache=False, engine=args.engine)
+    dauer = time.perf_counter() - t
+
+    strings = value_bytes(rows)
+    kompakt = container_bytes(rows) + strings
+    alt = container_bytes(legacy_rows(rows)) + strings
+
+    df_tokens = parse_pdf_to_dataframe_dynamic_layout(rows, keep_tokens=True)
+    df_ohne = parse_pdf_to_dataframe_dynamic_layout(rows, keep_tokens=False)
+    df_mit = df_tokens.memory_usage(deep=True).sum()
+    df_ohne = df_ohne.memory_usage(deep=True).sum()
+
+    n = len(rows)
+    mb = 1024 * 1024
+    print(f"\n📄 {args.pages} Seiten, {n} Zeilen, Extraktion {dauer:.1f}s ({args.engine})")
+    print(f"{'Format':<30} {'MB':>8} {'Bytes/Zeile':>12}")
+    for name, wert in (
+        ("row_dict + meta (alt)", alt),
+        ("BewegungsZeile (kompakt)", kompakt),
+        ("DataFrame mit tokens", df_mit),
+        ("DataFrame ohne tokens", df_ohne),
+    ):
+        print(f"{name:<30} {wert / mb:>8.1f} {wert / n:>12.0f}")
+    print(f"\n💾 Zeilen: −{(1 - kompakt / alt) * 100:.0f} %, DataFrame: −{(1 - df_ohne / df_mit) * 100:.0f} %")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/synthetic_pdf.py
+"""
+Erzeugt synthetische BTM-Berichte mit PyMuPDF.
+
+Layout A: Kopfzeile mit "BG Rez.Nr." (12 Slots inkl. Abh)
+Layout B: ohne BG Rez.Nr. (11 Slots)
+
+Beispiel:
+    python -m benchmarks.synthetic_pdf upload/synth_a.pdf --layout a --pages 200 --rows 40
+"""
+import argparse
+import random
+import fitz
+
+NAMEN = ["Muster", "Meier", "Keller", "Brunner", "Baumann", "Frei", "Huber", "Schmid", "Gerber", "Widmer"]
+VORNAMEN = ["Hans", "Anna", "Peter", "Ursula", "Marco", "Sandra", "Beat", "Ruth", "Daniel", "Monika"]
+LIEFERANTEN = ["VOIGT", "Mepha", "Axapharm", "Hänseler", "BENU"]
+ARTIKEL = [
+    ("Morphin HCl Tabl 10 mg", 30),
+    ("Methadon Streuli Tabl 5 mg", 20),
+    ("Oxycodon Mepha Ret Tabl 20 mg", 60),
+    ("Fentanyl Sandoz Matrixpfl 25 mcg/h", 5),
+    ("Ritalin Tabl 10 mg", 30),
+]
+
+# x-Positionen der Spalten (pt, A4 quer)
+SPALTEN_X = [30, 80, 150, 200, 300, 390, 470, 530, 580, 630, 700, 780]
+KOPF_A = ["LfdNr", "Datum", "KdNr", "Name", "Vorname", "Arzt", "Zusatz", "Ein", "Aus", "Lager", "BG Rez.Nr.", "Abh"]
+KOPF_B = ["LfdNr", "Datum", "KdNr", "Name", "Vorname", "Arzt", "Zusatz", "Ein", "Aus", "Lager", "Bemerkung"]
+
+ZEILEN_ABSTAND = 11
+SEITEN_GROESSE = (842, 595)
+
+def _zeile(rnd: random.Random, lfdnr: int, layout: str) -> list[str]:
+    lieferant = rnd.random() < 0.15
+    menge = str(rnd.randint(1, 12))
+    datum = f"{rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}.2024"
+    lager = str(rnd.randint(0, 400))
+    if lieferant:
+        zellen = [str(lfdnr), datum, "", rnd.choice(LIEFERANTEN), "", "", "", menge, "", lager]
+    else:
+        zellen = [
+            str(lfdnr), datum, str(rnd.randint(100, 99999)),
+            rnd.choice(NAMEN), rnd.choice(VORNAMEN), f"Z{rnd.randint(100000, 999999)}", "",
+            "", menge, lager,
+        ]
+    if layout == "a":
+        zellen += ["" if lieferant else str(rnd.randint(10000000, 99999999)), ""]
+    else:
+        zellen += [""]
+    return zellen
+
+def generate_report(path: str, layout: str = "a", pages: int = 10, rows_per_page: int = 40, seed: int = 42,
+                    kopf_nur_erste_seite: bool = False) -> int:
+    """
+    Schreibt einen Bericht und gibt die Anzahl erzeugter Bewegungszeilen zurück.
+    kopf_nur_erste_seite: Spaltenkopf wie in echten Berichten nur auf Seite 1.
+    """
+    rnd = random.Random(seed)
+    kopf = KOPF_A if layout == "a" else KOPF_B
+    doc = fitz.open()
+    font = fitz.Font("helv")
+    lfdnr = 10000
+    for page_no in range(pages):
+        page = doc.new_page(width=SEITEN_GROESSE[0], height=SEITEN_GROESSE[1])
+        # Ein TextWriter pro Seite: einzelne insert_text-Aufrufe sind bei grossen Berichten zu langsam
+        writer = fitz.TextWriter(page.rect)
+        artikel, packung = ARTIKEL[(page_no // 3) % len(ARTIKEL)]
+        belegnummer = 1000000 + (page_no // 3)
+        writer.append((30, 30), f"Medikament: {belegnummer} {artikel} {packung} Stk", font=font, fontsize=10)
+        if page_no == 0 or not kopf_nur_erste_seite:
+            for x, titel in zip(SPALTEN_X, kopf):
+                writer.append((x, 55), titel, font=font, fontsize=8)
+        y = 72
+        for _ in range(rows_per_page):
+            for x, zelle in zip(SPALTEN_X, _zeile(rnd, lfdnr, layout)):
+                if zelle:
+                    writer.append((x, y), zelle, font=font, fontsize=8)
+            lfdnr += 1
+            y += ZEILEN_ABSTAND
+        writer.write_text(page)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return pages * rows_per_page
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetischen BTM-Bericht erzeugen.")
+    parser.add_argument("path")
+    parser.add_argument("--layout", choices=["a", "b"], default="a")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=40, help="Zeilen pro Seite")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--kopf-nur-erste-seite", action="store_true", help="Spaltenkopf nur auf Seite 1")
+    args = parser.parse_args()
+    n = generate_report(args.path, args.layout, args.pages, args.rows, args.seed, args.kopf_nur_erste_seite)
+    print(f"✅ {args.path}: Layout {args.layout}, {args.pages} Seiten, {n} Zeilen")
+
+if __name__ == "__main__":
+    main()
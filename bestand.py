@@ -0,0 +1,42 @@
+# bestand.py
+"""
+Materialisierten Bestand (Tabelle bestand) und Monatsend-Stichtage prüfen
+oder neu aufbauen.
+
+    python bestand.py             # Abweichungen gegenüber der Vollberechnung anzeigen
+    python bestand.py --rebuild   # aus allen Bewegungen neu aufbauen (inkl. Stichtage)
+"""
+import argparse
+import sys
+from utils.bestand import check_bestand, check_stichtag, rebuild_bestand
+from utils.db import DB_PATH, get_read_connection, transaction
+from utils.logger import log_import
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Materialisierten Bestand prüfen oder neu aufbauen.")
+    parser.add_argument("--rebuild", action="store_true", help="Bestand aus bewegungen neu aufbauen")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        with transaction() as conn:
+            rebuild_bestand(conn)
+            artikel = conn.execute("SELECT COUNT(*) FROM bestand").fetchone()[0]
+            stichtage = conn.execute("SELECT COUNT(DISTINCT stichtag) FROM bestand_stichtag").fetchone()[0]
+        log_import(f"🔁 Bestand neu aufgebaut: {artikel} Artikel, {stichtage} Stichtage")
+        print(f"✅ {DB_PATH}: Bestand neu aufgebaut ({artikel} Artikel, {stichtage} Stichtage)")
+        return 0
+
+    # Jede Prüfung ist eine Abfrage → Soll und Ist aus demselben WAL-Snapshot
+    conn = get_read_connection()
+    abweichungen = check_bestand(conn) + check_stichtag(conn)
+    if not abweichungen:
+        print(f"✅ {DB_PATH}: Bestand konsistent")
+        return 0
+    print(f"❗ {DB_PATH}: {len(abweichungen)} abweichende Zeilen (soll = Vollberechnung, ist = bestand/Stichtag):")
+    for zeile in abweichungen:
+        print("  " + " | ".join("" if wert is None else str(wert) for wert in zeile))
+    print("→ python bestand.py --rebuild")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,11 @@
 # import_anfangsbestand.py
 import pandas as pd
-import sqlite3
 from datetime import datetime
 from pathlib import Path
+from utils.db import DB_PATH
+from utils.importer import BulkWriter, add_natural_key, dataframe_to_records
 
 EXCEL_PATH = "upload/btm-mappe_fortlaufend (1).xlsx"
-DB_PATH = "data/laufende_liste.db"
 
 # Mapping: Excel → DB
 SPALTEN_MAPPING = {
@@ -18,6 +18,9 @@ SPALTEN_MAPPING = {
     "Name": "bemerkung"
 }
 
+# Natürlicher Schlüssel: erneuter Import derselben Mappe aktualisiert statt zu duplizieren
+NATURAL_KEY = ["quelle", "pharmacode", "datum", "artikel_bezeichnung", "bemerkung"]
+
 IGNORIERTE_ARTIKEL = [
     "Haens Opii tinctura normata PhEur 20 g"
 ]
@@ -34,8 +37,8 @@ def lade_excel(pfad):
     # Pharmacode als Integer
     df["pharmacode"] = pd.to_numeric(df["pharmacode"], errors="coerce").astype("Int64")
 
-    # Datum formatieren
-    df["datum"] = pd.to_datetime(df["datum"], errors="coerce").dt.date
+    # Datum als ISO-Text (JJJJ-MM-TT)
+    df["datum"] = pd.to_datetime(df["datum"], errors="coerce").dt.strftime("%Y-%m-%d")
 
     # Mengen und Packungen bereinigen
     df["ein_mge"] = pd.to_numeric(df["ein_mge"], errors="coerce").fillna(0).astype(int)
@@ -62,21 +65,14 @@ def lade_excel(pfad):
     ]]
 
 def speichere_in_db(df, db_path):
-    # Konvertiere alle pd.NA/nan zu None (für SQLite-kompatibel)
-    df = df.where(pd.notna(df), None)
-
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    for _, row in df.iterrows():
-        werte = tuple(None if pd.isna(val) else val for val in row.values)
-        placeholder = ",".join(["?"] * len(df.columns))
-        spalten = ",".join(df.columns)
-        sql = f"INSERT INTO bewegungen ({spalten}) VALUES ({placeholder})"
-        cursor.execute(sql, werte)
-
-    conn.commit()
-    conn.close()
+    # NA/NaN → None, numpy → Python-Typen; ein Upsert für alle Zeilen
+    df = add_natural_key(df, NATURAL_KEY)
+    spalten, records = dataframe_to_records(df, list(df.columns))
+    with BulkWriter(spalten, db_path=db_path, atomic=True, label="anfangsbestand") as writer:
+        writer.write(records)
+    result = writer.result
+    print(f"⚡ {writer.rows} Zeilen in {writer.seconds:.2f}s ({writer.rate:.0f} Zeilen/s): "
+          f"{result.inserted} neu, {result.updated} aktualisiert, {result.skipped} unverändert")
 
     # Logging
     log_path = Path("logs/import.log")
@@ -1,34 +1,33 @@
 import sys
 import pandas as pd
-import sqlite3
 import re
 from pathlib import Path
 from datetime import datetime
+from utils.importer import BulkWriter, add_natural_key, dataframe_to_records
+from utils.lieferanten import get_lieferanten_matcher
+
+# Natürlicher Schlüssel einer Lieferung: erneuter Import derselben Datei aktualisiert statt zu duplizieren
+NATURAL_KEY = ["quelle", "pharmacode", "faktura_nummer", "datum", "artikel_bezeichnung"]
 
 def extrahiere_packung(text):
     match = re.search(r"(\d+)\s*Stk", str(text))
     return int(match.group(1)) if match else None
 
 def lade_lieferanten_csv(pfad="data/lieferanten.csv"):
-    try:
-        return set(pd.read_csv(pfad)["name"].dropna().str.upper())
-    except Exception as e:
-        print(f"⚠️ Konnte Lieferantenliste nicht laden: {e}")
-        return set()
+    return get_lieferanten_matcher(pfad)
 
-def ist_lieferant(name, lieferanten_set):
+def ist_lieferant(name, lieferanten):
     if not isinstance(name, str):
         return False
-    name_upper = name.upper()
-    return any(name_upper.startswith(lieferant) for lieferant in lieferanten_set)
+    return lieferanten.hat_praefix(name)
 
 def parse_datum_jjjjmmtt(raw):
     try:
-        return datetime.strptime(str(int(raw)), "%Y%m%d").strftime("%d.%m.%Y")
+        return datetime.strptime(str(int(raw)), "%Y%m%d").date().isoformat()
     except:
         return None
 
-def importiere_excel(pfad_excel, pfad_sqlite="data/laufende_liste.db"):
+def importiere_excel(pfad_excel, pfad_sqlite=None):
     spalten_map = {
         "Menge": "ein_mge",
         "Artikelbezeichnung": "artikel_bezeichnung",
@@ -72,8 +71,8 @@ def importiere_excel(pfad_excel, pfad_sqlite="data/laufende_liste.db"):
     df["quelle"] = "excel"
 
     # Lieferantenerkennung via pharmacode (optional)
-    lieferanten_set = lade_lieferanten_csv()
-    df["lieferant"] = df["pharmacode"].apply(lambda val: val if ist_lieferant(str(val), lieferanten_set) else None)
+    lieferanten = lade_lieferanten_csv()
+    df["lieferant"] = df["pharmacode"].apply(lambda val: val if ist_lieferant(str(val), lieferanten) else None)
 
     # Zielspalten in richtiger Reihenfolge
     df = df[
@@ -83,11 +82,14 @@ def importiere_excel(pfad_excel, pfad_sqlite="data/laufende_liste.db"):
     ]
 
     # In Datenbank speichern
-    conn = sqlite3.connect(pfad_sqlite)
-    df.to_sql("bewegungen", conn, if_exists="append", index=False)
-    conn.close()
-
-    print(f"✅ {len(df)} Zeilen importiert aus: {pfad_excel.name}")
+    df = add_natural_key(df, NATURAL_KEY)
+    spalten, records = dataframe_to_records(df, list(df.columns))
+    with BulkWriter(spalten, db_path=pfad_sqlite, atomic=True, label="excel") as writer:
+        writer.write(records)
+
+    result = writer.result
+    print(f"✅ {len(df)} Zeilen importiert aus: {pfad_excel.name} ({writer.rate:.0f} Zeilen/s): "
+          f"{result.inserted} neu, {result.updated} aktualisiert, {result.skipped} unverändert")
 
     # Logging
     log_path = Path("logs/import.log")
@@ -1,16 +1,15 @@
 # import_liste_a.py
 import sys
 import pandas as pd
-import sqlite3
 from datetime import datetime
 from pathlib import Path
-from utils.helpers import ensure_views
+from utils.db import DB_PATH
+from utils.importer import add_natural_key, dataframe_to_records, merge_replace
 
-DB_PATH = "data/laufende_liste.db"
 UEBERTRAG_TEXT = "Uebertrag per 01.01.2020"
 DEBUG = True  # bei Bedarf auf False
-
-ensure_views())
+# Natürlicher Schlüssel einer Liste-a-Zeile (gleiche Zeilen werden durchnummeriert)
+NATURAL_KEY = ["quelle", "pharmacode", "faktura_nummer", "datum", "artikel_bezeichnung", "name", "vorname"]
 
 # flexibles Spalten-Mapping (Excel -> interne Namen)
 SPALTEN_MAP = {
@@ -123,7 +122,7 @@ def lade_excel_liste_a(pfad_excel: str) -> pd.DataFrame:
         if c not in df.columns:
             df[c] = None
 
-    df = df[keep_cols]
+    df = add_natural_key(df[keep_cols], NATURAL_KEY)
 
     if DEBUG:
         print("🧾 vorbereitete Zeilen (Liste a):", len(df))
@@ -131,44 +130,22 @@ def lade_excel_liste_a(pfad_excel: str) -> pd.DataFrame:
     return df
 
 def replace_liste_a_in_db(df: pd.DataFrame, db_path: str):
-    # 🧼 ALLE pd.NA/NaN zu None konvertieren – SQLite-safe
-    # 1) saubere Dtypes
-    df = df.convert_dtypes()          # pandas NA-typen konsolidieren
-    # 2) objekt-cast, damit None möglich ist
-    df = df.astype(object)
-    # 3) spaltenweise NAs -> None
-    for col in df.columns:
-        df[col] = df[col].where(pd.notna(df[col]), None)
-    # 4) Booleans als int (SQLite hat kein echtes Bool)
-    if "dirty" in df.columns:
-        df["dirty"] = df["dirty"].map(lambda x: 1 if x is True else 0 if x is False else x)
-
-    with sqlite3.connect(db_path) as conn:
-        cur = conn.cursor()
-        # Vorab löschen: nur Excel/Liste A, Übertrag behalten
-        cur.execute(
-            """
-            DELETE FROM bewegungen
-            WHERE quelle='excel'
-              AND liste='a'
-              AND COALESCE(TRIM(bemerkung),'') <> ?
-            """,
-            (UEBERTRAG_TEXT,)
-        )
-
-        placeholders = ",".join(["?"] * len(df.columns))
-        cols = ",".join(df.columns)
-        sql = f"INSERT INTO bewegungen ({cols}) VALUES ({placeholders})"
-
-        # Tuples bauen (hier sind jetzt garantiert Python-None statt pd.NA)
-        rows = [tuple(row) for row in df.itertuples(index=False, name=None)]
-        cur.executemany(sql, rows)
-        conn.commit()
-
-    # Logging …
-
-        cur.executemany(sql, [tuple(row) for row in df.itertuples(index=False, name=None)])
-        conn.commit()
+    # 🧼 pd.NA/NaN → None, numpy → Python-Typen (SQLite-safe); Bool wird als 0/1 gespeichert
+    spalten, records = dataframe_to_records(df, list(df.columns))
+
+    # Staging + Merge: nur geänderte Zeilen werden geschrieben, Leser sehen den Wechsel atomar.
+    # Bereich: nur Excel/Liste A, Übertrag behalten
+    result = merge_replace(
+        spalten, records,
+        scope="quelle='excel' AND liste='a' AND COALESCE(TRIM(bemerkung),'') <> ?",
+        params=(UEBERTRAG_TEXT,),
+        db_path=db_path,
+        label="import_liste_a",
+    )
+    print(
+        f"🔀 {result.inserted} neu, {result.updated} aktualisiert, "
+        f"{result.skipped} unverändert, {result.deleted} gelöscht"
+    )
 
     # Log
     log_path = Path("logs/import.log")
@@ -185,7 +162,7 @@ def main():
     df = lade_excel_liste_a(excel_path)
     print(f"🧾 {len(df)} Zeilen (Liste a) vorbereitet.")
     replace_liste_a_in_db(df, DB_PATH)
-    print("✅ Liste a erfolgreich ersetzt.")
+    print("✅ Liste a erfolgreich abgeglichen.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,14 @@
+# migrate.py
+"""
+Schema-Migrationen ausführen (sonst automatisch bei der ersten DB-Verbindung).
+
+    python migrate.py
+    DB_PATH=archiv/alt.db python migrate.py
+"""
+from utils.db import DB_PATH, connect
+from utils.migrations import MIGRATIONS, schema_version
+
+if __name__ == "__main__":
+    conn = connect()
+    print(f"✅ {DB_PATH}: Schema-Version {schema_version(conn)} (aktuell {MIGRATIONS[-1][0]})")
+    conn.close()
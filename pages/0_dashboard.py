@@ -1,23 +1,20 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
-from utils.helpers import ensure_views
+from datetime import date
+from utils.stichtag import lade_bestand_per
 
-DB_PATH = "data/laufende_liste.db"
-
-ensure_views()
 st.set_page_config(page_title="📊 Dashboard", layout="wide")
 st.title("📊 Bestands-Dashboard")
 
-# Verbindung zur DB und Laden der View v_bestand
-@st.cache_data
-def lade_bestand():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM v_bestand ORDER BY saldo ASC", conn)
-    conn.close()
-    return df
+# Bestand per Stichtag: heute = v_bestand, früher = Monatsend-Stichtag + Bewegungen seither
+stichtag = st.date_input("📅 Bestand per", value=date.today(), max_value=date.today())
+
+# Importe laufen in eigenen Prozessen und können den Cache nicht leeren → nach 60 s neu lesen
+@st.cache_data(ttl=60)
+def lade_bestand(stichtag):
+    return lade_bestand_per(stichtag)
 
-df = lade_bestand()
+df = lade_bestand(stichtag)
 
 # Kennzahlen
 col1, col2, col3 = st.columns(3)
@@ -1,54 +1,53 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 from datetime import datetime
 from st_aggrid import AgGrid, GridOptionsBuilder
 from st_aggrid.shared import GridUpdateMode
-from utils.filter_utils import filter_dataframe
+from utils.filter_utils import filter_sql, lade_seite
 from utils.ui_components import sicherheitsdialog
 import os
-from utils.helpers import ensure_views
+from utils.artikel import ArtikelLookup
+from utils.datum import anzeige_datum_series
+from utils.db import get_read_connection, read_sql, transaction
 
-DB_PATH = "data/laufende_liste.db"
-
-ensure_views()
+SEITENGROESSE = 500
 
 # Trigger-Mechanismus für Refresh
 if st.session_state.pop("__trigger_refresh__", False):
     st.rerun()
 
-# 🔹 Robust: Nur gültige Datumswerte im ISO-Format parsen
-def format_datum_safe(d):
-    if pd.isna(d) or not isinstance(d, str):
-        return ""
-    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(d, fmt).strftime("%d.%m.%Y")
-        except:
-            continue
-    return ""
+# Gefiltert und seitenweise in SQL – nie die ganze Tabelle in pandas.
+# Importe (Upload-Seite, batch_import, Excel-Skripte) leeren diese Caches nicht → nach 60 s neu lesen
+@st.cache_data(ttl=60)
+def lade_auswahl(spalte: str) -> list:
+    df = read_sql(f"SELECT DISTINCT {spalte} FROM bewegungen WHERE {spalte} IS NOT NULL ORDER BY {spalte}")
+    return df[spalte].tolist()
 
-@st.cache_data
-def lade_daten():
+@st.cache_data(ttl=60)
+def zaehle_zeilen(where: str, params: tuple) -> int:
+    return get_read_connection().execute(f"SELECT COUNT(*) FROM bewegungen WHERE {where}", params).fetchone()[0]
+
+def lade_anzeige(where: str, params: tuple, nach: tuple | None) -> tuple[pd.DataFrame, tuple | None]:
+    """Seite ab Cursor nach (utils.filter_utils.lade_seite), Datum für die Anzeige."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql_query("SELECT * FROM bewegungen", conn)
-        conn.close()
+        df, weiter = lade_seite(where, params, nach, SEITENGROESSE)
     except Exception as e:
         st.error(f"❌ Fehler beim Laden der Daten: {e}")
-        return pd.DataFrame()
-
-    if "datum" in df.columns:
-        df["datum"] = df["datum"].apply(format_datum_safe)
+        return pd.DataFrame(), None
+    # DB: ISO → Anzeige TT.MM.JJJJ (vektorisiert)
+    df["datum"] = anzeige_datum_series(df["datum"])
+    return df, weiter
 
-    return df
+def cache_leeren():
+    zaehle_zeilen.clear()
+    lade_auswahl.clear()
 
 st.set_page_config(page_title="💊 Laufende Liste", layout="wide")
 st.title("💊 Laufende Liste – Übersicht & Bearbeitung")
 
 # Sidebar
 if st.sidebar.button("🔁 Laufende Liste neu laden"):
-    lade_daten.clear()
+    cache_leeren()
     st.rerun()
 
 if st.sidebar.button("🔁 Alle Filter zurücksetzen"):
@@ -58,25 +57,41 @@ if st.sidebar.button("🔁 Alle Filter zurücksetzen"):
     st.rerun()
 
 st.sidebar.header("🔍 Filter")
-temp_df = lade_daten()
 st.sidebar.text_input("🎤 Medikament enthält...", value=st.session_state.get("med_filter", ""), key="med_filter")
 st.sidebar.text_input("📄 Pharmacode enthält...", value=st.session_state.get("pharma_filter", ""), key="pharma_filter")
-st.sidebar.selectbox("👤 Name", ["Alle"] + sorted(temp_df["name"].dropna().unique()), key="name_filter")
-st.sidebar.selectbox("🧑 Vorname", ["Alle"] + sorted(temp_df["vorname"].dropna().unique()), key="vorname_filter")
-st.sidebar.selectbox("🏢 Lieferant", ["Alle"] + sorted(temp_df["lieferant"].dropna().unique()), key="lieferant_filter")
-st.sidebar.selectbox("📋 Liste", ["Alle"] + sorted(temp_df["liste"].dropna().unique()), key="liste_filter")
+st.sidebar.selectbox("👤 Name", ["Alle"] + lade_auswahl("name"), key="name_filter")
+st.sidebar.selectbox("🧑 Vorname", ["Alle"] + lade_auswahl("vorname"), key="vorname_filter")
+st.sidebar.selectbox("🏢 Lieferant", ["Alle"] + lade_auswahl("lieferant"), key="lieferant_filter")
+st.sidebar.selectbox("📋 Liste", ["Alle"] + lade_auswahl("liste"), key="liste_filter")
 st.sidebar.selectbox("📦 Quelle", ["Alle", "excel", "pdf", "manuell"], key="quelle_filter")
 st.sidebar.selectbox("🧪 Dirty", ["Alle", "Ja", "Nein"], key="dirty_filter")
 st.sidebar.date_input("📆 Von", value=st.session_state.get("datum_von", None), key="datum_von")
 st.sidebar.date_input("📆 Bis", value=st.session_state.get("datum_bis", None), key="datum_bis")
 
-# Tabelle
-df = filter_dataframe(temp_df)
+# Tabelle: Filter als SQL, Seiten per Keyset-Cursor (Stapel für "Zurück")
+where, params = filter_sql(st.session_state)
+params = tuple(params)
+if st.session_state.get("seiten_where") != (where, params):
+    st.session_state["seiten_where"] = (where, params)
+    st.session_state["seiten_cursor"] = [None]
+seiten_cursor = st.session_state["seiten_cursor"]
+df, weiter = lade_anzeige(where, params, seiten_cursor[-1])
+anzahl = zaehle_zeilen(where, params)
 
 if "selected_row" not in st.session_state:
     st.session_state["selected_row"] = {}
 
 st.subheader("📋 Daten-Tabelle")
+nav_zurueck, nav_info, nav_weiter = st.columns([1, 4, 1])
+if nav_zurueck.button("⬅️ Zurück", disabled=len(seiten_cursor) == 1):
+    seiten_cursor.pop()
+    st.rerun()
+seiten = max(1, -(-anzahl // SEITENGROESSE))
+nav_info.caption(f"Seite {len(seiten_cursor)} von {seiten} · {anzahl} Zeilen")
+if nav_weiter.button("Weiter ➡️", disabled=weiter is None):
+    seiten_cursor.append(weiter)
+    st.rerun()
+
 gb = GridOptionsBuilder.from_dataframe(df)
 gb.configure_column("id", editable=False)
 gb.configure_default_column(editable=True, resizable=True)
@@ -146,21 +161,20 @@ with col2:
         jetzt = pd.Timestamp.now().isoformat()
         row.update({
             "id": None,
+            "natural_key": None,  # eindeutig → die Kopie ist eine eigene, manuelle Zeile
             "dirty": True,
             "quelle": "manuell",
             "created_at": jetzt,
             "updated_at": jetzt
         })
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
         cols = ", ".join(k for k in row if k != "id")
         placeholders = ", ".join(["?"] * len([k for k in row if k != "id"]))
         sql = f"INSERT INTO bewegungen ({cols}) VALUES ({placeholders})"
-        cursor.execute(sql, tuple(row[k] for k in row if k != "id"))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute(sql, tuple(row[k] for k in row if k != "id"))
 
+        cache_leeren()
         st.session_state["selected_row"] = {**row, "new": True}
         st.session_state["__trigger_refresh__"] = True
 
@@ -169,12 +183,9 @@ with col2:
 
 with col3:
     def loeschen():
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM bewegungen WHERE id = ?", (selected["id"],))
-        conn.commit()
-        conn.close()
-        lade_daten.clear()
+        with transaction() as conn:
+            conn.execute("DELETE FROM bewegungen WHERE id = ?", (selected["id"],))
+        cache_leeren()
         st.session_state["selected_row"] = {}
         st.session_state["__trigger_refresh__"] = True
 
@@ -182,8 +193,12 @@ with col3:
         sicherheitsdialog("Löschen", "❌ Ja, löschen", loeschen)
 
 with col4:
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button("📂 Export als CSV", data=csv, file_name="laufende_liste_export.csv", mime="text/csv")
+    # Export: alle gefilterten Zeilen (nicht nur die Seite), erst auf Anforderung geladen
+    if st.button("📂 Export vorbereiten"):
+        export = read_sql(f"SELECT * FROM bewegungen WHERE {where} ORDER BY datum, id", params)
+        export["datum"] = anzeige_datum_series(export["datum"])
+        csv = export.to_csv(index=False).encode("utf-8")
+        st.download_button("📂 Export als CSV", data=csv, file_name="laufende_liste_export.csv", mime="text/csv")
 
 if selected.get("new", False) or valid_selection:
     st.subheader("✏️ Bearbeitungsformular")
@@ -251,40 +266,38 @@ if selected.get("new", False) or valid_selection:
                 st.stop()
 
             try:
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-
                 if "id" in selected and selected["id"] is not None:
                     sql = """UPDATE bewegungen SET 
-                                artikel_bezeichnung = ?, pharmacode = ?, liste = ?, datum = ?, 
+                                artikel_bezeichnung = ?, artikel_id = ?, pharmacode = ?, liste = ?, datum = ?, 
                                 ein_mge = ?, ein_pack = ?, aus_mge = ?, aus_pack = ?,
                                 name = ?, vorname = ?, lieferant = ?, quelle = ?, dirty = ? 
                              WHERE id = ?"""
                     values = [
-                        updated["artikel_bezeichnung"], updated["pharmacode"], updated["liste"], datum_obj.isoformat(),
+                        updated["artikel_bezeichnung"], None, updated["pharmacode"], updated["liste"], datum_obj.isoformat(),
                         updated["ein_mge"], updated["ein_pack"], updated["aus_mge"], updated["aus_pack"],
                         updated["name"], updated["vorname"], updated["lieferant"], updated["quelle"], updated["dirty"],
                         selected["id"]
                     ]
-                    cursor.execute(sql, values)
                 else:
                     sql = """INSERT INTO bewegungen (
-                                artikel_bezeichnung, pharmacode, liste, datum,
+                                artikel_bezeichnung, artikel_id, pharmacode, liste, datum,
                                 ein_mge, ein_pack, aus_mge, aus_pack,
                                 name, vorname, lieferant, quelle, dirty, created_at, updated_at
-                             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+                             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
                     jetzt = pd.Timestamp.now().isoformat()
                     values = [
-                        updated["artikel_bezeichnung"], updated["pharmacode"], updated["liste"], datum_obj.isoformat(),
+                        updated["artikel_bezeichnung"], None, updated["pharmacode"], updated["liste"], datum_obj.isoformat(),
                         updated["ein_mge"], updated["ein_pack"], updated["aus_mge"], updated["aus_pack"],
                         updated["name"], updated["vorname"], updated["lieferant"], updated["quelle"], updated["dirty"],
                         jetzt, jetzt
                     ]
-                    cursor.execute(sql, values)
 
-                conn.commit()
-                conn.close()
+                with transaction() as conn:
+                    # artikel_id (Platzhalter nach artikel_bezeichnung) passend zur Bezeichnung
+                    values[1] = ArtikelLookup(conn).id(updated["artikel_bezeichnung"], updated["pharmacode"])
+                    conn.execute(sql, values)
 
+                cache_leeren()
                 st.success("✅ Änderungen erfolgreich gespeichert.")
                 st.session_state["selected_row"] = {}
                 st.session_state["__trigger_refresh__"] = True
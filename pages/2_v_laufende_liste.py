@@ -1,31 +1,21 @@
 from io import BytesIO
 import streamlit as st
-import sqlite3
 import pandas as pd
 from datetime import date
-from utils.helpers import ensure_views
-
-DB_PATH = "data/laufende_liste.db"
+from utils.db import read_sql
+from utils.stichtag import lade_bestand_per
 
 st.set_page_config(page_title="📋 Laufende Liste – Ansicht & Export", layout="wide")
 st.title("📋 Laufende Liste – Ansicht & Export")
 
-ensure_views()
-
 @st.cache_data
 def lade_laufende_liste():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM bewegungen ORDER BY datum DESC", conn)
-    conn.close()
-    return df
+    return read_sql("SELECT * FROM bewegungen ORDER BY datum DESC")
 
 df_raw = lade_laufende_liste()
 
-# Robustes Datums-Parsing
-try:
-    dt = pd.to_datetime(df_raw["datum"], errors="coerce", dayfirst=True, format="mixed")
-except Exception:
-    dt = pd.to_datetime(df_raw["datum"], errors="coerce", dayfirst=True)
+# datum ist ISO-Text (Migration 7)
+dt = pd.to_datetime(df_raw["datum"], format="%Y-%m-%d", errors="coerce")
 
 min_dt = dt.min() if pd.notna(dt.min()) else pd.Timestamp("2000-01-01")
 max_dt = dt.max() if pd.notna(dt.max()) else pd.Timestamp.today()
@@ -74,12 +64,13 @@ else:
 def _sql_where_for_movements(start_date, end_date, liste_sel, quelle_sel):
     where = ["1=1"]
     params = []
+    # ISO-Text → einfacher Bereichsvergleich über ix_bewegungen_datum
     if start_date:
-        where.append("date(datum) >= date(?)")
-        params.append(str(start_date))
+        where.append("datum >= ?")
+        params.append(start_date.isoformat())
     if end_date:
-        where.append("date(datum) <= date(?)")
-        params.append(str(end_date))
+        where.append("datum <= ?")
+        params.append(end_date.isoformat())
     if liste_sel:
         where.append("liste IN (" + ",".join(["?"]*len(liste_sel)) + ")")
         params += list(liste_sel)
@@ -89,17 +80,17 @@ def _sql_where_for_movements(start_date, end_date, liste_sel, quelle_sel):
     return " WHERE " + " AND ".join(where), params
 
 def _load_df(sql, params=()):
-    with sqlite3.connect(DB_PATH) as conn:
-        return pd.read_sql_query(sql, conn, params=params)
+    return read_sql(sql, params)
 
 st.subheader("📤 Kombi-Export (Bewegungen + Bestand)")
 
-col_src, col_btn = st.columns([2,1])
+col_src, col_tag, col_btn = st.columns([2,1,1])
 export_source = col_src.selectbox(
     "Quelle",
     ["Beides (empfohlen)", "Nur Bewegungen (v_bewegung)", "Nur Bestand (v_bestand)"],
     index=0
 )
+bestand_stichtag = col_tag.date_input("Bestand per", value=date.today(), max_value=date.today())
 
 if col_btn.button("⬇️ Excel erzeugen"):
     # Bewegungen (v_bewegung) – mit denselben Filtern wie oben
@@ -111,9 +102,9 @@ if col_btn.button("⬇️ Excel erzeugen"):
         dfs.append(("Bewegungen", df_mov))
 
     if export_source in ("Beides (empfohlen)", "Nur Bestand (v_bestand)"):
-        # Bestand ist unabhängig von Datum/List in der Regel – falls du filtern willst, bräuchte es eine eigene view mit Datum.
-        df_best = _load_df("SELECT * FROM v_bestand ORDER BY saldo")
-        dfs.append(("Bestand", df_best))
+        # Bestand per Stichtag (heute = v_bestand), unabhängig von den Listen-/Quellen-Filtern
+        df_best = lade_bestand_per(bestand_stichtag)
+        dfs.append((f"Bestand {bestand_stichtag:%d.%m.%Y}", df_best))
 
     # Schreiben
     bio = BytesIO()
@@ -1,10 +1,10 @@
 # 2_import_delta.py
 
 import streamlit as st
-import os
 import traceback
-from pdf_to_sqlite_importer_dynamic import main  # <-- nur main importieren
-from utils.logger import get_log_path
+from pdf_to_sqlite_importer_dynamic import import_upload
+from utils.upload_store import sha256_bytes, find_import_run
+from utils.logger import get_log_path, flush_logs
 from utils.env import get_env_var, validate_env
 
 validate_env(["APP_ENV", "LOG_PATH"])
@@ -17,32 +17,42 @@ st.title("📄 PDF Upload & Datenbank-Import")
 
 uploaded_file = st.file_uploader("Wähle eine PDF-Datei", type=["pdf"])
 
-if uploaded_file is not None:
-    filename = uploaded_file.name
-    save_path = os.path.join("upload", filename)
-
-    # Ordner sicherstellen
-    os.makedirs("upload", exist_ok=True)
-
-    # Datei speichern
-    with open(save_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-
-    st.success(f"✅ PDF gespeichert unter: `{save_path}`")
+def zeige_log():
+    # Letzte Log-Zeilen anzeigen (Queue-Listener vorher leeren)
+    flush_logs()
+    with open(LOG_PATH, encoding="utf-8") as log_file:
+        lines = log_file.readlines()
+        last_lines = lines[-100:]
+        st.text("".join(last_lines))
 
+def importieren(data: bytes, filename: str, force: bool = False):
     with st.spinner("📦 Import läuft..."):
         try:
-            # Nur noch 1 Aufruf nötig:
-            main(save_path)
-
-            st.success("✅ Import abgeschlossen.")
-
+            result = import_upload(data, filename, force=force)
+            st.success(
+                f"✅ Import abgeschlossen: {result['rows']} Zeilen – {result['inserted']} neu, "
+                f"{result['updated']} aktualisiert, {result['skipped']} unverändert "
+                f"(gespeichert unter `{result['path']}`)."
+            )
         except Exception as e:
             st.error(f"❌ Fehler beim Import: {e}")
             st.text(traceback.format_exc())
 
-        # Letzte Log-Zeilen anzeigen
-        with open(LOG_PATH, encoding="utf-8") as log_file:
-            lines = log_file.readlines()
-            last_lines = lines[-100:]
-            st.text("".join(last_lines))
+        zeige_log()
+
+if uploaded_file is not None:
+    filename = uploaded_file.name
+    data = uploaded_file.getvalue()
+    sha256 = sha256_bytes(data)
+
+    # Bereits importiert? (auch bei jedem Streamlit-Rerun mit Datei im Uploader)
+    previous = find_import_run(sha256)
+    if previous:
+        st.info(
+            f"ℹ️ Diese Datei wurde bereits importiert ({previous['finished_at']}, "
+            f"{previous['rows']} Zeilen, als `{previous['filename']}`) – Import übersprungen."
+        )
+        if st.button("🔁 Trotzdem erneut importieren"):
+            importieren(data, filename, force=True)
+    else:
+        importieren(data, filename)
@@ -1,11 +1,9 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import logging
 import os
-import re
+from utils.db import read_sql, transaction
 
-DB_PATH = "data/laufende_liste.db"
 LOG_PATH = "logs/delta.log"
 EXPORT_PATH = "logs/x_candidates_export.csv"
 os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
@@ -23,10 +21,11 @@ st.title("📄 Excel–PDF Abgleich (Delta-Analyse)")
 
 @st.cache_data
 def lade_daten():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql("SELECT * FROM bewegungen", conn)
-    conn.close()
-    return df
+    # artikel_norm kommt einmal pro Artikel aus den Stammdaten statt pro Zeile per Regex
+    return read_sql("""
+        SELECT b.*, COALESCE(a.bezeichnung_norm, '') AS artikel_norm
+        FROM bewegungen b LEFT JOIN artikel a ON a.id = b.artikel_id
+    """)
 
 df = lade_daten()
 
@@ -46,13 +45,8 @@ if liste_wahl != "alle":
 def name_token(n):
     return str(n).strip().split(" ")[0].lower()
 
-def normalize_artikel(s):
-    return re.sub(r"\s+", " ", str(s).lower()).strip()
-
 df_excel["name_token"] = df_excel["name"].apply(name_token)
 df_pdf["name_token"] = df_pdf["name"].apply(name_token)
-df_excel["artikel_norm"] = df_excel["artikel_bezeichnung"].apply(normalize_artikel)
-df_pdf["artikel_norm"] = df_pdf["artikel_bezeichnung"].apply(normalize_artikel)
 
 # Lieferanten berücksichtigen
 df_excel["lieferant"] = df_excel["lieferant"].fillna("").str.lower().str.strip()
@@ -123,21 +117,17 @@ st.dataframe(styled_df, use_container_width=True)
 
 # Delta-Abgleich durchführen
 if st.button("🚀 Delta-Abgleich durchführen"):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
     updated, deleted = 0, 0
     x_candidates = []
+    # Änderungen sammeln und am Ende in einer Transaktion schreiben
+    updates, deletes = [], []
 
     for _, row in df_delta.iterrows():
         status = row["ks"]
         if status == "xx":
             log_msg = f"XX: Ergänze → {row['belegnummer']} | {row['datum']} | {row['name_excel']} | {row['artikel_bezeichnung_excel']} | delta: {row['delta_detail']}"
             if not simulate:
-                cursor.execute("""
-                    UPDATE bewegungen
-                    SET ein_mge = ?, aus_mge = ?, ein_pack = ?, aus_pack = ?, ks = 'xx'
-                    WHERE quelle = 'excel' AND belegnummer = ? AND datum = ? AND name = ? AND vorname = ? AND artikel_bezeichnung = ?
-                """, (
+                updates.append((
                     row["ein_mge_pdf"], row["aus_mge_pdf"],
                     row["ein_pack_pdf"], row["aus_pack_pdf"],
                     row["belegnummer"], row["datum"], row["name_excel"], row["vorname_excel"], row["artikel_bezeichnung_excel"]
@@ -151,10 +141,7 @@ if st.button("🚀 Delta-Abgleich durchführen"):
             x_candidates.append(row)
             log_msg = f"X: Lösche → {row['belegnummer']} | {row['datum']} | {row['name_pdf']} | {row['artikel_bezeichnung_pdf']}"
             if not simulate:
-                cursor.execute("""
-                    DELETE FROM bewegungen
-                    WHERE quelle = 'pdf' AND belegnummer = ? AND datum = ? AND name = ? AND vorname = ? AND artikel_bezeichnung = ?
-                """, (
+                deletes.append((
                     row["belegnummer"], row["datum"], row["name_pdf"], row["vorname_pdf"], row["artikel_bezeichnung_pdf"]
                 ))
                 logging.info(log_msg + " → ✅ committed")
@@ -167,7 +154,16 @@ if st.button("🚀 Delta-Abgleich durchführen"):
             logging.info(log_msg)
 
     if not simulate:
-        conn.commit()
+        with transaction() as conn:
+            conn.executemany("""
+                UPDATE bewegungen
+                SET ein_mge = ?, aus_mge = ?, ein_pack = ?, aus_pack = ?, ks = 'xx'
+                WHERE quelle = 'excel' AND belegnummer = ? AND datum = ? AND name = ? AND vorname = ? AND artikel_bezeichnung = ?
+            """, updates)
+            conn.executemany("""
+                DELETE FROM bewegungen
+                WHERE quelle = 'pdf' AND belegnummer = ? AND datum = ? AND name = ? AND vorname = ? AND artikel_bezeichnung = ?
+            """, deletes)
         st.success(f"✅ {updated} ergänzt (xx), {deleted} gelöscht (x)")
         logging.info(f"🔁 Delta-Abgleich durchgeführt (real): {updated} ergänzt, {deleted} gelöscht")
     else:
@@ -179,8 +175,6 @@ if st.button("🚀 Delta-Abgleich durchführen"):
         df_x.to_csv(EXPORT_PATH, index=False)
         st.download_button("⬇️ CSV aller 'x'-Kandidaten herunterladen", data=df_x.to_csv(index=False), file_name="x_candidates.csv", mime="text/csv")
 
-    conn.close()
-
 # 🔍 Log-Anzeige
 st.markdown("---")
 st.markdown("### 📝 Delta-Log anzeigen")
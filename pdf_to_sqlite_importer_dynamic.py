@@ -1,17 +1,87 @@
 # pdf_to_sqlite_importer_dynamic.py
 
-from utils.extractor import extract_table_rows_with_article
-from utils.parser import parse_pdf_to_dataframe_dynamic_layout
-from utils.importer import run_import
-from utils.logger import log_import
+from utils.env import get_env_var
+from utils.extractor import iter_table_rows_with_article
+from utils.parser import parse_pdf_to_dataframe_dynamic_layout, iter_parsed_batches
+from utils.importer import ImportResult, run_import, run_import_stream
+from utils.logger import log_stage
+from utils.upload_store import (
+    store_upload,
+    has_cached_rows,
+    iter_cached_rows,
+    cache_rows,
+    find_import_run,
+    start_import_run,
+    finish_import_run,
+)
+
+def _stream_default() -> bool:
+    return get_env_var("IMPORT_STREAM", "0").strip().lower() in ("1", "true", "yes", "ja")
+
+def _batch_size_default() -> int:
+    try:
+        return max(1, int(get_env_var("IMPORT_BATCH_SIZE", "500")))
+    except ValueError:
+        return 500
+
+def main(pdf_path: str, stream: bool | None = None, batch_size: int | None = None, sha256: str | None = None) -> ImportResult:
+    """
+    Importiert ein PDF. Im Streaming-Modus (stream=True bzw. IMPORT_STREAM=1) laufen
+    Extraktion, Parsing und Import als Pipeline: Zeilen werden Seite für Seite erzeugt,
+    in Batches von batch_size geparst und jeder Batch wird sofort committet.
+
+    Mit sha256 werden die extrahierten Zeilen neben der Datei gecacht; liegt der
+    Cache schon vor, wird PyMuPDF komplett übersprungen.
+
+    Zeilen werden über ihren natürlichen Schlüssel ge-upsertet; das Ergebnis
+    zählt neue, aktualisierte und unveränderte Zeilen.
+    """
+    if stream is None:
+        stream = _stream_default()
+    if batch_size is None:
+        batch_size = _batch_size_default()
 
-def main(pdf_path: str):
     try:
-        log_import(f"🚀 Import gestartet für: {pdf_path}")
-        raw_rows = extract_table_rows_with_article(pdf_path)
-        parsed_df = parse_pdf_to_dataframe_dynamic_layout(raw_rows)
-        run_import(parsed_df)
-        log_import("🏁 Import abgeschlossen.")
+        log_stage("document", "🚀 Import gestartet für: %s", pdf_path)
+        if sha256 and has_cached_rows(sha256):
+            log_stage("document", "♻️ Zeilen-Cache gefunden für %s – Extraktion übersprungen", sha256[:12])
+            rows_iter = iter_cached_rows(sha256)
+        else:
+            rows_iter = iter_table_rows_with_article(pdf_path)
+            if sha256:
+                rows_iter = cache_rows(sha256, rows_iter)
+
+        if stream:
+            result = run_import_stream(iter_parsed_batches(rows_iter, batch_size))
+        else:
+            parsed_df = parse_pdf_to_dataframe_dynamic_layout(list(rows_iter))
+            result = run_import(parsed_df)
+        log_stage("document", "🏁 Import abgeschlossen.")
+        return result
     except Exception as e:
-        log_import(f"❌ Fehler beim Import: {e}")
+        log_stage("document", "❌ Fehler beim Import: %s", e, level="error")
+        raise
+
+def import_upload(data: bytes, filename: str, force: bool = False) -> dict:
+    """
+    Legt einen Upload content-adressiert ab und importiert ihn genau einmal.
+    Bereits importierte Dateien (gleicher SHA-256) werden übersprungen,
+    ausser force=True.
+    """
+    sha256, path = store_upload(data, filename)
+    previous = find_import_run(sha256)
+    if previous and not force:
+        log_stage("document", "⏭️ %s bereits importiert (Lauf %s) – übersprungen", filename, previous["id"])
+        return {"status": "skipped", "sha256": sha256, "path": str(path), "run": previous}
+
+    run_id = start_import_run(sha256, filename, forced=force)
+    try:
+        result = main(str(path), sha256=sha256)
+    except Exception:
+        finish_import_run(run_id, "error")
         raise
+    finish_import_run(run_id, "ok", result.rows)
+    return {
+        "status": "imported", "sha256": sha256, "path": str(path), "rows": result.rows,
+        **result._asdict(), "run_id": run_id,
+    }
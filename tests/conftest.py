@@ -0,0 +1,38 @@
+# tests/conftest.py
+"""
+Gemeinsame Test-Umgebung: Log, Caches und Datenbank in einem temporären
+Verzeichnis – vor dem ersten Import von utils.*, die Pfade beim Import lesen.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+_TMP = Path(tempfile.mkdtemp(prefix="drugs_bot_tests_"))
+os.environ.update(
+    LOG_PATH=str(_TMP / "log" / "import.log"),
+    DB_PATH=str(_TMP / "laufende_liste.db"),
+    PAGE_CACHE_PATH=str(_TMP / "page_cache.db"),
+    OCR_CACHE_PATH=str(_TMP / "ocr_cache.db"),
+    OCR="0",
+    LOG_TOKEN_TRACE="0",
+)
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Eigene, frisch migrierte Datenbank pro Test (Default von utils.db umgebogen)."""
+    import utils.db
+    pfad = str(tmp_path / "laufende_liste.db")
+    monkeypatch.setattr(utils.db, "DB_PATH", pfad)
+    utils.db.get_connection(pfad)  # legt Schema an
+    return pfad
+
+@pytest.fixture
+def conn(db_path):
+    """Geteilte Schreibverbindung der Test-Datenbank (Autocommit, Transaktionen explizit)."""
+    from utils.db import get_connection
+    return get_connection(db_path)
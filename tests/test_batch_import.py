@@ -0,0 +1,23 @@
+# tests/test_batch_import.py
+from batch_import import batch_import
+from benchmarks.synthetic_pdf import generate_report
+
+def test_batch_import_schreibt_ueber_bulkwriter(tmp_path, conn):
+    archiv = tmp_path / "archiv"
+    archiv.mkdir()
+    for i, liste in enumerate("ab"):
+        generate_report(str(archiv / f"bericht_{i}.pdf"), liste, pages=2, rows_per_page=10, seed=i)
+
+    summary = batch_import([str(archiv)], workers=2, txn_rows=5)
+    assert [e["status"] for e in summary] == ["ok", "ok"]
+    zeilen = sum(e["zeilen"] for e in summary)
+    assert zeilen == sum(e["inserted"] for e in summary) > 0
+    assert conn.execute("SELECT COUNT(*) FROM bewegungen").fetchone()[0] == zeilen
+    assert conn.execute("SELECT COUNT(*) FROM bewegungen WHERE artikel_id IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*), SUM(rows) FROM import_runs WHERE status = 'ok'").fetchone() == (2, zeilen)
+    # Stichtage beim Schliessen des Writers ergänzt
+    from utils.bestand import offene_stichtage
+    assert offene_stichtage(conn) == []
+
+    # Zweiter Lauf: gleiche Hashes → übersprungen
+    assert [e["status"] for e in batch_import([str(archiv)], workers=2, txn_rows=5)] == ["übersprungen"] * 2
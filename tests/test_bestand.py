@@ -0,0 +1,173 @@
+# tests/test_bestand.py
+import random
+from datetime import date
+import pandas as pd
+import pytest
+from utils.bestand import (
+    aktualisiere_stichtage, bestand_per, check_bestand, check_stichtag, offene_stichtage, rebuild_bestand,
+)
+
+ARTIKEL = ["Ritalin 10 mg", "Concerta 18 mg", "Methadon 1%"]
+
+def _bewegung(conn, artikel: str, datum: str | None, eingang: int = 0, ausgang: int = 0) -> int:
+    artikel_id = ARTIKEL.index(artikel) + 1
+    return conn.execute(
+        "INSERT INTO bewegungen(artikel_bezeichnung, artikel_id, datum, eingang, ausgang) VALUES (?, ?, ?, ?, ?)",
+        (artikel, artikel_id, datum, eingang, ausgang),
+    ).lastrowid
+
+def _soll(conn, stichtag: str) -> list[tuple]:
+    return conn.execute("""
+    SELECT artikel_bezeichnung, MAX(datum), SUM(COALESCE(eingang,0)), SUM(COALESCE(ausgang,0)),
+           SUM(COALESCE(eingang,0)) - SUM(COALESCE(ausgang,0))
+    FROM bewegungen WHERE datum <= ? OR datum IS NULL GROUP BY artikel_bezeichnung ORDER BY 1
+    """, (stichtag,)).fetchall()
+
+def _stichtage(conn, artikel: str) -> list[str]:
+    return [r[0] for r in conn.execute(
+        "SELECT stichtag FROM bestand_stichtag WHERE artikel_id = ? ORDER BY 1", (ARTIKEL.index(artikel) + 1,)
+    )]
+
+@pytest.fixture
+def historie(conn):
+    """Zwei Jahre Bewegungen für drei Artikel, Stichtage bis Ende 2025."""
+    conn.executemany(
+        "INSERT INTO artikel(id, bezeichnung, bezeichnung_norm) VALUES (?, ?, ?)",
+        [(i + 1, name, name.lower()) for i, name in enumerate(ARTIKEL)],
+    )
+    zufall = random.Random(23)
+    for _ in range(300):
+        tag = date(zufall.randint(2024, 2025), zufall.randint(1, 12), zufall.randint(1, 28)).isoformat()
+        _bewegung(conn, zufall.choice(ARTIKEL), tag, zufall.randint(0, 9), zufall.randint(0, 5))
+    aktualisiere_stichtage(conn, bis=date(2025, 12, 31))
+    return conn
+
+def test_trigger_halten_bestand_konsistent(historie):
+    zufall = random.Random(20)
+    for _ in range(400):
+        ids = [r[0] for r in historie.execute("SELECT id FROM bewegungen")]
+        aktion = zufall.random()
+        if aktion < 0.3:
+            _bewegung(historie, zufall.choice(ARTIKEL), f"2025-{zufall.randint(1, 12):02d}-10", zufall.randint(0, 9))
+        elif aktion < 0.5:
+            historie.execute("DELETE FROM bewegungen WHERE id = ?", (zufall.choice(ids),))
+        elif aktion < 0.7:
+            artikel = zufall.choice(ARTIKEL)
+            historie.execute(
+                "UPDATE bewegungen SET artikel_bezeichnung = ?, artikel_id = ? WHERE id = ?",
+                (artikel, ARTIKEL.index(artikel) + 1, zufall.choice(ids)),
+            )
+        elif aktion < 0.85:
+            historie.execute(
+                "UPDATE bewegungen SET pharmacode = ? WHERE id = ?", (zufall.choice([None, "111", "222"]), zufall.choice(ids))
+            )
+        else:
+            historie.execute(
+                "UPDATE bewegungen SET datum = ?, ausgang = ? WHERE id = ?",
+                (f"2024-{zufall.randint(1, 12):02d}-20", zufall.randint(0, 9), zufall.choice(ids)),
+            )
+    assert check_bestand(historie) == []
+    assert historie.execute("SELECT SUM(anzahl) FROM bestand").fetchone()[0] == \
+        historie.execute("SELECT COUNT(*) FROM bewegungen").fetchone()[0]
+
+    # Letzte Bewegung eines Artikels löschen → Artikel verschwindet aus v_bestand
+    historie.execute("DELETE FROM bewegungen WHERE artikel_id = 3")
+    assert "Methadon 1%" not in [r[0] for r in historie.execute("SELECT artikel_bezeichnung FROM v_bestand")]
+    assert check_bestand(historie) == []
+
+def test_rebuild_bestand_stellt_verfaelschten_bestand_wieder_her(historie):
+    historie.execute("UPDATE bestand SET total_eingang = total_eingang + 1 WHERE artikel_id = 1")
+    historie.execute("DELETE FROM bestand_stichtag WHERE artikel_id = 2")
+    assert check_bestand(historie)
+    historie.execute("BEGIN IMMEDIATE")
+    rebuild_bestand(historie)
+    historie.execute("COMMIT")
+    assert check_bestand(historie) == [] and check_stichtag(historie) == []
+    assert _stichtage(historie, "Concerta 18 mg")[-1] >= "2025-12-31"
+
+TAGE = ["2023-12-31", "2024-01-31", "2024-06-15", "2024-12-31", "2025-03-01", "2025-12-31", "2026-02-01"]
+
+def test_bestand_per_entspricht_vollberechnung(historie):
+    assert len(_stichtage(historie, "Ritalin 10 mg")) == 24
+    for tag in TAGE:
+        assert sorted(bestand_per(historie, tag)) == _soll(historie, tag)
+    assert check_stichtag(historie) == []
+
+def test_rueckdatierte_bewegung_verwirft_nur_stichtage_des_artikels(historie):
+    vorher = _stichtage(historie, "Concerta 18 mg")
+    _bewegung(historie, "Ritalin 10 mg", "2024-05-10", eingang=50)
+    zeile = historie.execute("SELECT id FROM bewegungen WHERE artikel_id = 3 ORDER BY datum LIMIT 1 OFFSET 5").fetchone()[0]
+    historie.execute("UPDATE bewegungen SET datum = '2025-02-03' WHERE id = ?", (zeile,))
+
+    assert _stichtage(historie, "Ritalin 10 mg")[-1] == "2024-04-30"
+    assert _stichtage(historie, "Concerta 18 mg") == vorher
+    # Lücken liest bestand_per aus dem letzten verbliebenen Stichtag des Artikels
+    for tag in TAGE:
+        assert sorted(bestand_per(historie, tag)) == _soll(historie, tag)
+    assert check_stichtag(historie) == []
+
+    assert offene_stichtage(historie, bis=date(2025, 12, 31))[0] <= "2024-05-31"
+    aktualisiere_stichtage(historie, bis=date(2025, 12, 31))
+    assert _stichtage(historie, "Ritalin 10 mg") == vorher
+    assert offene_stichtage(historie, bis=date(2025, 12, 31)) == []
+    for tag in TAGE:
+        assert sorted(bestand_per(historie, tag)) == _soll(historie, tag)
+    assert check_stichtag(historie) == []
+
+def test_stand_merkt_fruehesten_verworfenen_stichtag(historie):
+    def stand():
+        return historie.execute("SELECT offen_ab, gefuellt_bis FROM bestand_stichtag_stand").fetchone()
+    assert stand() == (None, "2025-12-31")
+    assert offene_stichtage(historie, bis=date(2025, 12, 31)) == []
+
+    _bewegung(historie, "Concerta 18 mg", "2025-03-10", eingang=1)
+    _bewegung(historie, "Ritalin 10 mg", "2024-07-02", eingang=1)
+    _bewegung(historie, "Methadon 1%", "2025-01-02", ausgang=1)
+    assert stand() == ("2024-07-31", "2025-12-31")
+    offen = offene_stichtage(historie, bis=date(2025, 12, 31))
+    assert (offen[0], offen[-1], len(offen)) == ("2024-07-31", "2025-12-31", 18)
+    # Gleiches Ergebnis wie die Suche pro Artikel (ohne gemerkten Stand)
+    historie.execute("UPDATE bestand_stichtag_stand SET gefuellt_bis = NULL")
+    assert offene_stichtage(historie, bis=date(2025, 12, 31)) == offen
+    historie.execute("UPDATE bestand_stichtag_stand SET gefuellt_bis = '2025-12-31'")
+    # Nach der letzten Ergänzung abgeschlossene Monate sind auch ohne Änderung offen
+    assert offene_stichtage(historie, bis=date(2026, 2, 28))[-3:] == ["2025-12-31", "2026-01-31", "2026-02-28"]
+
+    aktualisiere_stichtage(historie, bis=date(2025, 12, 31))
+    assert stand() == (None, "2025-12-31")
+    assert check_stichtag(historie) == []
+    for tag in TAGE:
+        assert sorted(bestand_per(historie, tag)) == _soll(historie, tag)
+
+def test_undatierte_bewegungen_zaehlen_wie_in_v_bestand(historie):
+    _bewegung(historie, "Methadon 1%", None, eingang=7)
+    _bewegung(historie, "Ritalin 10 mg", None, ausgang=2)
+    # Ohne Datum verwirft der Trigger nichts – die Stichtage enthalten sie nicht
+    assert historie.execute("SELECT offen_ab FROM bestand_stichtag_stand").fetchone()[0] is None
+    assert check_stichtag(historie) == []
+
+    v_bestand = historie.execute(
+        "SELECT artikel_bezeichnung, letzte_bewegung, total_eingang, total_ausgang, saldo FROM v_bestand ORDER BY 1"
+    ).fetchall()
+    assert sorted(bestand_per(historie, date.today())) == v_bestand
+    for tag in TAGE:
+        assert sorted(bestand_per(historie, tag)) == _soll(historie, tag)
+
+def test_import_ergaenzt_stichtage_und_lesen_schreibt_nicht(conn):
+    from utils.importer import run_import
+    from utils.stichtag import lade_bestand_per
+    df = pd.DataFrame([
+        {"quelle": "pdf", "belegnummer": "1", "lfdnr": str(i), "datum": tag,
+         "artikel_bezeichnung": "Ritalin 10 mg", "ein_mge": 10 * i, "liste": "a"}
+        for i, tag in enumerate(["2024-01-15", "2024-02-15", "2024-03-15"], start=1)
+    ])
+    run_import(df)
+    assert offene_stichtage(conn) == []
+    assert _stichtage(conn, "Ritalin 10 mg")[:3] == ["2024-01-31", "2024-02-29", "2024-03-31"]
+
+    # Formular-Änderung ohne Import hinterlässt Lücken; das Dashboard liest nur
+    conn.execute("UPDATE bewegungen SET ein_mge = 5, eingang = 5 WHERE datum = '2024-01-15'")
+    stand = conn.execute("SELECT * FROM bestand_stichtag").fetchall()
+    df_per = lade_bestand_per(date(2024, 2, 20))
+    assert conn.execute("SELECT * FROM bestand_stichtag").fetchall() == stand
+    assert df_per.to_records(index=False).tolist() == _soll(conn, "2024-02-20") == [("Ritalin 10 mg", "2024-02-15", 5, 0, 5)]
@@ -0,0 +1,43 @@
+# tests/test_engines.py
+import pytest
+from utils.engines import ExtractionEngine, engine_names, get_engine
+
+def test_unvollstaendige_engine_faellt_beim_anlegen_auf():
+    class OhneRows(ExtractionEngine):
+        name = "ohne_rows"
+
+        def read_page(self, page, handle):
+            return ""
+
+        def has_text(self, content) -> bool:
+            return False
+
+        def fingerprint(self, content, lieferanten, layouts) -> str:
+            return ""
+
+    with pytest.raises(TypeError, match="rows"):
+        OhneRows()
+
+def test_registrierte_engines_sind_vollstaendig():
+    for name in engine_names():
+        assert get_engine(name).name == name
+    assert get_engine("gibt_es_nicht").name == "blocks"
+
+def test_blocks_fingerprint_enthaelt_engine_und_layout():
+    from utils.layouts import DocumentLayouts, get_layout, header_fingerprint
+    from utils.lieferanten import get_lieferanten_matcher
+    blocks = get_engine("blocks")
+    lieferanten = get_lieferanten_matcher()
+    text = "Lfd Nr Datum BG Rez.Nr.\n10000 01.03.2024 Muster"
+    content = (text, [text])
+    frisch = blocks.fingerprint(content, lieferanten, DocumentLayouts())
+    assert blocks.fingerprint(content, lieferanten, DocumentLayouts()) == frisch
+
+    # Gleicher Kopf, von einer früheren Seite als Layout b gemerkt → andere Zeilen, anderer Schlüssel
+    layouts = DocumentLayouts()
+    layouts._templates[header_fingerprint(text)] = get_layout("b")
+    assert blocks.fingerprint(content, lieferanten, layouts) != frisch
+
+    class BlocksKopie(type(blocks)):
+        name = "blocks_kopie"
+    assert BlocksKopie().fingerprint(content, lieferanten, DocumentLayouts()) != frisch
@@ -0,0 +1,89 @@
+# tests/test_extractor.py
+import functools
+import pytest
+import utils.extractor as extractor
+from benchmarks.synthetic_pdf import generate_report
+from utils.engines import engine_names
+from utils.page_cache import PageCache
+
+@pytest.fixture(scope="module")
+def bericht(tmp_path_factory) -> str:
+    """Bericht wie aus der Praxis: Spaltenkopf nur auf Seite 1."""
+    pfad = str(tmp_path_factory.mktemp("pdf") / "bericht.pdf")
+    generate_report(pfad, "a", pages=10, rows_per_page=12, kopf_nur_erste_seite=True)
+    return pfad
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("engine", ["blocks", "words", "pdfium"])
+def test_warmer_seiten_cache_liefert_gleiche_zeilen(bericht, tmp_path, monkeypatch, engine, workers):
+    if engine not in engine_names():
+        pytest.skip(f"Engine {engine} nicht installiert")
+    # Worker-Prozesse erben den umgebogenen Cache-Pfad per fork
+    monkeypatch.setattr(extractor, "PageCache", functools.partial(PageCache, str(tmp_path / "cache.db")))
+
+    ohne_cache = extractor.extract_table_rows_with_article(bericht, workers, use_cache=False, engine=engine)
+    kalt, warm = {}, {}
+    erster = extractor.extract_table_rows_with_article(bericht, workers, use_cache=True, engine=engine, stats=kalt)
+    zweiter = extractor.extract_table_rows_with_article(bericht, workers, use_cache=True, engine=engine, stats=warm)
+
+    assert ohne_cache
+    assert erster == ohne_cache
+    assert zweiter == ohne_cache
+    assert kalt == {"hits": 0, "misses": 10}
+    assert warm == {"hits": 10, "misses": 0}
+
+def test_words_ohne_kopfzeile_haelt_mehrteilige_namen_zusammen(tmp_path, monkeypatch):
+    import fitz
+    import benchmarks.synthetic_pdf as synthetic_pdf
+    from utils.engines import get_engine
+    from utils.layouts import DocumentLayouts
+    from utils.lieferanten import get_lieferanten_matcher
+    monkeypatch.setattr(synthetic_pdf, "NAMEN", ["von Allmen", "De la Cruz"])
+    monkeypatch.setattr(synthetic_pdf, "LIEFERANTEN", ["Zur Rose"])
+    pfad = str(tmp_path / "namen.pdf")
+    synthetic_pdf.generate_report(pfad, "b", pages=2, rows_per_page=20, kopf_nur_erste_seite=True)
+
+    lieferanten = get_lieferanten_matcher()
+    words, blocks = get_engine("words"), get_engine("blocks")
+    with fitz.open(pfad) as doc:
+        seite = doc[1]  # ohne Spaltenkopf, nichts gelernt → Fallback über die Block-Tokenisierung
+        fallback = words.rows(words.read_page(seite, None), lieferanten, DocumentLayouts())
+        erwartet = blocks.rows(blocks.read_page(seite, None), lieferanten, DocumentLayouts())
+    assert fallback == erwartet
+    # Ein Slot pro Zelle: Name und Arzt-Nr. stehen an ihrer Position, nicht wortweise verschoben
+    patienten = [r.tokens for r in fallback if r.tokens[2].isdigit()]
+    assert {t[3] for t in patienten} == {"von Allmen", "De la Cruz"}
+    assert all(t[5].startswith("Z") for t in patienten)
+    assert {r.tokens[2] for r in fallback if not r.tokens[2].isdigit()} == {"Zur Rose"}
+
+@pytest.mark.parametrize("engine", ["blocks", "words", "pdfium"])
+def test_parallel_entspricht_sequentiell(tmp_path, monkeypatch, engine):
+    import benchmarks.synthetic_pdf as synthetic_pdf
+    if engine not in engine_names():
+        pytest.skip(f"Engine {engine} nicht installiert")
+    # Mehrteilige Namen: ohne die Spalten von Seite 1 weichen spätere Bereiche ab
+    monkeypatch.setattr(synthetic_pdf, "NAMEN", ["von Allmen", "De la Cruz"])
+    monkeypatch.setattr(synthetic_pdf, "LIEFERANTEN", ["Zur Rose"])
+    pfad = str(tmp_path / "bericht_b.pdf")
+    synthetic_pdf.generate_report(pfad, "b", pages=10, rows_per_page=12, kopf_nur_erste_seite=True)
+
+    sequentiell = extractor.extract_table_rows_with_article(pfad, 1, use_cache=False, engine=engine)
+    parallel = extractor.extract_table_rows_with_article(pfad, 3, use_cache=False, engine=engine)
+    assert sequentiell
+    assert parallel == sequentiell
+
+@pytest.mark.parametrize("page_count, workers", [(1, 4), (8, 3), (10, 2), (37, 6), (5, 16)])
+def test_seitenbereiche_decken_alle_seiten_lueckenlos_ab(page_count, workers):
+    ranges = extractor.page_ranges(page_count, workers)
+    assert ranges[0][0] == 0 and ranges[-1][1] == page_count
+    assert all(a_end == b_start for (_, a_end), (b_start, _) in zip(ranges, ranges[1:]))
+    assert all(end > start for start, end in ranges)
+
+@pytest.mark.parametrize("liste", ["a", "b"])
+def test_parallel_in_seitenreihenfolge_fuer_jede_workerzahl(tmp_path, liste):
+    pfad = str(tmp_path / f"bericht_{liste}.pdf")
+    generate_report(pfad, liste, pages=12, rows_per_page=8)
+    sequentiell = extractor.extract_table_rows_with_article(pfad, 1, use_cache=False, engine="blocks")
+    assert sequentiell
+    for workers in (2, 5, 32):
+        assert extractor.extract_table_rows_with_article(pfad, workers, use_cache=False, engine="blocks") == sequentiell
@@ -0,0 +1,59 @@
+# tests/test_filter_utils.py
+import random
+from datetime import date
+import pytest
+from utils.filter_utils import filter_sql, lade_seite
+
+@pytest.fixture
+def bewegungen(conn):
+    zufall = random.Random(25)
+    conn.executemany(
+        "INSERT INTO bewegungen(artikel_bezeichnung, pharmacode, name, liste, quelle, dirty, datum) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                zufall.choice(["Ritalin 10 mg", "Concerta 18 mg", "Methadon 1%"]),
+                zufall.choice([None, "1234567", "7654321"]),
+                zufall.choice([None, "Muster", "Meier"]),
+                zufall.choice(["a", "b"]),
+                zufall.choice(["pdf", "excel"]),
+                zufall.choice([0, 1]),
+                # Wenige verschiedene Tage und NULL → Cursor muss über gleiche Daten hinweg tragen
+                zufall.choice([None, "2024-01-05", "2024-01-06", "2024-02-10", "2024-03-01"]),
+            )
+            for _ in range(200)
+        ],
+    )
+    return conn
+
+def _ids(conn, where: str, params) -> list[int]:
+    return [r[0] for r in conn.execute(f"SELECT id FROM bewegungen WHERE {where} ORDER BY datum, id", params)]
+
+def test_filter_sql(bewegungen):
+    state = {
+        "med_filter": " rital ", "name_filter": "Muster", "liste_filter": "Alle", "dirty_filter": "Nein",
+        "datum_von": date(2024, 1, 6), "datum_bis": date(2024, 2, 29),
+    }
+    where, params = filter_sql(state)
+    erwartet = _ids(bewegungen, """
+        artikel_bezeichnung LIKE '%rital%' AND name = 'Muster' AND dirty = 0
+        AND datum BETWEEN '2024-01-06' AND '2024-02-29'
+    """, ())
+    assert erwartet and _ids(bewegungen, where, params) == erwartet
+    assert filter_sql({}) == ("1 = 1", [])
+
+@pytest.mark.parametrize("state", [{}, {"pharma_filter": "123"}, {"quelle_filter": "pdf", "dirty_filter": "Ja"}])
+@pytest.mark.parametrize("seitengroesse", [1, 7, 50, 500])
+def test_keyset_seiten_ergeben_gesamte_liste(bewegungen, state, seitengroesse):
+    where, params = filter_sql(state)
+    params = tuple(params)
+    gesehen, nach, seiten = [], None, 0
+    while True:
+        df, nach = lade_seite(where, params, nach, seitengroesse)
+        assert len(df) <= seitengroesse
+        gesehen += df["id"].tolist()
+        seiten += 1
+        if nach is None:
+            break
+    erwartet = _ids(bewegungen, where, params)
+    assert gesehen == erwartet
+    assert seiten == max(1, -(-len(erwartet) // seitengroesse))
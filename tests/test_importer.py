@@ -0,0 +1,115 @@
+# tests/test_importer.py
+import pandas as pd
+from utils.importer import (
+    NATURAL_KEY_PDF, BulkWriter, add_natural_key, merge_replace, run_import, run_import_stream, upsert_records,
+)
+
+def _zeile(lfdnr: str, ein: int) -> dict:
+    return {
+        "quelle": "pdf", "belegnummer": "1000001", "lfdnr": lfdnr, "datum": "2024-03-01",
+        "artikel_bezeichnung": "Ritalin 10 mg", "ein_mge": ein, "liste": "a",
+    }
+
+def _bewegungen(conn) -> list[tuple]:
+    return conn.execute("SELECT natural_key, ein_mge FROM bewegungen ORDER BY natural_key").fetchall()
+
+def test_natural_key_nummeriert_doppelbuchungen():
+    df = pd.DataFrame([_zeile("1", 5), _zeile("1", 5), _zeile("2", 5)])
+    keys = add_natural_key(df, NATURAL_KEY_PDF)["natural_key"].tolist()
+    assert [k.rsplit("#", 1)[1] for k in keys] == ["0", "1", "0"]
+    assert keys[0].rsplit("#", 1)[0] == keys[1].rsplit("#", 1)[0] != keys[2].rsplit("#", 1)[0]
+
+def test_stream_import_behaelt_doppelbuchung_ueber_batch_grenze(conn):
+    # Identisches Paar, aufgeteilt auf zwei Batches → zwei Bewegungen wie ohne Streaming
+    erster = pd.DataFrame([_zeile("1", 5), _zeile("2", 3)])
+    zweiter = pd.DataFrame([_zeile("1", 5)])
+    result = run_import_stream(iter([erster, zweiter]))
+    assert (result.inserted, result.updated, result.skipped) == (3, 0, 0)
+    stream = _bewegungen(conn)
+
+    conn.execute("DELETE FROM bewegungen")
+    run_import(pd.concat([erster, zweiter], ignore_index=True))
+    assert stream == _bewegungen(conn)
+    assert len(stream) == 3
+
+def test_erneuter_import_erzeugt_keine_duplikate(conn):
+    df = pd.DataFrame([_zeile("1", 5), _zeile("1", 5), _zeile("2", 3)])
+    assert run_import(df)[:3] == (3, 0, 0)
+    assert run_import(df)[:3] == (0, 0, 3)
+    df.loc[2, "ein_mge"] = 4
+    assert run_import(df)[:3] == (0, 1, 2)
+    assert len(_bewegungen(conn)) == 3
+
+def test_upsert_records_zaehlt_ueber_changes(conn):
+    columns = ["artikel_bezeichnung", "ein_mge", "natural_key"]
+    conn.execute("BEGIN IMMEDIATE")
+    assert upsert_records(conn, columns, [("A", 1, "k1"), ("B", 2, "k2")]) == (2, 0, 0, 0)
+    # k1 unverändert, k2 geändert, k3 neu, k3 doppelt im Batch, ohne Schlüssel neu
+    result = upsert_records(conn, columns, [("A", 1, "k1"), ("B", 5, "k2"), ("C", 1, "k3"), ("C", 2, "k3"), ("D", 1, None)])
+    conn.execute("COMMIT")
+    assert result == (2, 2, 1, 0)
+    assert conn.execute("SELECT natural_key, ein_mge FROM bewegungen ORDER BY id").fetchall() == [
+        ("k1", 1), ("k2", 5), ("k3", 2), (None, 1),
+    ]
+
+def test_merge_replace_ersetzt_nur_den_bereich(conn):
+    columns = ["artikel_bezeichnung", "ein_mge", "quelle", "natural_key"]
+    merge_replace(columns, [("A", 9, "x", "x1")], scope="quelle = ?", params=("x",))
+    merge_replace(columns, [("A", 1, "m", "m1"), ("A", 2, "m", "m2"), ("A", 3, "m", "m3")], scope="quelle = ?", params=("m",))
+    result = merge_replace(columns, [("A", 1, "m", "m1"), ("A", 7, "m", "m2"), ("B", 4, "m", "m4")], scope="quelle = ?", params=("m",))
+    assert result == (1, 1, 1, 1)
+    assert conn.execute("SELECT natural_key, ein_mge FROM bewegungen ORDER BY natural_key").fetchall() == [
+        ("m1", 1), ("m2", 7), ("m4", 4), ("x1", 9),
+    ]
+    # Bestand folgt per Trigger, artikel_id ist gesetzt
+    assert conn.execute("SELECT COUNT(*) FROM bewegungen WHERE artikel_id IS NULL").fetchone()[0] == 0
+
+def test_merge_replace_liste_a_behaelt_uebertrag_und_schreibt_nur_aenderungen(conn):
+    from import_liste_a import UEBERTRAG_TEXT
+    scope = "quelle='excel' AND liste='a' AND COALESCE(TRIM(bemerkung),'') <> ?"
+    columns = ["artikel_bezeichnung", "ein_mge", "quelle", "liste", "bemerkung", "natural_key"]
+    uebertrag = ("Ritalin 10 mg", 100, "excel", "a", UEBERTRAG_TEXT, "u1")
+    with BulkWriter(columns) as writer:
+        writer.write([uebertrag])
+    liste = [("Ritalin 10 mg", i, "excel", "a", None, f"a{i}") for i in range(1, 6)]
+    assert merge_replace(columns, liste, scope=scope, params=(UEBERTRAG_TEXT,)) == (5, 0, 0, 0)
+
+    # Unveränderte Liste: keine Schreibzugriffe auf bewegungen
+    vorher = conn.execute("SELECT id, updated_at FROM bewegungen ORDER BY id").fetchall()
+    assert merge_replace(columns, liste, scope=scope, params=(UEBERTRAG_TEXT,)) == (0, 0, 5, 0)
+    assert conn.execute("SELECT id, updated_at FROM bewegungen ORDER BY id").fetchall() == vorher
+
+    # Gekürzte Liste: fehlende Zeilen im Bereich löschen, Übertrag bleibt
+    assert merge_replace(columns, liste[:2], scope=scope, params=(UEBERTRAG_TEXT,)) == (0, 0, 2, 3)
+    assert [r[0] for r in conn.execute("SELECT natural_key FROM bewegungen ORDER BY natural_key")] == ["a1", "a2", "u1"]
+    assert conn.execute("SELECT anzahl FROM bestand").fetchall() == [(3,)]
+
+def test_bulkwriter_zaehlt_ueber_batchgrenzen(conn):
+    columns = ["artikel_bezeichnung", "ein_mge", "natural_key"]
+    with BulkWriter(columns, batch_size=2) as writer:
+        writer.write([("A", i, f"k{i}") for i in range(5)])
+    # Batches [k0 k1] [k2 k9] [k4 k9]: unverändert, geändert, neu und ein Schlüssel in zwei Batches
+    with BulkWriter(columns, batch_size=2) as writer:
+        writer.write([("A", 0, "k0"), ("A", 7, "k1"), ("A", 2, "k2"), ("A", 1, "k9"), ("A", 5, "k4"), ("A", 3, "k9")])
+    assert (writer.result, writer.batches) == ((1, 3, 2, 0), 3)
+    assert conn.execute("SELECT natural_key, ein_mge FROM bewegungen ORDER BY id").fetchall() == [
+        ("k0", 0), ("k1", 7), ("k2", 2), ("k3", 3), ("k4", 5), ("k9", 3),
+    ]
+
+def test_merge_replace_loescht_nur_im_bereich(conn):
+    columns = ["artikel_bezeichnung", "ein_mge", "quelle", "liste", "natural_key"]
+    with BulkWriter(columns) as writer:
+        writer.write([
+            ("A", 1, "excel", "a", "a1"), ("A", 2, "excel", "a", "a2"), ("A", 3, "excel", "a", None),
+            ("A", 4, "excel", "b", "b1"), ("A", 5, "pdf", "a", "p1"),
+        ])
+    scope = "quelle = ? AND liste = ?"
+    # a2 fehlt und die Zeile ohne Schlüssel hat kein Gegenstück → gelöscht; b1 liegt ausserhalb
+    # des Bereichs und bleibt, obwohl er in records fehlt
+    assert merge_replace(columns, [("A", 1, "excel", "a", "a1")], scope=scope, params=("excel", "a")) == (0, 0, 1, 2)
+    assert [r[0] for r in conn.execute("SELECT natural_key FROM bewegungen ORDER BY id")] == ["a1", "b1", "p1"]
+
+    # Leere Liste leert nur den Bereich
+    assert merge_replace(columns, [], scope=scope, params=("excel", "a")) == (0, 0, 0, 1)
+    assert [r[0] for r in conn.execute("SELECT natural_key FROM bewegungen ORDER BY id")] == ["b1", "p1"]
+    assert conn.execute("SELECT SUM(anzahl) FROM bestand").fetchone()[0] == 2
@@ -0,0 +1,17 @@
+# tests/test_lieferanten.py
+from utils.lieferanten import NamensMatcher
+
+def test_lieferanten_ohne_gross_kleinschreibung(tmp_path):
+    pfad = tmp_path / "lieferanten.csv"
+    pfad.write_text("name\nVOIGT\nMepha\nGrosse Apotheke Dr. Bichsel\n", encoding="utf-8")
+    lieferanten = NamensMatcher(str(pfad))
+
+    # Früher im Extraktor nur in Grossschreibung erkannt ("MEPHA"), "Mepha" selbst nie
+    for token in ("Mepha", "MEPHA", "mepha", " Voigt ", "grosse  apotheke dr. bichsel"):
+        assert lieferanten.ist_normalisiert(token), token
+    assert not lieferanten.ist_normalisiert("Mepha AG")
+    assert not lieferanten.ist_normalisiert("name")  # Kopfzeile
+
+    assert lieferanten.ist_exakt("Mepha") and not lieferanten.ist_exakt("MEPHA")
+    assert lieferanten.hat_praefix("MEPHA Pharma AG") and not lieferanten.hat_praefix("Meph")
+    assert len(lieferanten) == 3
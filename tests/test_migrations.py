@@ -0,0 +1,77 @@
+# tests/test_migrations.py
+import sqlite3
+from datetime import date
+import pytest
+from utils.bestand import bestand_per, check_bestand, check_stichtag
+from utils.migrations import MIGRATIONS, migrate, schema_version
+
+SPALTEN = "artikel_bezeichnung, pharmacode, datum, eingang, ausgang, natural_key"
+
+@pytest.fixture
+def alt_db(tmp_path):
+    """Datenbank auf Schema-Stand 6: Datum gemischt TT.MM.JJJJ/ISO, Bezeichnungen ungetrimmt."""
+    conn = sqlite3.connect(tmp_path / "alt.db", isolation_level=None)
+    for version, _, schritt in MIGRATIONS[:6]:
+        schritt(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+    conn.executemany(f"INSERT INTO bewegungen ({SPALTEN}) VALUES (?, ?, ?, ?, ?, ?)", [
+        ("Ritalin 10 mg", "111", "01.03.2024", 10, 0, "pdf|1|01.03.2024|Ritalin 10 mg#0"),
+        (" Ritalin 10 mg ", "222", "2024-03-05", 0, 3, "pdf|2|2024-03-05|Ritalin 10 mg#0"),
+        ("Ritalin 10 mg", None, "7.4.24", 5, 0, None),
+        ("Concerta 18 mg", None, "30.02.2024", 1, 0, None),  # ungültiger Tag: unlesbar, bleibt stehen
+        ("Concerta 18 mg", "333", "kaputt", 2, 0, "x|kaputt"),
+        ("Concerta 18 mg", None, "  ", 1, 0, None),  # leer → NULL
+        ("Concerta 18 mg", None, None, 4, 1, None),
+        ("   ", None, "02.03.2024", 9, 0, None),
+        (None, None, "03.03.2024", 9, 0, None),
+        # Gleicher Schlüssel nach der Umstellung → bisheriger Schlüssel bleibt (UPDATE OR IGNORE)
+        ("Methadon 1%", None, "2024-01-15", 1, 0, "pdf|9|2024-01-15|Methadon 1%#0"),
+        ("Methadon 1%", None, "15.01.2024", 1, 0, "pdf|9|15.01.2024|Methadon 1%#0"),
+    ])
+    return conn
+
+def test_migration_alter_datenbank(alt_db):
+    # Packungen: erste Bewegung mit Wert ungleich 0 gewinnt (ein_pack vor aus_pack)
+    alt_db.executemany("UPDATE bewegungen SET ein_pack = ?, aus_pack = ? WHERE id = ?", [
+        (0, 0, 1), (0, 30, 2), (20, 0, 3), (10, 0, 10),
+    ])
+    assert migrate(alt_db) == [v for v, _, _ in MIGRATIONS[6:]]
+    assert schema_version(alt_db) == MIGRATIONS[-1][0]
+    assert migrate(alt_db) == []
+
+    assert [r[0] for r in alt_db.execute("SELECT datum FROM bewegungen ORDER BY id")] == [
+        "2024-03-01", "2024-03-05", "2024-04-07", "30.02.2024", "kaputt", None, None, "2024-03-02", "2024-03-03",
+        "2024-01-15", "2024-01-15",
+    ]
+    assert [r[0] for r in alt_db.execute("SELECT natural_key FROM bewegungen WHERE natural_key LIKE 'pdf|%' ORDER BY id")] == [
+        "pdf|1|2024-03-01|Ritalin 10 mg#0", "pdf|2|2024-03-05|Ritalin 10 mg#0",
+        "pdf|9|2024-01-15|Methadon 1%#0", "pdf|9|15.01.2024|Methadon 1%#0",
+    ]
+
+    # Ein Artikel pro getrimmter Bezeichnung, Pharmacode der ersten Bewegung; leer → ohne Artikel
+    assert alt_db.execute("SELECT bezeichnung, bezeichnung_norm, pharmacode FROM artikel ORDER BY id").fetchall() == [
+        ("Ritalin 10 mg", "ritalin 10 mg", "111"), ("Concerta 18 mg", "concerta 18 mg", None),
+        ("Methadon 1%", "methadon 1%", None),
+    ]
+    assert [r[0] for r in alt_db.execute("SELECT packungsgroesse FROM artikel ORDER BY id")] == [30, None, 10]
+    assert [r[0] for r in alt_db.execute("SELECT artikel_id FROM bewegungen ORDER BY id")] == [1, 1, 1, 2, 2, 2, 2, None, None, 3, 3]
+    assert check_bestand(alt_db) == []
+    assert check_stichtag(alt_db) == []
+    # Stichtage nur für Artikel mit ISO-datierten Bewegungen (Concerta hat keine)
+    assert alt_db.execute("SELECT MIN(stichtag) FROM bestand_stichtag").fetchone()[0] == "2024-01-31"
+    assert {r[0] for r in alt_db.execute("SELECT artikel_id FROM bestand_stichtag")} == {1, 3}
+    # Unlesbare/fehlende Daten zählt bestand_per() wie v_bestand zu jedem Stichtag
+    v_bestand = alt_db.execute(
+        "SELECT artikel_bezeichnung, letzte_bewegung, total_eingang, total_ausgang, saldo FROM v_bestand ORDER BY 1"
+    ).fetchall()
+    assert sorted(bestand_per(alt_db, date.today())) == v_bestand
+    assert alt_db.execute("SELECT offen_ab, gefuellt_bis FROM bestand_stichtag_stand").fetchone() == (None, None)
+
+def test_datum_trigger_weist_nicht_iso_ab(alt_db):
+    migrate(alt_db)
+    with pytest.raises(sqlite3.IntegrityError, match="ISO"):
+        alt_db.execute("INSERT INTO bewegungen (datum) VALUES ('01.03.2024')")
+    with pytest.raises(sqlite3.IntegrityError, match="ISO"):
+        alt_db.execute("UPDATE bewegungen SET datum = '2024/03/01' WHERE id = 1")
+    alt_db.execute("INSERT INTO bewegungen (datum) VALUES ('2024-03-01')")
+    alt_db.execute("INSERT INTO bewegungen (datum) VALUES (NULL)")
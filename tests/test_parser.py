@@ -0,0 +1,20 @@
+# tests/test_parser.py
+from utils.parser import parse_pdf_to_dataframe_dynamic_layout
+from utils.rows import ArtikelMeta, BewegungsZeile
+
+ARTIKEL = ArtikelMeta("Ritalin 10 mg", "1000001", 30)
+
+def _zeile(lfdnr: str, tokens: tuple, ein: int = 0, aus: int = 0, dirty: int = 0) -> BewegungsZeile:
+    return BewegungsZeile(lfdnr, "01.03.2024", "Muster", "Anna", "", ein, aus, 0, 0, "", ARTIKEL, tokens, "b", dirty)
+
+def test_dirty_reason_nennt_die_gruende():
+    kopf = ("10000", "01.03.2024", "Muster", "Anna", "Z123456", "", "", "")
+    df = parse_pdf_to_dataframe_dynamic_layout([
+        _zeile("1", kopf + ("5", "", "", ""), ein=5),
+        _zeile("2", kopf + ("", "", "", ""), dirty=1),
+        _zeile("3", kopf + ("5", "3", "", ""), ein=5, aus=3),
+        _zeile("4", ("", "3", "", ""), aus=3, dirty=1),
+    ])
+    assert df["dirty"].tolist() == [0, 1, 1, 1]
+    assert df["dirty_reason"].tolist() == ["", "extraktor", "ein_und_aus", "extraktor,ohne_name"]
+    assert (df["dirty"] > 0).tolist() == (df["dirty_reason"] != "").tolist()
@@ -0,0 +1,49 @@
+# tests/test_suche.py
+import pytest
+from utils.suche import SUCHSPALTEN, suche_ids
+
+ZEILEN = [
+    ("Ritalin 10 mg", "1234567", "Muster", "Hans", "Galexis"),
+    ("Ritalin LA 20 mg", "7654321", "Meier", "Anna", "Voigt"),
+    ("Concerta 18 mg", None, "Müller", "Jürg", "Galexis"),
+    ("Methadon 1% 100%_rein", "1111111", None, None, "Amavita"),
+    ("OXYCONTIN 5 mg", "2222222", "Oxley", "O'Neil", None),
+]
+
+@pytest.fixture
+def bewegungen(conn):
+    conn.executemany(f"INSERT INTO bewegungen ({', '.join(SUCHSPALTEN)}) VALUES (?, ?, ?, ?, ?)", ZEILEN)
+    return conn
+
+def _erwartet(conn, text: str, spalte: str | None, anfang: bool) -> set[int]:
+    # Ab 3 Zeichen Gross/Klein ganz egal (Index), darunter nur bei ASCII (LIKE)
+    falten = str.lower if len(text) >= 3 else lambda s: s.translate(str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"))
+    spalten = SUCHSPALTEN if spalte is None else (spalte,)
+    ids = set()
+    for row_id, *werte in conn.execute(f"SELECT id, {', '.join(spalten)} FROM bewegungen"):
+        for wert in werte:
+            if wert is None:
+                continue
+            wert, such = falten(wert), falten(text)
+            if wert.startswith(such) if anfang else such in wert:
+                ids.add(row_id)
+    return ids
+
+SUCHEN = ["ritalin", "RIT", "10 mg", "mg", "O", "ü", "Müll", "MÜLL", "%", "1%", "0%_", "_", "o'n", '"', "1234", "gal", "xyz"]
+
+@pytest.mark.parametrize("text", SUCHEN)
+@pytest.mark.parametrize("spalte", [None, "artikel_bezeichnung", "name"])
+@pytest.mark.parametrize("anfang", [False, True])
+def test_suche_wie_teilstring(bewegungen, text, spalte, anfang):
+    assert suche_ids(text, spalte, anfang, conn=bewegungen) == _erwartet(bewegungen, text, spalte, anfang)
+
+def test_index_folgt_aenderungen(bewegungen):
+    bewegungen.execute("UPDATE bewegungen SET name = 'Schneider' WHERE name = 'Muster'")
+    bewegungen.execute("DELETE FROM bewegungen WHERE artikel_bezeichnung LIKE 'Concerta%'")
+    for text in ("Muster", "Schneider", "Concerta", "Galexis", "ei"):
+        assert suche_ids(text, conn=bewegungen) == _erwartet(bewegungen, text, None, False)
+    bewegungen.execute("INSERT INTO bewegungen_fts(bewegungen_fts, rank) VALUES ('integrity-check', 1)")
+
+def test_unbekannte_spalte(bewegungen):
+    with pytest.raises(ValueError):
+        suche_ids("abc", "bemerkung", conn=bewegungen)
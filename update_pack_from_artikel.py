@@ -1,7 +1,5 @@
-import sqlite3
 import re
-
-DB_PATH = "data/laufende_liste.db"
+from utils.db import transaction
 
 def extrahiere_packung(text):
     """Extrahiere Packungseinheit aus Artikelbezeichnung gemäß definierter Regeln."""
@@ -25,30 +23,22 @@ def extrahiere_packung(text):
     return None
 
 def aktualisiere_packungen():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Nur Zeilen mit quelle='excel' holen
-    cursor.execute("SELECT id, artikel_bezeichnung, ein_mge, aus_mge FROM bewegungen WHERE quelle = 'excel'")
-    zeilen = cursor.fetchall()
-
-    updated = 0
-    for zeile in zeilen:
-        id_, artikel, ein_mge, aus_mge = zeile
-        packung = extrahiere_packung(artikel)
-        if not packung:
-            continue
-
-        if ein_mge is not None:
-            cursor.execute("UPDATE bewegungen SET ein_pack = ? WHERE id = ?", (packung, id_))
-            updated += 1
-
-        if aus_mge is not None:
-            cursor.execute("UPDATE bewegungen SET aus_pack = ? WHERE id = ?", (packung, id_))
-            updated += 1
-
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        # Packung einmal pro Artikel bestimmen statt pro Bewegung
+        packungen = []
+        for artikel_id, bezeichnung in conn.execute("SELECT id, bezeichnung FROM artikel").fetchall():
+            packung = extrahiere_packung(bezeichnung)
+            if packung:
+                packungen.append((packung, artikel_id))
+
+        conn.executemany("UPDATE artikel SET packungsgroesse = ? WHERE id = ?", packungen)
+        # Nur Zeilen mit quelle='excel'
+        updated = 0
+        for spalte, menge in (("ein_pack", "ein_mge"), ("aus_pack", "aus_mge")):
+            updated += conn.executemany(
+                f"UPDATE bewegungen SET {spalte} = ? WHERE artikel_id = ? AND quelle = 'excel' AND {menge} IS NOT NULL",
+                packungen
+            ).rowcount
 
     print(f"✅ {updated} Packungsgrößen aktualisiert (nur quelle='excel').")
 
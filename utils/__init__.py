@@ -1,6 +1,6 @@
 # utils/__init__.py
-from .extractor import extract_table_rows_with_article, extract_article_info
-from .parser import parse_pdf_to_dataframe_dynamic_layout
-from .importer import run_import
+from .extractor import extract_table_rows_with_article, iter_table_rows_with_article, extract_article_info
+from .parser import parse_pdf_to_dataframe_dynamic_layout, iter_parsed_batches
+from .importer import run_import, run_import_stream
 from .parser import detect_bewegung_from_structured_tokens
 from .logger import log_import
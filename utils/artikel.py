@@ -0,0 +1,112 @@
+# utils/artikel.py
+"""
+Artikel-Stammdaten (Tabelle artikel) und Auflösung Bezeichnung → artikel_id.
+
+Ein Artikel ist eine getrimmte artikel_bezeichnung (wie bisher in v_bestand);
+dazu die normalisierte Bezeichnung für den Excel/PDF-Abgleich, der erste
+bekannte Pharmacode und die Packungsgrösse. bewegungen.artikel_id verweist
+darauf – Bestand, Gruppierungen und Joins laufen über Integer.
+
+Importer lösen über ArtikelLookup auf: eine Abfrage pro Batch für die noch
+unbekannten Bezeichnungen, danach nur noch Dict-Zugriffe. Der Cache lebt so
+lange wie die Verbindung/Transaktion des Aufrufers (kein Prozess-Cache, sonst
+zeigten IDs nach einem Rollback ins Leere).
+"""
+import re
+import sqlite3
+from itertools import islice
+
+_CHUNK = 500  # Platzhalter pro IN (…)
+
+def normalize_artikel(text) -> str:
+    """Kleinbuchstaben, Leerraum zusammengefasst – Vergleichsschlüssel Excel ↔ PDF."""
+    return re.sub(r"\s+", " ", str(text).lower()).strip()
+
+def artikel_key(text) -> str | None:
+    """Eindeutiger Schlüssel in artikel.bezeichnung; leer/None → kein Artikel."""
+    if text is None:
+        return None
+    key = str(text).strip(" ")  # wie SQL TRIM()
+    return key or None
+
+def mit_artikel_id(columns: list[str]) -> list[str]:
+    """Spalten eines Schreibvorgangs inkl. artikel_id, wenn artikel_bezeichnung geschrieben wird."""
+    if "artikel_bezeichnung" not in columns or "artikel_id" in columns:
+        return list(columns)
+    return list(columns) + ["artikel_id"]
+
+class ArtikelLookup:
+    """Bezeichnung → artikel_id auf einer Verbindung; legt fehlende Artikel an."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._ids: dict[str, int] = {}
+
+    def ids(self, bezeichnungen, pharmacodes=None, packungen=None) -> list[int | None]:
+        """IDs in Eingabereihenfolge; pharmacodes/packungen ergänzen nur fehlende Stammdaten."""
+        keys = [artikel_key(b) for b in bezeichnungen]
+        fehlend = {}
+        for i, key in enumerate(keys):
+            if key is not None and key not in self._ids and key not in fehlend:
+                fehlend[key] = (
+                    None if pharmacodes is None else pharmacodes[i],
+                    None if packungen is None else packungen[i],
+                )
+        if fehlend:
+            self._aufloesen(fehlend)
+        return [None if key is None else self._ids[key] for key in keys]
+
+    def id(self, bezeichnung, pharmacode=None, packung=None) -> int | None:
+        return self.ids([bezeichnung], [pharmacode], [packung])[0]
+
+    def add_ids(self, columns: list[str], records: list[tuple]) -> tuple[list[str], list[tuple]]:
+        """Spalte artikel_id an Tupel mit artikel_bezeichnung anhängen (unverändert, falls schon da)."""
+        if mit_artikel_id(columns) == list(columns):
+            return columns, records
+        spalte = columns.index
+        namen = [r[spalte("artikel_bezeichnung")] for r in records]
+        codes = [r[spalte("pharmacode")] for r in records] if "pharmacode" in columns else None
+        packungen = None
+        for pack_spalte in ("ein_pack", "aus_pack"):
+            if pack_spalte in columns:
+                werte = [r[spalte(pack_spalte)] or None for r in records]
+                packungen = werte if packungen is None else [a or b for a, b in zip(packungen, werte)]
+        ids = self.ids(namen, codes, packungen)
+        return columns + ["artikel_id"], [r + (i,) for r, i in zip(records, ids)]
+
+    def _aufloesen(self, fehlend: dict):
+        it = iter(fehlend.items())
+        while chunk := list(islice(it, _CHUNK)):
+            # Bestehende Artikel behalten ihre Stammdaten, Lücken werden gefüllt
+            self.conn.executemany("""
+                INSERT INTO artikel(bezeichnung, bezeichnung_norm, pharmacode, packungsgroesse)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(bezeichnung) DO UPDATE SET
+                  pharmacode = COALESCE(artikel.pharmacode, excluded.pharmacode),
+                  packungsgroesse = COALESCE(artikel.packungsgroesse, excluded.packungsgroesse)
+                WHERE (artikel.pharmacode IS NULL AND excluded.pharmacode IS NOT NULL)
+                   OR (artikel.packungsgroesse IS NULL AND excluded.packungsgroesse IS NOT NULL)
+            """, [
+                (key, normalize_artikel(key), None if code is None else str(code), pack)
+                for key, (code, pack) in chunk
+            ])
+            keys = [key for key, _ in chunk]
+            self._ids.update(self.conn.execute(
+                f"SELECT bezeichnung, id FROM artikel WHERE bezeichnung IN ({','.join('?' * len(keys))})", keys
+            ).fetchall())
+
+def resolve_artikel_ids(conn: sqlite3.Connection) -> int:
+    """
+    artikel_id aller Bewegungen nachziehen, deren Verweis fehlt oder nicht
+    (mehr) zur Bezeichnung passt – Migration und bestand.py --rebuild.
+    """
+    falsch = conn.execute("""
+        SELECT b.id, b.artikel_bezeichnung, b.pharmacode
+        FROM bewegungen b LEFT JOIN artikel a ON a.id = b.artikel_id
+        WHERE a.bezeichnung IS NOT NULLIF(TRIM(b.artikel_bezeichnung), '')
+    """).fetchall()
+    if not falsch:
+        return 0
+    ids = ArtikelLookup(conn).ids([r[1] for r in falsch], [r[2] for r in falsch])
+    conn.executemany("UPDATE bewegungen SET artikel_id = ? WHERE id = ?", [(i, r[0]) for r, i in zip(falsch, ids)])
+    return len(falsch)
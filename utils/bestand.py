@@ -0,0 +1,219 @@
+# utils/bestand.py
+"""
+Materialisierter Bestand pro Artikel (Tabellen bestand + bestand_pharmacode,
+Schlüssel artikel_id).
+
+Trigger auf bewegungen (Migration 6, seit Migration 8 über artikel_id) halten
+die Summen bei jedem INSERT, UPDATE und DELETE aktuell; v_bestand liest nur
+noch diese Tabellen statt alle Bewegungen zu gruppieren. check_bestand()
+vergleicht mit der Vollberechnung über den Bezeichnungstext (prüft damit auch
+die artikel_id-Verweise), rebuild_bestand() baut beides neu auf.
+
+Stichtage (Tabelle bestand_stichtag, Migration 9): kumulierte Summen pro
+Artikel an jedem Monatsende. bestand_per() liest je Artikel dessen letzten
+Stichtag vor dem gewünschten Datum und addiert nur die Bewegungen seither
+(Bereichsscan über ix_bewegungen_artikel_id). Rückdatierte Bewegungen löschen
+per Trigger (Migration 11) die Stichtage ihres Artikels ab ihrem Datum und
+merken sich den frühesten davon (bestand_stichtag_stand, Migration 13);
+aktualisiere_stichtage() ergänzt fehlende Monate – nach jedem Import
+(ergaenze_stichtage()) und in bestand.py --rebuild, nie beim Lesen.
+Bewegungen ohne gültiges Datum stehen in keinem Stichtag; bestand_per() zählt
+sie wie v_bestand immer mit.
+
+    python bestand.py             # Konsistenz prüfen
+    python bestand.py --rebuild   # neu aufbauen (inkl. Stichtage)
+"""
+import sqlite3
+from datetime import date, timedelta
+from utils.artikel import resolve_artikel_ids
+from utils.datum import ISO_GLOB
+from utils.logger import log_import
+
+# Frühere v_bestand-Definition: Referenz für die Konsistenzprüfung
+BESTAND_VOLLSCAN_SQL = """
+SELECT
+  TRIM(artikel_bezeichnung) AS artikel_bezeichnung,
+  COUNT(DISTINCT pharmacode) AS pharmacode_count,
+  MIN(pharmacode) AS sample_pharmacode,
+  MAX(datum) AS letzte_bewegung,
+  SUM(COALESCE(eingang,0)) AS total_eingang,
+  SUM(COALESCE(ausgang,0)) AS total_ausgang,
+  SUM(COALESCE(eingang,0)) - SUM(COALESCE(ausgang,0)) AS saldo
+FROM bewegungen
+WHERE artikel_bezeichnung IS NOT NULL AND TRIM(artikel_bezeichnung) <> ''
+GROUP BY TRIM(artikel_bezeichnung)
+"""
+
+# Summen pro artikel_id bis :stichtag = letzter Stichtag des Artikels ≤ :stichtag + Bewegungen danach
+# (nur datierte Bewegungen: Grundlage der Stichtage selbst)
+_BESTAND_PER_SQL = f"""
+WITH basis AS (
+  SELECT a.id AS artikel_id,
+         (SELECT MAX(s.stichtag) FROM bestand_stichtag s WHERE s.artikel_id = a.id AND s.stichtag <= :stichtag) AS t
+  FROM artikel a
+),
+teile AS (
+  SELECT s.artikel_id, s.total_eingang AS e, s.total_ausgang AS a, s.letzte_bewegung AS l
+  FROM basis JOIN bestand_stichtag s ON s.stichtag = basis.t AND s.artikel_id = basis.artikel_id
+  UNION ALL
+  SELECT b.artikel_id, COALESCE(b.eingang,0), COALESCE(b.ausgang,0), b.datum
+  FROM basis JOIN bewegungen b ON b.artikel_id = basis.artikel_id
+  WHERE b.datum > COALESCE(basis.t, '') AND b.datum <= :stichtag AND b.datum GLOB '{ISO_GLOB}'
+  {{undatiert}}
+)
+SELECT artikel_id, SUM(e) AS total_eingang, SUM(a) AS total_ausgang, MAX(l) AS letzte_bewegung
+FROM teile
+GROUP BY artikel_id
+"""
+
+# Ohne (gültiges) Datum: zählt wie in v_bestand zu jedem Stichtag (Teilindex ix_bewegungen_undatiert)
+_UNDATIERT_SQL = f"""
+  UNION ALL
+  SELECT b.artikel_id, COALESCE(b.eingang,0), COALESCE(b.ausgang,0), b.datum
+  FROM bewegungen b
+  WHERE b.artikel_id IS NOT NULL AND (b.datum IS NULL OR b.datum NOT GLOB '{ISO_GLOB}')
+"""
+
+def _iso(stichtag) -> str:
+    return stichtag.isoformat() if isinstance(stichtag, date) else str(stichtag)
+
+def bestand_per_sql() -> str:
+    """Abfrage im Format von v_bestand (ohne Pharmacode-Spalten) für den Parameter :stichtag."""
+    return f"""
+    SELECT a.bezeichnung AS artikel_bezeichnung, s.letzte_bewegung, s.total_eingang, s.total_ausgang,
+           s.total_eingang - s.total_ausgang AS saldo
+    FROM ({_BESTAND_PER_SQL.format(undatiert=_UNDATIERT_SQL)}) s JOIN artikel a ON a.id = s.artikel_id
+    """
+
+def bestand_per(conn: sqlite3.Connection, stichtag) -> list[tuple]:
+    """Bestand aller Artikel am Ende des Tages stichtag (date oder ISO-Text)."""
+    return conn.execute(bestand_per_sql(), {"stichtag": _iso(stichtag)}).fetchall()
+
+def _monatsende(tag: date) -> date:
+    return (tag.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+def _letzter_abgeschlossener_monat() -> date:
+    return date.today().replace(day=1) - timedelta(days=1)
+
+def offene_stichtage(conn: sqlite3.Connection, bis: date | None = None) -> list[str]:
+    """
+    Monatsenden bis zum letzten abgeschlossenen Monat, an denen mindestens einem
+    Artikel der Stichtag fehlt: ab dem frühesten von den Triggern verworfenen
+    Stichtag bzw. dem Monat nach der letzten Ergänzung. Ohne bisherige Ergänzung
+    (neue Datenbank, --rebuild) wird pro Artikel ab seinem letzten Stichtag gesucht.
+    """
+    bis = bis or _letzter_abgeschlossener_monat()
+    offen_ab, gefuellt_bis = conn.execute("SELECT offen_ab, gefuellt_bis FROM bestand_stichtag_stand").fetchone()
+    if gefuellt_bis is not None:
+        naechster = _monatsende(date.fromisoformat(gefuellt_bis) + timedelta(days=1)).isoformat()
+        return _monatsenden(min(offen_ab or naechster, naechster), bis)
+    ab = conn.execute(f"""
+    SELECT MIN(CASE WHEN letzter IS NULL THEN date(erste, 'start of month', '+1 month', '-1 day')
+                    ELSE date(letzter, '+1 day', '+1 month', '-1 day') END)
+    FROM (
+      SELECT (SELECT MAX(stichtag) FROM bestand_stichtag s WHERE s.artikel_id = a.id) AS letzter,
+             (SELECT MIN(datum) FROM bewegungen b WHERE b.artikel_id = a.id AND b.datum GLOB '{ISO_GLOB}') AS erste
+      FROM artikel a
+    )
+    WHERE erste IS NOT NULL
+    """).fetchone()[0]
+    return _monatsenden(ab, bis) if ab is not None else []
+
+def _monatsenden(ab: str, bis: date) -> list[str]:
+    tag = date.fromisoformat(ab)
+    offen = []
+    while tag <= bis:
+        offen.append(tag.isoformat())
+        tag = _monatsende(tag + timedelta(days=1))
+    return offen
+
+def aktualisiere_stichtage(conn: sqlite3.Connection, bis: date | None = None) -> int:
+    """Fehlende Monatsend-Stichtage anlegen, jeder aus dem vorherigen (innerhalb der laufenden Transaktion)."""
+    bis = bis or _letzter_abgeschlossener_monat()
+    offen = offene_stichtage(conn, bis)
+    for stichtag in offen:
+        conn.execute(
+            "INSERT OR IGNORE INTO bestand_stichtag(stichtag, artikel_id, total_eingang, total_ausgang, letzte_bewegung) "
+            f"SELECT :stichtag, artikel_id, total_eingang, total_ausgang, letzte_bewegung FROM ({_BESTAND_PER_SQL.format(undatiert='')})",
+            {"stichtag": stichtag},
+        )
+    # Alles bis bis ist vollständig; spätere Monate folgen ab gefuellt_bis
+    conn.execute("UPDATE bestand_stichtag_stand SET offen_ab = NULL, gefuellt_bis = ?", (bis.isoformat(),))
+    return len(offen)
+
+def ergaenze_stichtage(conn: sqlite3.Connection) -> int:
+    """Nach einem Import: fehlende Stichtage in einer eigenen kurzen Schreibtransaktion ergänzen."""
+    if not offene_stichtage(conn):
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        anzahl = aktualisiere_stichtage(conn)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    log_import(f"📅 Stichtage ergänzt: {anzahl} Monatsenden")
+    return anzahl
+
+def rebuild_bestand(conn: sqlite3.Connection):
+    """artikel_id nachziehen, Bestandstabellen und Stichtage neu befüllen (innerhalb der laufenden Transaktion)."""
+    resolve_artikel_ids(conn)
+    conn.execute("DELETE FROM bestand")
+    conn.execute("DELETE FROM bestand_pharmacode")
+    conn.execute("""
+    INSERT INTO bestand(artikel_id, anzahl, total_eingang, total_ausgang, letzte_bewegung)
+    SELECT artikel_id, COUNT(*), SUM(COALESCE(eingang,0)), SUM(COALESCE(ausgang,0)), MAX(datum)
+    FROM bewegungen
+    WHERE artikel_id IS NOT NULL
+    GROUP BY artikel_id
+    """)
+    conn.execute("""
+    INSERT INTO bestand_pharmacode(artikel_id, pharmacode, anzahl)
+    SELECT artikel_id, pharmacode, COUNT(*)
+    FROM bewegungen
+    WHERE artikel_id IS NOT NULL AND pharmacode IS NOT NULL
+    GROUP BY artikel_id, pharmacode
+    """)
+    conn.execute("DELETE FROM bestand_stichtag")
+    conn.execute("UPDATE bestand_stichtag_stand SET offen_ab = NULL, gefuellt_bis = NULL")
+    aktualisiere_stichtage(conn)
+
+def check_bestand(conn: sqlite3.Connection) -> list[tuple]:
+    """
+    Abweichungen zwischen v_bestand und der Vollberechnung.
+    Jede Zeile: ("soll" | "ist", *v_bestand-Spalten); leer = konsistent.
+    """
+    return conn.execute(f"""
+    WITH soll AS ({BESTAND_VOLLSCAN_SQL}),
+         ist AS (SELECT * FROM v_bestand)
+    SELECT 'soll', * FROM (SELECT * FROM soll EXCEPT SELECT * FROM ist)
+    UNION ALL
+    SELECT 'ist', * FROM (SELECT * FROM ist EXCEPT SELECT * FROM soll)
+    ORDER BY 2, 1
+    """).fetchall()
+
+def check_stichtag(conn: sqlite3.Connection) -> list[tuple]:
+    """
+    Letzten Stichtag gegen die Vollberechnung bis zu diesem Tag prüfen; leer = konsistent.
+    Artikel ohne diesen Stichtag (nach rückdatierten Änderungen noch offen) zählen nicht.
+    """
+    letzter = conn.execute("SELECT MAX(stichtag) FROM bestand_stichtag").fetchone()[0]
+    if letzter is None:
+        return []
+    return conn.execute("""
+    WITH soll AS (
+      SELECT artikel_id, SUM(COALESCE(eingang,0)) AS e, SUM(COALESCE(ausgang,0)) AS a, MAX(datum) AS l
+      FROM bewegungen
+      WHERE datum <= :stichtag AND datum GLOB :iso
+        AND artikel_id IN (SELECT artikel_id FROM bestand_stichtag WHERE stichtag = :stichtag)
+      GROUP BY artikel_id
+    ),
+    ist AS (
+      SELECT artikel_id, total_eingang, total_ausgang, letzte_bewegung
+      FROM bestand_stichtag WHERE stichtag = :stichtag
+    )
+    SELECT 'soll', :stichtag, * FROM (SELECT * FROM soll EXCEPT SELECT * FROM ist)
+    UNION ALL
+    SELECT 'ist', :stichtag, * FROM (SELECT * FROM ist EXCEPT SELECT * FROM soll)
+    ORDER BY 3, 1
+    """, {"stichtag": letzter, "iso": ISO_GLOB}).fetchall()
@@ -0,0 +1,48 @@
+# utils/datum.py
+"""
+Datumswerte in bewegungen.datum: immer ISO-Text (JJJJ-MM-TT) oder NULL.
+
+Nur so sind Datumsfilter, ORDER BY datum und MAX(datum) reine Textvergleiche
+und laufen über die Indizes. Importer normalisieren mit iso_datum_series(),
+Formulare mit iso_datum(); ein Trigger (Migration 7) weist alles andere ab.
+Für die Anzeige wandelt anzeige_datum_series() zurück nach TT.MM.JJJJ.
+"""
+import re
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+
+ISO_GLOB = "[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]"
+
+_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+_DE = re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{4}|\d{2})$")
+
+def iso_datum(value) -> str | None:
+    """ISO, TT.MM.JJJJ / TT.MM.JJ, date/datetime → 'JJJJ-MM-TT'; unlesbar/leer → None."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (date, datetime, pd.Timestamp)):
+        return value.strftime("%Y-%m-%d")
+    text = str(value).strip()
+    if match := _ISO.match(text):
+        jahr, monat, tag = match.groups()
+    elif match := _DE.match(text):
+        tag, monat, jahr = match.groups()
+        jahr = "20" + jahr if len(jahr) == 2 else jahr
+    else:
+        return None
+    try:
+        return date(int(jahr), int(monat), int(tag)).isoformat()
+    except ValueError:
+        return None
+
+def iso_datum_series(series: pd.Series) -> pd.Series:
+    """Wie iso_datum(), aber nur einmal pro unterschiedlichem Wert (Berichte: wenige Tage, viele Zeilen)."""
+    codes, werte = pd.factorize(series)
+    iso = np.array([iso_datum(w) for w in werte] + [None], dtype=object)
+    return pd.Series(iso[codes], index=series.index, name=series.name, dtype=object)  # Code -1 (NaN) → None
+
+def anzeige_datum_series(series: pd.Series) -> pd.Series:
+    """ISO-Datum → TT.MM.JJJJ für Tabellen und Formulare; leer bei NULL."""
+    dt = pd.to_datetime(series, format="%Y-%m-%d", errors="coerce")
+    return dt.dt.strftime("%d.%m.%Y").fillna("")
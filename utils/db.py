@@ -0,0 +1,160 @@
+# utils/db.py
+"""
+Zentraler Datenbankzugriff für Seiten, Importer und Skripte.
+
+    get_connection()       Schreibverbindung, einmal pro Prozess (Autocommit, explizite Transaktionen)
+    get_read_connection()  Nur-Lese-Verbindung für die Ansichtsseiten (mode=ro)
+    transaction()          BEGIN IMMEDIATE … COMMIT/ROLLBACK auf der Schreibverbindung
+    read_sql()             DataFrame über die Lese-Verbindung
+    connect()              eigene Verbindung für Massen-Importe (gleiche Pragmas)
+
+Unter Streamlit werden die Verbindungen per st.cache_resource einmal pro
+Prozess angelegt und von allen Sessions geteilt, in Skripten über einen
+Prozess-Cache. WAL, synchronous, cache_size und busy_timeout werden beim
+Anlegen gesetzt – gleichzeitige Leser blockieren den Schreiber nicht, und
+konkurrierende Schreiber warten statt "database is locked" zu melden.
+Die erste Schreibverbindung pro Prozess und Datenbank führt offene
+Schema-Migrationen aus (utils/migrations.py).
+"""
+import functools
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+from utils.env import get_env_var
+from utils.migrations import migrate
+
+DB_PATH = get_env_var("DB_PATH", "data/laufende_liste.db")
+
+def busy_timeout_ms() -> int:
+    try:
+        return max(0, int(get_env_var("DB_BUSY_TIMEOUT_MS", "10000")))
+    except ValueError:
+        return 10000
+
+def apply_pragmas(conn: sqlite3.Connection, read_only: bool = False):
+    """busy_timeout und Page-Cache; für Schreibverbindungen zusätzlich WAL und synchronous."""
+    synchronous = get_env_var("SQLITE_SYNCHRONOUS", "NORMAL").strip().upper()
+    if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        synchronous = "NORMAL"
+    try:
+        cache_mb = max(1, int(get_env_var("SQLITE_CACHE_MB", "64")))
+    except ValueError:
+        cache_mb = 64
+    conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms()}")
+    conn.execute(f"PRAGMA cache_size=-{cache_mb * 1024}")  # negativ = KiB
+    if read_only:
+        conn.execute("PRAGMA query_only=1")
+        return
+    conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL reicht mit WAL: nach einem Absturz fehlt höchstens die letzte Transaktion
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+def connect(db_path: str | None = None, read_only: bool = False, shared: bool = False) -> sqlite3.Connection:
+    """Neue, fertig konfigurierte Verbindung (shared=True: von mehreren Threads nutzbar)."""
+    path = db_path or DB_PATH
+    if read_only:
+        uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=busy_timeout_ms() / 1000, check_same_thread=not shared)
+    else:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=busy_timeout_ms() / 1000, check_same_thread=not shared)
+    apply_pragmas(conn, read_only)
+    if not read_only:
+        ensure_schema(conn, path)
+    return conn
+
+_migriert: set[str] = set()
+_migrations_lock = threading.Lock()
+
+def ensure_schema(conn: sqlite3.Connection, db_path: str | None = None):
+    """Migrationen einmal pro Prozess und Datenbank ausführen."""
+    key = str(Path(db_path or DB_PATH).resolve())
+    if key in _migriert:
+        return
+    with _migrations_lock:
+        if key not in _migriert:
+            migrate(conn)
+            _migriert.add(key)
+
+# ---------- Verbindungen pro Prozess ----------
+
+def _streamlit():
+    """streamlit-Modul, wenn dieser Prozess eine Streamlit-App ausführt, sonst None."""
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return None  # nicht importiert → Skript/Worker, Streamlit gar nicht erst laden
+    from streamlit import runtime
+    return st if runtime.exists() else None
+
+# Verbindungen ausserhalb von Streamlit: (Funktion, Pfad) → Verbindung
+_verbindungen: dict[tuple[str, str], sqlite3.Connection] = {}
+_geerbt = []
+_cache_lock = threading.RLock()
+
+def _process_cache(func):
+    """st.cache_resource unter Streamlit, sonst ein Prozess-Cache."""
+    st_cached = None
+
+    @functools.wraps(func)
+    def wrapper(db_path: str | None = None):
+        nonlocal st_cached
+        db_path = db_path or DB_PATH
+        st = _streamlit()
+        if st is not None:
+            if st_cached is None:
+                st_cached = st.cache_resource(show_spinner=False)(func)
+            return st_cached(db_path)
+        key = (func.__name__, db_path)
+        conn = _verbindungen.get(key)
+        if conn is None:
+            with _cache_lock:
+                conn = _verbindungen.get(key)
+                if conn is None:
+                    conn = _verbindungen[key] = func(db_path)
+        return conn
+
+    return wrapper
+
+@_process_cache
+def get_connection(db_path: str | None = None) -> sqlite3.Connection:
+    conn = connect(db_path, shared=True)
+    conn.isolation_level = None  # Transaktionen nur über transaction()
+    return conn
+
+@_process_cache
+def get_read_connection(db_path: str | None = None) -> sqlite3.Connection:
+    get_connection(db_path)  # legt Datei und Schema an
+    return connect(db_path, read_only=True, shared=True)
+
+# Die Schreibverbindung wird von allen Sessions geteilt → Transaktionen serialisieren
+_write_lock = threading.RLock()
+
+@contextmanager
+def transaction(db_path: str | None = None):
+    """Schreibtransaktion auf der geteilten Verbindung; bei Fehlern Rollback."""
+    with _write_lock:
+        conn = get_connection(db_path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+def read_sql(sql: str, params=(), db_path: str | None = None) -> pd.DataFrame:
+    return pd.read_sql_query(sql, get_read_connection(db_path), params=params)
+
+def _nach_fork():
+    # Kind-Prozesse dürfen die SQLite-Handles des Elternprozesses weder benutzen noch
+    # schliessen → Referenzen behalten (kein close beim Aufräumen), Cache leeren
+    _geerbt.extend(_verbindungen.values())
+    _verbindungen.clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_nach_fork)
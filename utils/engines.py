@@ -0,0 +1,150 @@
+# utils/engines.py
+"""
+Austauschbare Extraktions-Engines hinter extract_table_rows_with_article.
+
+Eine Engine liest den Inhalt einer Seite (read_page) und macht daraus
+Bewegungszeilen (rows). Der Extraktor kümmert sich um Seitenreihenfolge,
+Prozess-Pool, Seiten-Cache und OCR-Fallback – für jede Engine gleich.
+
+    blocks  PyMuPDF get_text("text") + get_text("blocks"), Regex-Tokenizer (Standard)
+    words   PyMuPDF get_text("words"), Spalten per x-Position
+    pdfium  pypdfium2-Zeichenboxen → words-Tokenizer
+
+Neue Engines: Unterklasse von ExtractionEngine + register_engine().
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from utils.layouts import DocumentLayouts
+from utils.lieferanten import NamensMatcher
+from utils.page_cache import page_fingerprint
+from utils.rows import rows_from_page_text
+from utils.words_engine import rows_from_page_words
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # optional: pdfium-Engine nur, wenn installiert
+    pdfium = None
+
+class ExtractionEngine(ABC):
+    """Basis aller Engines; fehlende Methoden fallen schon beim Instanziieren auf."""
+    name = ""
+    lernt_spalten = False  # rows() legt Spaltenstarts in DocumentLayouts.columns ab
+
+    @contextmanager
+    def session(self, pdf_path: str):
+        """Engine-eigenes Dokument-Handle für die Dauer eines Durchlaufs (PyMuPDF: keins)."""
+        yield None
+
+    @abstractmethod
+    def read_page(self, page, handle):
+        """Seiteninhalt aus der fitz-Seite bzw. dem Engine-Handle."""
+
+    @abstractmethod
+    def has_text(self, content) -> bool:
+        ...
+
+    @abstractmethod
+    def fingerprint(self, content, lieferanten: NamensMatcher, layouts: DocumentLayouts) -> str:
+        ...
+
+    @abstractmethod
+    def rows(self, content, lieferanten: NamensMatcher, layouts: DocumentLayouts) -> list:
+        ...
+
+class BlocksEngine(ExtractionEngine):
+    name = "blocks"
+
+    def read_page(self, page, handle):
+        return page.get_text("text"), [block[4] for block in page.get_text("blocks")]
+
+    def has_text(self, content) -> bool:
+        return bool(content[0].strip())
+
+    def fingerprint(self, content, lieferanten, layouts) -> str:
+        # Das Layout kann aus einer früheren Seite mit gleichem Kopf stammen → gehört zum Schlüssel
+        return page_fingerprint(
+            content[0], content[1], lieferanten.get_version(), self.name, layouts.layout_for(content[0]).name
+        )
+
+    def rows(self, content, lieferanten, layouts) -> list:
+        return rows_from_page_text(content[0], content[1], lieferanten, layouts)
+
+class WordsEngine(ExtractionEngine):
+    name = "words"
+    lernt_spalten = True
+
+    def read_page(self, page, handle):
+        return page.get_text("words")
+
+    def has_text(self, content) -> bool:
+        return bool(content)
+
+    def fingerprint(self, content, lieferanten, layouts) -> str:
+        # Gelernte Spalten gehören zum Schlüssel: Seiten ohne Kopfzeile hängen von ihnen ab
+        return page_fingerprint(
+            "", [f"{w[0]:.1f},{w[1]:.1f},{w[4]}" for w in content],
+            lieferanten.get_version(), self.name, repr(sorted(layouts.columns.items()))
+        )
+
+    def rows(self, content, lieferanten, layouts) -> list:
+        return rows_from_page_words(content, lieferanten, layouts)
+
+class PdfiumEngine(WordsEngine):
+    """
+    Liest die Zeichen einer Seite mit pypdfium2 (Text + Zeichenboxen) und setzt
+    daraus Wörter im get_text("words")-Format zusammen; danach words-Tokenizer.
+    """
+    name = "pdfium"
+
+    @contextmanager
+    def session(self, pdf_path: str):
+        doc = pdfium.PdfDocument(pdf_path)
+        try:
+            yield doc
+        finally:
+            doc.close()
+
+    def read_page(self, page, handle):
+        pdf_page = handle[page.number]
+        textpage = pdf_page.get_textpage()
+        try:
+            hoehe = pdf_page.get_height()
+            anzahl = textpage.count_chars()
+            text = textpage.get_text_range(0, anzahl)
+            words = []
+            wort, box = [], None
+            for i, zeichen in enumerate(text[:anzahl]):
+                if zeichen.isspace():
+                    if wort:
+                        words.append((box[0], hoehe - box[3], box[2], hoehe - box[1], "".join(wort), 0, 0, len(words)))
+                        wort, box = [], None
+                    continue
+                left, bottom, right, top = textpage.get_charbox(i)
+                if box is None:
+                    box = [left, bottom, right, top]
+                else:
+                    box = [min(box[0], left), min(box[1], bottom), max(box[2], right), max(box[3], top)]
+                wort.append(zeichen)
+            if wort:
+                words.append((box[0], hoehe - box[3], box[2], hoehe - box[1], "".join(wort), 0, 0, len(words)))
+            return words
+        finally:
+            textpage.close()
+            pdf_page.close()
+
+_ENGINES: dict[str, ExtractionEngine] = {}
+
+def register_engine(engine: ExtractionEngine):
+    _ENGINES[engine.name] = engine
+
+def get_engine(name: str) -> ExtractionEngine:
+    """Engine zum Namen; unbekannte oder nicht installierte Engines → blocks."""
+    return _ENGINES.get(name) or _ENGINES["blocks"]
+
+def engine_names() -> list[str]:
+    return list(_ENGINES)
+
+register_engine(BlocksEngine())
+register_engine(WordsEngine())
+if pdfium is not None:
+    register_engine(PdfiumEngine())
@@ -1,154 +1,243 @@
-import csv
 import fitz
-import re
-from utils.logger import log_import
-from utils.parser import detect_bewegung_from_structured_tokens
-from utils.helpers import (
-    normalize,
-    slot_preserving_tokenizer_fixed,
-    clean_tokens_layout_a,
-    clean_trailing_empty_tokens,
-    extract_article_info
-)
-
-def extract_table_rows_with_article(pdf_path: str):
-    doc = fitz.open(pdf_path)
-    all_rows = []
-
-    # Lieferantenliste laden
-    lieferanten_set = set()
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from utils.engines import ExtractionEngine, engine_names, get_engine
+from utils.env import get_env_var
+from utils.layouts import DocumentLayouts
+from utils.lieferanten import NamensMatcher, get_lieferanten_matcher
+from utils.logger import log_stage
+from utils.ocr import get_ocr_workers, log_ocr_timing, needs_ocr, ocr_available, ocr_enabled, ocr_page, ocr_page_from_file
+from utils.page_cache import PageCache, page_cache_enabled
+from utils.words_engine import rows_from_page_words
+from utils.helpers import extract_article_info  # noqa: F401 (Re-Export für utils/__init__)
+
+# Ab dieser Seitenzahl lohnt sich der Prozess-Pool (Start-Overhead pro Worker)
+PARALLEL_MIN_PAGES = 8
+# Seitenbereiche pro Worker – mehr Bereiche = bessere Lastverteilung
+CHUNKS_PER_WORKER = 4
+
+def get_extract_workers() -> int:
+    """Anzahl Worker-Prozesse aus EXTRACT_WORKERS (Default 1 = sequentiell)."""
+    wert = get_env_var("EXTRACT_WORKERS", "1").strip().lower()
+    if wert == "auto":
+        return os.cpu_count() or 1
     try:
-        with open("data/lieferanten.csv", newline="", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if row:
-                    lieferanten_set.add(row[0].strip().upper())
-    except Exception:
-        pass
-
-    for page in doc:
-        text = page.get_text("text")
-        layout = "a" if "BG Rez.Nr." in text else "b"
-
-        # Artikel-Metadaten extrahieren
-        artikel_bezeichnung, belegnummer, packungsgroesse = "", "", 1
-        for line in text.splitlines():
-            if re.search(r"(?i)^medikament:", line):
-                meta = extract_article_info(line)
-                artikel_bezeichnung = meta["artikel_bezeichnung"]
-                belegnummer = meta["belegnummer"]
-                packungsgroesse = meta["packungsgroesse"]
+        return max(1, int(wert))
+    except ValueError:
+        return 1
+
+def get_extract_engine() -> str:
+    """Extraktions-Engine aus EXTRACT_ENGINE (Default blocks, siehe utils/engines.py)."""
+    engine = get_env_var("EXTRACT_ENGINE", "blocks").strip().lower()
+    return engine if engine in engine_names() else "blocks"
+
+def page_ranges(page_count: int, workers: int) -> list[tuple[int, int]]:
+    """Teilt [0, page_count) in zusammenhängende Bereiche (start, end) auf."""
+    chunks = max(1, min(page_count, workers * CHUNKS_PER_WORKER))
+    size, rest = divmod(page_count, chunks)
+    ranges, start = [], 0
+    for i in range(chunks):
+        end = start + size + (1 if i < rest else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+def extract_page_range(pdf_path: str, start: int, end: int, lieferanten: NamensMatcher, use_cache: bool = False, engine: str = "blocks", ocr: bool = False,
+                       columns: dict | None = None):
+    """
+    Worker: öffnet ein eigenes fitz-Dokument und extrahiert die Seiten [start, end).
+    columns: bis start gelernte Spaltenstarts (siehe learn_columns_until).
+    Gibt (rows, cache_stats) zurück.
+    """
+    rows = []
+    layouts = DocumentLayouts()
+    layouts.columns.update(columns or {})
+    cache = PageCache() if use_cache else None
+    extraktor = get_engine(engine)
+    try:
+        with fitz.open(pdf_path) as doc, extraktor.session(pdf_path) as handle:
+            for page_no in range(start, end):
+                rows.extend(extract_rows_from_page(doc[page_no], lieferanten, cache, extraktor, layouts, ocr, handle))
+    finally:
+        if cache is not None:
+            cache.close()
+    return rows, (cache.stats() if cache is not None else {"hits": 0, "misses": 0})
+
+def learn_columns_until(pdf_path: str, end: int, lieferanten: NamensMatcher, engine: str) -> dict:
+    """
+    Spaltenstarts, wie sie der sequentielle Durchlauf lernt: Seiten ab 0 bis zur
+    ersten mit Spaltenkopf (höchstens bis end). Leer für Engines ohne Spalten.
+    """
+    extraktor = get_engine(engine)
+    layouts = DocumentLayouts()
+    if not extraktor.lernt_spalten:
+        return layouts.columns
+    with fitz.open(pdf_path) as doc, extraktor.session(pdf_path) as handle:
+        for page_no in range(min(end, doc.page_count)):
+            content = extraktor.read_page(doc[page_no], handle)
+            if extraktor.has_text(content):
+                extraktor.rows(content, lieferanten, layouts)
+            if layouts.columns:
                 break
-
-        for block in page.get_text("blocks"):
-            block_text = block[4].strip()
-            rows = re.split(r"(?=\d{5,}\s+\d{2}\.\d{2}\.\d{4})", block_text)
-            for zeile in rows:
-                zeile = zeile.strip()
-                if not re.match(r"^\d{5,}\s+\d{2}\.\d{2}\.\d{4}", zeile):
-                    continue
-
-                tokens_raw = slot_preserving_tokenizer_fixed(zeile, layout)
-                tokens = clean_tokens_layout_a(tokens_raw) if layout == "a" else clean_trailing_empty_tokens(tokens_raw, 11)
-
-                if len(tokens) < 2:
-                    continue
-
-                if layout == "a":
-                    # Ab letzter Stelle rückwärts: so lange leere Tokens entfernen, bis bg_rez_nr erkennbar ist
-                    tokens_cleaned = list(tokens)
-                    while tokens_cleaned and tokens_cleaned[-1] == "":
-                        tokens_cleaned.pop()
-
-                    if len(tokens_cleaned) < 4:
-                        log_import(f"❌ Zu wenige Tokens für Layout A nach Bereinigung: {tokens_cleaned}")
-                        continue
-
-                    bewegung_tokens = tokens_cleaned[-4:]  # ['ein', 'aus', 'lager', 'bg_rez_nr']
-                    kopf_tokens = tokens[:len(tokens_cleaned) - 4]
-
-                else:
-                    bewegung_tokens = tokens[-4:]  # ['ein', 'aus', 'lager', '']
-                    kopf_tokens = tokens[:-4]
-
-                # Basisdaten
-                lfdnr = kopf_tokens[0] if len(kopf_tokens) > 0 else ""
-                datum = kopf_tokens[1] if len(kopf_tokens) > 1 else ""
-                kundennr = kopf_tokens[2] if len(kopf_tokens) > 2 and kopf_tokens[2].isdigit() else ""
-
-                lieferant = ""
-                for idx, token in enumerate(kopf_tokens):
-                    log_import(f"🔍 Kopf-Token {idx}: '{token}' | Normalisiert: '{normalize(token)}'")
-                    if normalize(token) in {normalize(l) for l in lieferanten_set}:
-                        lieferant = token.strip()
-                        log_import(f"✅ MATCH mit Lieferant: '{lieferant}'")
-                        break
-
-                # 🧠 Namensfelder nur extrahieren wenn kein Lieferant
-                name, vorname = "", ""
-                if not lieferant:
-                    name_tokens = kopf_tokens[3:] if kundennr else kopf_tokens[2:]
-                    name_cleaned = []
-                    for token in name_tokens:
-                        if re.match(r"^[A-Z]\d{6,}$", token):  # Arztnummer z. B. Z031031
-                            break
-                        name_cleaned.append(token)
-                    name_cleaned_str = " ".join(name_cleaned).strip()
-                    name_parts = name_cleaned_str.split()
-                    vorname = name_parts[0] if len(name_parts) > 1 else ""
-                    nachname = name_parts[1] if len(name_parts) > 1 else (name_parts[0] if name_parts else "")
-                    name = nachname if vorname else name_cleaned_str
-
-                log_import(f"✅ Erkannt als Lieferant: '{lieferant}'") if lieferant else log_import(f"❌ Kein Lieferant erkannt. Name: '{name}'")
-
-                # Bewegung erkennen
-                try:
-                    ein_mge, aus_mge, bg_rez_nr, dirty = detect_bewegung_from_structured_tokens(
-                        bewegung_tokens, layout, is_lieferant=bool(lieferant)
-                    )
-                    log_import(f"📦 Layout: {layout} | LfdNr: {lfdnr} | Ein={ein_mge} | Aus={aus_mge} | Dirty={dirty}")
-                except Exception as e:
-                    log_import(f"❌ Fehler Bewegung: {bewegung_tokens} → {e}")
-                    ein_mge, aus_mge, bg_rez_nr, dirty = 0, 0, "", True
-                
-                ein_pack, aus_pack = 0, 0
-                
-                if ein_mge > 0:
-                    ein_pack = meta["packungsgroesse"]
-                    log_import(f"EIN: {meta['packungsgroesse']}")
-                else:
-                    ein_pack = 0
-
-                if aus_mge > 0:
-                    aus_pack = meta["packungsgroesse"]
-                    log_import(f"AUS: {meta['packungsgroesse']}")
-                else:
-                    aus_pack = 0
-
-                row_dict = {
-                    "lfdnr": lfdnr,
-                    "datum": datum,
-                    "name": name,
-                    "vorname": vorname,
-                    "lieferant": lieferant,
-                    "ein_mge": ein_mge,
-                    "aus_mge": aus_mge,
-                    "ein_pack": ein_pack,
-                    "aus_pack": aus_pack,
-                    "bg_rez_nr": bg_rez_nr,
-                    "artikel_bezeichnung": artikel_bezeichnung,
-                    "belegnummer": belegnummer,
-                    "tokens": tokens,
-                    "liste": layout,
-                    "dirty": 1 if dirty else 0,
-                    "quelle": "pdf"
-                }
-
-                all_rows.append((row_dict, {
-                    "artikel_bezeichnung": artikel_bezeichnung,
-                    "belegnummer": belegnummer,
-                    "packungsgroesse": packungsgroesse
-                }, layout, dirty))
-                log_import(f"➡️ Row to be saved: {row_dict}")
-
-    return all_rows
+    return layouts.columns
+
+def extract_table_rows_with_article(pdf_path: str, workers: int | None = None, use_cache: bool | None = None, stats: dict | None = None, engine: str | None = None):
+    """
+    Extrahiert alle Bewegungszeilen inkl. Artikel-Metadaten aus dem PDF.
+    Mit workers > 1 werden Seitenbereiche auf einen Prozess-Pool verteilt;
+    das Ergebnis wird in Seitenreihenfolge zusammengeführt und ist identisch
+    mit dem sequentiellen Durchlauf (Spaltenkopf vorausgesetzt im ersten Bereich).
+    """
+    return list(iter_table_rows_with_article(pdf_path, workers, use_cache, stats, engine))
+
+def iter_table_rows_with_article(pdf_path: str, workers: int | None = None, use_cache: bool | None = None, stats: dict | None = None, engine: str | None = None):
+    """
+    Generator-Variante von extract_table_rows_with_article: liefert die Zeilen
+    Seite für Seite, ohne das ganze Dokument im Speicher zu sammeln.
+    Im Parallelmodus sind höchstens 2 × workers Seitenbereiche gleichzeitig in Arbeit.
+
+    Mit Seiten-Cache (use_cache bzw. PAGE_CACHE=1) werden nur unbekannte Seiten
+    tokenisiert; Treffer/Fehlschläge landen in stats (falls übergeben) und im Log.
+    engine: Name aus utils/engines.py, z. B. "blocks", "words", "pdfium" (Default aus EXTRACT_ENGINE).
+
+    Seiten ohne Textebene (Scans) werden per OCR gelesen (OCR=1, Default);
+    im sequentiellen Modus laufen sie vorab in einem eigenen Prozess-Pool.
+    """
+    if workers is None:
+        workers = get_extract_workers()
+    if engine is None:
+        engine = get_extract_engine()
+    if use_cache is None:
+        use_cache = page_cache_enabled()
+    if stats is None:
+        stats = {}
+    stats.update(hits=0, misses=0)
+
+    lieferanten = get_lieferanten_matcher()
+    ocr = ocr_enabled()
+
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+            cache = PageCache() if use_cache else None
+            layouts = DocumentLayouts()
+            ocr_pool, ocr_futures = _start_ocr(doc, pdf_path) if ocr else (None, {})
+            extraktor = get_engine(engine)
+            try:
+                with extraktor.session(pdf_path) as handle:
+                    for page in doc:
+                        future = ocr_futures.pop(page.number, None)
+                        if future is not None:
+                            page_no, words, timing = future.result()
+                            log_ocr_timing(page_no, words, timing)
+                            yield from rows_from_page_words(words, lieferanten, layouts)
+                        else:
+                            yield from extract_rows_from_page(page, lieferanten, cache, extraktor, layouts, ocr, handle)
+            finally:
+                if ocr_pool is not None:
+                    ocr_pool.shutdown(cancel_futures=True)
+                if cache is not None:
+                    cache.close()
+                    stats.update(cache.stats())
+                    _log_cache_stats(stats, page_count)
+            return
+
+    ranges = page_ranges(page_count, workers)
+    log_stage("document", "⚙️ Parallele Extraktion: %d Seiten, %d Bereiche, %d Worker", page_count, len(ranges), workers)
+    # Kopfzeile steht meist nur auf Seite 1: die daraus gelernten Spalten bekommt jeder
+    # spätere Bereich mit, sonst fielen seine Seiten auf die Block-Tokenisierung zurück.
+    # Der erste Bereich lernt selbst (Seiten vor dem Kopf wie sequentiell ohne Spalten).
+    spalten = learn_columns_until(pdf_path, ranges[0][1], lieferanten, engine)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Futures in Reihenfolge der Bereiche abarbeiten → Seitenreihenfolge bleibt erhalten
+        pending = deque()
+
+        def abholen():
+            rows, range_stats = pending.popleft().result()
+            stats["hits"] += range_stats["hits"]
+            stats["misses"] += range_stats["misses"]
+            return rows
+
+        for start, end in ranges:
+            pending.append(pool.submit(
+                extract_page_range, pdf_path, start, end, lieferanten, use_cache, engine, ocr, spalten if start else None
+            ))
+            if len(pending) >= workers * 2:
+                yield from abholen()
+        while pending:
+            yield from abholen()
+
+    if use_cache:
+        _log_cache_stats(stats, page_count)
+
+def _start_ocr(doc, pdf_path: str):
+    """Scan-Seiten des Dokuments vorab an einen OCR-Prozess-Pool geben → (pool, {seite: future})."""
+    seiten = [page.number for page in doc if needs_ocr(page)]
+    if not seiten:
+        return None, {}
+    if not ocr_available():
+        log_stage("document", "⚠️ %d Seiten ohne Textebene, OCR nicht verfügbar → keine Zeilen", len(seiten), level="warning")
+        return None, {}
+    workers = min(get_ocr_workers(), len(seiten))
+    log_stage("document", "🔎 %d Seiten ohne Textebene → OCR mit %d Prozessen", len(seiten), workers)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    return pool, {page_no: pool.submit(ocr_page_from_file, pdf_path, page_no) for page_no in seiten}
+
+def _rows_from_ocr(page, lieferanten: NamensMatcher, layouts: DocumentLayouts) -> list:
+    """OCR direkt im aktuellen Prozess (Parallelmodus bzw. nicht vorab erkannte Scan-Seiten)."""
+    if not ocr_available():
+        log_stage("document", "⚠️ Seite %d ohne Textebene, OCR nicht verfügbar", page.number + 1, level="warning")
+        return []
+    words, timing = ocr_page(page)
+    log_ocr_timing(page.number, words, timing)
+    return rows_from_page_words(words, lieferanten, layouts)
+
+def _log_cache_stats(stats: dict, page_count: int):
+    log_stage(
+        "document", "🗄️ Seiten-Cache: %d Treffer, %d neu geparst (%d Seiten)",
+        stats["hits"], stats["misses"], page_count
+    )
+
+def extract_rows_from_page(
+    page,
+    lieferanten: NamensMatcher,
+    cache: PageCache | None = None,
+    engine: str | ExtractionEngine = "blocks",
+    layouts: DocumentLayouts | None = None,
+    ocr: bool = False,
+    handle=None,
+) -> list:
+    """
+    Zeilen einer Seite. layouts hält erkannte Layouts und (words-Engine) die
+    gelernten Spaltenstarts über die Seiten eines Dokuments hinweg.
+    Mit ocr=True werden Seiten ohne Text, aber mit Bildern per OCR gelesen.
+    handle: Dokument aus engine.session() (nur für Engines ausserhalb von PyMuPDF).
+    """
+    if layouts is None:
+        layouts = DocumentLayouts()
+    if isinstance(engine, str):
+        engine = get_engine(engine)
+
+    content = engine.read_page(page, handle)
+    if not engine.has_text(content) and ocr and page.get_images():
+        return _rows_from_ocr(page, lieferanten, layouts)
+
+    if cache is None:
+        return engine.rows(content, lieferanten, layouts)
+
+    # Eintrag = (Zeilen, auf dieser Seite gelernte Spalten): ein Treffer übernimmt die Spalten
+    # wie ein echter Durchlauf, sonst hingen Schlüssel und Ergebnis der Folgeseiten vom Cache ab
+    fingerprint = engine.fingerprint(content, lieferanten, layouts)
+    eintrag = cache.get(fingerprint)
+    if eintrag is None:
+        vorher = dict(layouts.columns)
+        rows = engine.rows(content, lieferanten, layouts)
+        gelernt = {layout: starts for layout, starts in layouts.columns.items() if vorher.get(layout) != starts}
+        cache.put(fingerprint, (rows, gelernt))
+        return rows
+    rows, gelernt = eintrag
+    layouts.columns.update(gelernt)
+    return rows
@@ -1,52 +1,76 @@
 # filter_utils.py
+from collections.abc import Mapping
 import pandas as pd
-import streamlit as st
 import os
+from utils.db import read_sql
+from utils.suche import suche_sql
 
-def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    med_filter = st.session_state.get("med_filter", "").strip()
-    if med_filter:
-        df = df[df["artikel_bezeichnung"].str.contains(med_filter, case=False, na=False)]
+def filter_sql(state: Mapping) -> tuple[str, list]:
+    """Sidebar-Filter (st.session_state) → WHERE-Bedingung (ohne "WHERE") und Parameter für bewegungen."""
+    bedingungen, params = [], []
 
-    pharma_filter = st.session_state.get("pharma_filter", "").strip()
-    if pharma_filter:
-        df = df[df["pharmacode"].astype(str).str.contains(pharma_filter, na=False)]
+    # "enthält"-Filter über den Volltextindex (utils.suche) statt Spalten-Scan
+    for key, spalte in (("med_filter", "artikel_bezeichnung"), ("pharma_filter", "pharmacode")):
+        text = state.get(key, "").strip()
+        if text:
+            sql, werte = suche_sql(text, spalte)
+            bedingungen.append(f"id IN ({sql})")
+            params += werte
 
-    name_filter = st.session_state.get("name_filter", "Alle")
-    if name_filter != "Alle":
-        df = df[df["name"] == name_filter]
+    for key, spalte in (
+        ("name_filter", "name"),
+        ("vorname_filter", "vorname"),
+        ("lieferant_filter", "lieferant"),
+        ("liste_filter", "liste"),
+        ("quelle_filter", "quelle"),
+    ):
+        wert = state.get(key, "Alle")
+        if wert != "Alle":
+            bedingungen.append(f"{spalte} = ?")
+            params.append(wert)
 
-    vorname_filter = st.session_state.get("vorname_filter", "Alle")
-    if vorname_filter != "Alle":
-        df = df[df["vorname"] == vorname_filter]
-
-    lieferant_filter = st.session_state.get("lieferant_filter", "Alle")
-    if lieferant_filter != "Alle":
-        df = df[df["lieferant"] == lieferant_filter]
-
-    liste_filter = st.session_state.get("liste_filter", "Alle")
-    if liste_filter != "Alle":
-        df = df[df["liste"] == liste_filter]
-
-    quelle_filter = st.session_state.get("quelle_filter", "Alle")
-    if quelle_filter != "Alle":
-        df = df[df["quelle"] == quelle_filter]
-
-    dirty_filter = st.session_state.get("dirty_filter", "Alle")
+    dirty_filter = state.get("dirty_filter", "Alle")
     if dirty_filter == "Ja":
-        df = df[df["dirty"] == True]
+        bedingungen.append("dirty = 1")
     elif dirty_filter == "Nein":
-        df = df[df["dirty"] == False]
+        bedingungen.append("dirty = 0")
 
-    datum_von = st.session_state.get("datum_von", None)
+    # datum ist ISO-Text (utils.datum) → Textvergleich über ix_bewegungen_datum
+    datum_von = state.get("datum_von", None)
     if datum_von:
-        df = df[pd.to_datetime(df["datum"], errors='coerce') >= pd.to_datetime(datum_von)]
-
-    datum_bis = st.session_state.get("datum_bis", None)
+        bedingungen.append("datum >= ?")
+        params.append(datum_von.isoformat())
+    datum_bis = state.get("datum_bis", None)
     if datum_bis:
-        df = df[pd.to_datetime(df["datum"], errors='coerce') <= pd.to_datetime(datum_bis)]
+        bedingungen.append("datum <= ?")
+        params.append(datum_bis.isoformat())
+
+    return " AND ".join(bedingungen) or "1 = 1", params
+
+def lade_seite(where: str, params: tuple, nach: tuple | None, seitengroesse: int,
+               db_path: str | None = None) -> tuple[pd.DataFrame, tuple | None]:
+    """
+    Eine Seite bewegungen sortiert nach (datum, id), ab dem Cursor nach = (datum, id) der
+    letzten Zeile der Vorseite (Keyset über ix_bewegungen_datum, kein OFFSET).
+    Gibt die Seite und den Cursor für die nächste zurück (None = letzte Seite).
+    """
+    if nach is not None:
+        datum, letzte_id = nach
+        if datum is None:
+            # NULL-Datum sortiert zuerst: restliche NULL-Zeilen, danach alle mit Datum
+            where += " AND (datum IS NOT NULL OR id > ?)"
+            params += (letzte_id,)
+        else:
+            where += " AND (datum, id) > (?, ?)"
+            params += (datum, letzte_id)
+    df = read_sql(f"SELECT * FROM bewegungen WHERE {where} ORDER BY datum, id LIMIT ?", params + (seitengroesse + 1,), db_path)
 
-    return df
+    weiter = None
+    if len(df) > seitengroesse:
+        df = df.iloc[:seitengroesse].copy()
+        letzte = df.iloc[-1]
+        weiter = (None if pd.isna(letzte["datum"]) else letzte["datum"], int(letzte["id"]))
+    return df, weiter
 
 def lade_lieferantenliste(pfad="data/lieferanten.csv"):
     if not os.path.exists(pfad):
@@ -1,25 +1,20 @@
 # utils/helpers.py
 import re
-import csv
 import unicodedata
-from utils.logger import log_import
+from utils.logger import log_stage, stage_enabled
+from utils.lieferanten import get_lieferanten_matcher
+from utils.layouts import get_layout
 import os
 from typing import List, Tuple
-import sqlite3
-
-DB_PATH = "data/laufende_liste.db"
 
 def get_env_var(key: str) -> str:
     return os.getenv(key, "")
 
 def is_lieferant(name: str) -> bool:
     lieferanten_path = get_env_var("LIEFERANTEN_PATH")
-    print(f"📦 LIEFERANTEN (helpers.py): {lieferanten_path}")  # Debug
     if not lieferanten_path:
         raise FileNotFoundError("❌ LIEFERANTEN_PATH wurde nicht aus .env geladen.")
-    with open(lieferanten_path, newline='', encoding="utf-8") as f:
-        reader = csv.reader(f)
-        return any(name.strip().lower() == row[0].strip().lower() for row in reader if row)
+    return get_lieferanten_matcher(lieferanten_path).ist_normalisiert(name)
 
 def detect_bewegung(ein_raw: str, aus_raw: str, lieferant: str):
     dirty = False
@@ -35,7 +30,7 @@ def detect_bewegung(ein_raw: str, aus_raw: str, lieferant: str):
         return ein, 0, False
     if aus and not ein:
         return 0, aus, False
-    log_import(f"🔎 erkannte Bewegung: Ein: {ein}, Aus: {aus}")
+    log_stage("row", "🔎 erkannte Bewegung: Ein: %s, Aus: %s", ein, aus)
 
     return 0, 0, True
 
@@ -69,20 +64,23 @@ def clean_name_and_bg_rez_nr(name: str, bg_rez_nr: str) -> tuple[str, str]:
     name_clean = re.sub(r"\s+", " ", name_clean)
     return name_clean, bg_rez_nr
 def slot_preserving_tokenizer_fixed(line: str, layout: str) -> list[str]:
-    log_import(f"\n🔍 Input-Zeile: {repr(line)}")
+    token_trace = stage_enabled("token")
+    if token_trace:
+        log_stage("token", "\n🔍 Input-Zeile: %r", line)
 
     if line.strip().lower().startswith("gesamt"):
         return []
 
     tokens = [t.strip() for t in line.split("\n")]
 
-    expected_len = 12 if layout == "a" else 11
+    expected_len = get_layout(layout).expected_len
     if len(tokens) < expected_len:
         tokens += [""] * (expected_len - len(tokens))
     elif len(tokens) > expected_len:
         tokens = tokens[:expected_len]
 
-    log_import(f"🎉 Tokens RAW: {tokens} (Anzahl: {len(tokens)})")
+    if token_trace:
+        log_stage("token", "🎉 Tokens RAW: %s (Anzahl: %d)", tokens, len(tokens))
     return tokens
 
 
@@ -136,7 +134,7 @@ def extract_article_info(line: str) -> dict:
 
 def detect_bewegung_from_structured_tokens(tokens: list[str], layout: str, is_lieferant: bool = False):
     """
-    Bewegungsextraktion robust für Layout A + B:
+    Bewegungsextraktion robust für alle registrierten Layouts (utils/layouts.py):
     - Layout A: ['ein', 'aus', 'lager', 'bg_rez_nr', 'abh']
     - Layout B: ['ein', 'aus', 'lager', '']
     """
@@ -155,18 +153,13 @@ def detect_bewegung_from_structured_tokens(tokens: list[str], layout: str, is_li
     # Standardwerte
     ein_raw, aus_raw, lager_raw, bg_rez_nr_raw = "", "", "", ""
 
-    if layout == "a":
-        if len(tokens_cleaned) >= 4:
-            ein_raw, aus_raw, lager_raw, bg_rez_nr_raw = tokens_cleaned[-4:]
-        else:
-            return 0, 0, "", True
-    elif layout == "b":
-        if len(tokens_cleaned) >= 3:
-            ein_raw = tokens_cleaned[-3]
-            aus_raw = tokens_cleaned[-2]
-            lager_raw = tokens_cleaned[-1]
-        else:
-            return 0, 0, "", True
+    # Relevante Slots: ein, aus, lager (+ bg_rez_nr, falls das Layout eine hat)
+    template = get_layout(layout)
+    relevant = template.bg_rez_slot + 1 if template.bg_rez_slot is not None else 3
+    if len(tokens_cleaned) >= relevant:
+        ein_raw, aus_raw, lager_raw = tokens_cleaned[-relevant:][:3]
+    else:
+        return 0, 0, "", True
 
     # Für Lieferant: nur EIN zählt
     if is_lieferant:
@@ -200,31 +193,3 @@ def clean_trailing_empty_tokens(tokens: list[str], expected_len: int) -> list[st
     while len(tokens) > expected_len and tokens[-1] == '':
         tokens = tokens[:-1]
     return tokens
-def ensure_views():
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.cursor()
-        cur.executescript("""
-        CREATE VIEW IF NOT EXISTS v_bewegung AS
-        SELECT
-          id, pharmacode, artikel_bezeichnung, liste, datum,
-          ein_mge, ein_pack, eingang,
-          aus_mge, aus_pack, ausgang,
-          COALESCE(eingang,0) - COALESCE(ausgang,0) AS total,
-          name, vorname, lieferant, prirez, faktura_nummer, quelle, bemerkung,
-          created_at, updated_at
-        FROM bewegungen;
-
-        CREATE VIEW IF NOT EXISTS v_bestand AS
-        SELECT
-          TRIM(artikel_bezeichnung) AS artikel_bezeichnung,
-          COUNT(DISTINCT pharmacode) AS pharmacode_count,
-          MIN(pharmacode) AS sample_pharmacode,
-          MAX(datum) AS letzte_bewegung,
-          SUM(COALESCE(eingang,0)) AS total_eingang,
-          SUM(COALESCE(ausgang,0)) AS total_ausgang,
-          SUM(COALESCE(eingang,0)) - SUM(COALESCE(ausgang,0)) AS saldo
-        FROM bewegungen
-        WHERE artikel_bezeichnung IS NOT NULL AND TRIM(artikel_bezeichnung) <> ''
-        GROUP BY TRIM(artikel_bezeichnung);
-        """)
-        conn.commit()
\ No newline at end of file
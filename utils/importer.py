@@ -1,28 +1,372 @@
 # utils/importer.py
 import sqlite3
+import time
+from collections import Counter
+from contextlib import ExitStack
+from itertools import islice
+from typing import NamedTuple
 import pandas as pd
+from utils.artikel import ArtikelLookup, mit_artikel_id
+from utils.bestand import ergaenze_stichtage
+from utils.db import connect
 from utils.logger import log_import
 from utils.env import get_env_var
 
-DB_PATH = get_env_var("DB_PATH", fallback="data/laufende_liste.db")
+ALLOWED_COLS = [
+    "datum", "name", "vorname", "lieferant",
+    "ein_mge", "ein_pack", "aus_mge", "aus_pack", "bg_rez_nr",
+    "artikel_bezeichnung", "belegnummer",
+    "dirty", "liste", "quelle", "natural_key"
+]
 
-def run_import(parsed_df: pd.DataFrame):
+# Natürlicher Schlüssel einer PDF-Bewegung: dieselbe Zeile aus einem erneut
+# importierten Bericht trifft denselben Schlüssel → Upsert statt Duplikat
+NATURAL_KEY_PDF = ["quelle", "belegnummer", "lfdnr", "datum", "artikel_bezeichnung"]
+
+class ImportResult(NamedTuple):
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0   # Schlüssel vorhanden, Werte unverändert
+    deleted: int = 0   # nur merge_replace: Zeilen im Bereich ohne Gegenstück
+
+    @property
+    def rows(self) -> int:
+        return self.inserted + self.updated + self.skipped
+
+    def __add__(self, other):
+        return ImportResult(*(a + b for a, b in zip(self, other)))
+
+def add_natural_key(df: pd.DataFrame, key_columns: list[str], zaehler: Counter | None = None) -> pd.DataFrame:
+    """
+    Spalte natural_key aus key_columns (fehlende Spalten/NA zählen als leer).
+    Gleiche Schlüsselteile innerhalb einer Datei werden durchnummeriert (#0, #1, …),
+    damit echte Doppelbuchungen erhalten bleiben. Kommt eine Datei in mehreren
+    DataFrames (Streaming), zählt zaehler über alle Batches weiter.
+    """
+    teile = df.reindex(columns=key_columns).astype(object).fillna("").astype(str)
+    basis = teile.iloc[:, 0].str.cat([teile[c] for c in key_columns[1:]], sep="|")
+    nummer = basis.groupby(basis).cumcount()
+    if zaehler is not None:
+        nummer += basis.map(zaehler).astype(int)  # Counter liefert 0 für neue Schlüssel
+        zaehler.update(basis.value_counts().to_dict())
+    return df.assign(natural_key=basis + "#" + nummer.astype(str))
+
+def _select_import_columns(parsed_df: pd.DataFrame) -> pd.DataFrame:
+    return parsed_df[[col for col in ALLOWED_COLS if col in parsed_df.columns]]
+
+def _log_result(result: ImportResult, suffix: str = ""):
+    log_import(
+        f"✅ {result.rows} Zeilen in DB importiert{suffix}: "
+        f"{result.inserted} neu, {result.updated} aktualisiert, {result.skipped} unverändert."
+    )
+
+def run_import(parsed_df: pd.DataFrame) -> ImportResult:
+    """Upsert eines geparsten PDFs über natural_key; erneute Importe erzeugen keine Duplikate."""
     if not isinstance(parsed_df, pd.DataFrame):
         log_import("❌ Fehler: Übergabe ist kein DataFrame")
-        return
+        return ImportResult()
     if parsed_df.empty:
         log_import("⚠️ Keine gültigen Zeilen zum Import.")
-        return
+        return ImportResult()
+
+    columns, records = dataframe_to_records(add_natural_key(parsed_df, NATURAL_KEY_PDF))
+    # Ein PDF = eine Transaktion: bei Fehlern bleibt nichts halb importiert
+    with BulkWriter(columns, atomic=True, label="PDF-Import") as writer:
+        writer.write(records)
+    _log_result(writer.result)
+    return writer.result
+
+def run_import_stream(parsed_batches) -> ImportResult:
+    """
+    Importiert einen Iterator von DataFrames über eine Verbindung und
+    committet nach jedem Batch – die ersten Zeilen sind sofort in der DB sichtbar.
+    """
+    writer = None
+    zaehler = Counter()  # Doppelbuchungen über Batch-Grenzen hinweg weiter nummerieren
+    with ExitStack() as stack:
+        for batch_no, parsed_df in enumerate(parsed_batches, start=1):
+            if not isinstance(parsed_df, pd.DataFrame) or parsed_df.empty:
+                continue
+            columns, records = dataframe_to_records(add_natural_key(parsed_df, NATURAL_KEY_PDF, zaehler))
+            if writer is None:
+                writer = stack.enter_context(BulkWriter(columns, atomic=True, label="PDF-Import (Streaming)"))
+            writer.write(records)
+            writer.commit()
+            log_import(f"💾 Batch {batch_no}: {len(records)} Zeilen committet (gesamt {writer.rows})")
+
+    result = writer.result if writer is not None else ImportResult()
+    if result.rows == 0:
+        log_import("⚠️ Keine gültigen Zeilen zum Import.")
+    else:
+        _log_result(result, " (Streaming)")
+    return result
+
+def dataframe_to_records(parsed_df: pd.DataFrame, columns: list[str] | None = None) -> tuple[list[str], list[tuple]]:
+    """
+    Spalten + SQLite-taugliche Tupel (None statt NaN/NA, Python- statt numpy-Typen).
+    Ohne columns werden die ALLOWED_COLS der PDF-Importe übernommen.
+    """
+    df_clean = _select_import_columns(parsed_df) if columns is None else parsed_df[columns]
+    df_clean = df_clean.astype(object)
+    df_clean = df_clean.where(pd.notna(df_clean), None)
+    return list(df_clean.columns), list(df_clean.itertuples(index=False, name=None))
+
+def _on_conflict(columns: list[str]) -> str:
+    werte = [c for c in columns if c != "natural_key"]
+    setzen = ", ".join(f"{c} = excluded.{c}" for c in werte)
+    anders = " OR ".join(f"{c} IS NOT excluded.{c}" for c in werte)
+    return f" ON CONFLICT(natural_key) DO UPDATE SET {setzen} WHERE {anders}"
+
+def upsert_sql(columns: list[str], table: str = "bewegungen") -> str:
+    """
+    INSERT … ON CONFLICT(natural_key): geänderte Werte werden überschrieben,
+    unveränderte Zeilen nicht angefasst (changes() = 0 → skipped).
+    """
+    sql = f"INSERT INTO {table} ({','.join(columns)}) VALUES ({','.join(['?'] * len(columns))})"
+    if "natural_key" not in columns:
+        return sql
+    return sql + _on_conflict(columns)
+
+_CHUNK = 500  # Platzhalter pro IN (…)
+
+def _vorhandene_schluessel(conn: sqlite3.Connection, table: str, keys: set) -> set:
+    it = iter(keys)
+    vorhanden = set()
+    while chunk := list(islice(it, _CHUNK)):
+        vorhanden.update(row[0] for row in conn.execute(
+            f"SELECT natural_key FROM {table} WHERE natural_key IN ({','.join('?' * len(chunk))})", chunk
+        ))
+    return vorhanden
+
+def upsert_records(conn: sqlite3.Connection, columns: list[str], records: list[tuple],
+                   table: str = "bewegungen", sql: str | None = None) -> ImportResult:
+    """
+    Upsert von Tupeln ohne Commit (Transaktion steuert der Aufrufer; ohne
+    offene Transaktion wird hier eine begonnen).
+    Die schon vorhandenen Schlüssel werden vorab in derselben Transaktion
+    gelesen; neue und vorhandene Schlüssel gehen in getrennte executemany,
+    deren changes() genau inserted bzw. updated sind.
+    """
+    if not records:
+        return ImportResult()
+    sql = sql or upsert_sql(columns, table)
+    if "natural_key" not in columns:
+        conn.executemany(sql, records)
+        return ImportResult(inserted=len(records))
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")  # kein anderer Schreiber zwischen Lesen und Schreiben
+    schluessel = columns.index("natural_key")
+    vorhanden = _vorhandene_schluessel(conn, table, {r[schluessel] for r in records} - {None})
+    neue, bestehende = [], []
+    for record in records:
+        key = record[schluessel]
+        if key is None or key not in vorhanden:
+            neue.append(record)
+            vorhanden.add(key)  # Wiederholung im selben Batch → Upsert nach dem Insert
+        else:
+            bestehende.append(record)
+    neu = conn.executemany(sql, neue).rowcount if neue else 0
+    geaendert = conn.executemany(sql, bestehende).rowcount if bestehende else 0
+    return ImportResult(neu, geaendert, len(bestehende) - geaendert)
+
+# ---------- Gemeinsamer Schreibpfad ----------
+
+def get_write_batch_size() -> int:
+    """Zeilen pro executemany bzw. Transaktion aus IMPORT_WRITE_BATCH (Default 5000)."""
+    try:
+        return max(1, int(get_env_var("IMPORT_WRITE_BATCH", "5000")))
+    except ValueError:
+        return 5000
+
+class BulkWriter:
+    """
+    Schreibpfad aller Importer (PDF, Excel, Batch): ein vorbereitetes INSERT,
+    executemany in Batches von batch_size Zeilen, explizite Transaktionen.
+    Mit Spalte natural_key wird ge-upsertet; result zählt neu/aktualisiert/unverändert.
+    Enthält columns artikel_bezeichnung (aber kein artikel_id), wird artikel_id
+    pro Batch über ArtikelLookup ergänzt.
+
+    atomic=False  jede Batch ist eine eigene Transaktion
+    atomic=True   eine Transaktion bis commit() bzw. Ende des with-Blocks
+
+    Beim Schliessen werden Zeilen, Dauer und Zeilen/s geloggt und – nach Writes
+    in bewegungen – fehlende Monatsend-Stichtage einmal ergänzt.
+
+        with BulkWriter(columns, atomic=True, label="Liste a") as writer:
+            writer.execute("DELETE FROM bewegungen WHERE ...")
+            writer.write(records)
+    """
+
+    def __init__(self, columns: list[str], table: str = "bewegungen", db_path: str | None = None,
+                 batch_size: int | None = None, atomic: bool = False, label: str = "Import"):
+        self._quelle = list(columns)
+        self.columns = mit_artikel_id(self._quelle)
+        self.table = table
+        self.db_path = db_path
+        self.batch_size = batch_size or get_write_batch_size()
+        self.atomic = atomic
+        self.label = label
+        self.sql = upsert_sql(self.columns, table)
+        self.result = ImportResult()
+        self.rows = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self.conn = None
+        self._artikel = None
+        self._buffer = []
+        self._start = 0.0
+
+    def __enter__(self):
+        self.conn = connect(self.db_path)
+        self.conn.isolation_level = None  # Transaktionen steuert der Writer selbst
+        if self.columns != self._quelle:
+            self._artikel = ArtikelLookup(self.conn)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+                if self.table == "bewegungen":
+                    ergaenze_stichtage(self.conn)
+            else:
+                self._buffer.clear()
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+        finally:
+            self.seconds = time.perf_counter() - self._start
+            self.conn.close()
+        if exc_type is None:
+            log_import(
+                "⚡ %s: %d Zeilen in %d Batches, %.2fs (%.0f Zeilen/s) – %d neu, %d aktualisiert, %d unverändert",
+                self.label, self.rows, self.batches, self.seconds, self.rate,
+                self.result.inserted, self.result.updated, self.result.skipped
+            )
+        return False
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def _begin(self):
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+    def execute(self, sql: str, params=()):
+        """Weitere Anweisung (z. B. DELETE vor dem Ersetzen) in der laufenden Transaktion."""
+        self._flush()
+        self._begin()
+        return self.conn.execute(sql, params)
+
+    def write(self, records) -> int:
+        """Tupel puffern und je volle Batch schreiben; Liste oder Iterator."""
+        it = iter(records)
+        anzahl = 0
+        while chunk := list(islice(it, self.batch_size - len(self._buffer))):
+            self._buffer.extend(chunk)
+            anzahl += len(chunk)
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+        return anzahl
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        self._begin()
+        records = self._buffer
+        if self._artikel is not None:
+            _, records = self._artikel.add_ids(self._quelle, records)
+        self.result += upsert_records(self.conn, self.columns, records, self.table, self.sql)
+        self.rows += len(self._buffer)
+        self.batches += 1
+        self._buffer.clear()
+        if not self.atomic:
+            self.conn.execute("COMMIT")
+
+    def flush(self) -> ImportResult:
+        """Puffer sofort schreiben (z. B. für Zählungen pro Datei); liefert das bisherige result."""
+        self._flush()
+        return self.result
+
+    def commit(self):
+        self._flush()
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+
+# ---------- Staging + set-basierter Merge ----------
+
+def merge_replace(columns: list[str], records, scope: str, params=(), table: str = "bewegungen",
+                  db_path: str | None = None, label: str = "Merge") -> ImportResult:
+    """
+    Ersetzt alle Zeilen im Bereich scope (WHERE-Bedingung auf table) durch records,
+    set-basiert über eine Staging-Tabelle:
+
+      1. records per executemany in eine TEMP-Tabelle laden (sperrt die Haupt-DB nicht)
+      2. eine kurze Transaktion: Zeilen im Bereich ohne Gegenstück in der Staging-Tabelle
+         löschen, neue einfügen, geänderte aktualisieren (Upsert über natural_key)
+
+    Leser sehen dank WAL entweder den alten oder den neuen Stand; geschrieben wird
+    nur, was sich tatsächlich geändert hat.
+    """
+    if "natural_key" not in columns:
+        raise ValueError("merge_replace braucht die Spalte natural_key")
+    start = time.perf_counter()
+    conn = connect(db_path)
+    conn.isolation_level = None
+    try:
+        if mit_artikel_id(columns) != list(columns):
+            # Artikel vorab in einer kurzen eigenen Transaktion anlegen – Stammdaten
+            # ohne Bewegungen sind harmlos, falls der Merge danach scheitert
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                columns, records = ArtikelLookup(conn).add_ids(list(columns), list(records))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        spalten = ",".join(columns)
+        conn.execute("DROP TABLE IF EXISTS temp.staging")
+        # Gleiche Spaltenaffinität wie table → IS NOT vergleicht wie in der Zieltabelle
+        conn.execute(f"CREATE TEMP TABLE staging AS SELECT {spalten} FROM main.{table} WHERE 0")
 
-    allowed_cols = [
-        "datum", "name", "vorname", "lieferant",
-        "ein_mge", "ein_pack", "aus_mge", "aus_pack", "bg_rez_nr",
-        "artikel_bezeichnung", "belegnummer",
-        "dirty", "liste", "quelle"
-    ]
+        geladen = 0
+        it = iter(records)
+        conn.execute("BEGIN")
+        while chunk := list(islice(it, get_write_batch_size())):
+            conn.executemany(f"INSERT INTO temp.staging ({spalten}) VALUES ({','.join(['?'] * len(columns))})", chunk)
+            geladen += len(chunk)
+        conn.execute("CREATE UNIQUE INDEX temp.ux_staging_natural_key ON staging(natural_key)")
+        conn.execute("COMMIT")
+        gestaged = time.perf_counter()
 
-    df_clean = parsed_df[[col for col in allowed_cols if col in parsed_df.columns]]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            geloescht = conn.execute(f"""
+                DELETE FROM main.{table}
+                WHERE ({scope})
+                  AND NOT EXISTS (SELECT 1 FROM temp.staging s WHERE s.natural_key = {table}.natural_key)
+            """, params).rowcount
+            # Vorhandene und neue Schlüssel getrennt → changes() je Anweisung = aktualisiert bzw. neu.
+            # Die WHERE-Klausel trennt zugleich ON CONFLICT vom SELECT (sonst als Join-Bedingung gelesen)
+            einfuegen = f"INSERT INTO main.{table} ({spalten}) SELECT {spalten} FROM temp.staging s WHERE"
+            vorhanden = f"EXISTS (SELECT 1 FROM main.{table} t WHERE t.natural_key = s.natural_key)"
+            geaendert = conn.execute(f"{einfuegen} {vorhanden}" + _on_conflict(columns)).rowcount
+            neu = conn.execute(f"{einfuegen} NOT {vorhanden}").rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("DROP TABLE temp.staging")
+        if table == "bewegungen":
+            ergaenze_stichtage(conn)
+    finally:
+        conn.close()
 
-    with sqlite3.connect(DB_PATH) as conn:
-        df_clean.to_sql("bewegungen", conn, if_exists="append", index=False)
-        log_import(f"✅ {len(df_clean)} Zeilen erfolgreich in DB importiert.")
+    result = ImportResult(neu, geaendert, geladen - neu - geaendert, geloescht)
+    ende = time.perf_counter()
+    log_import(
+        "🔀 %s: %d Zeilen gestaged (%.2fs, %.0f Zeilen/s), Merge %.2fs – %d neu, %d aktualisiert, %d unverändert, %d gelöscht",
+        label, geladen, gestaged - start, geladen / max(gestaged - start, 1e-9), ende - gestaged, *result
+    )
+    return result
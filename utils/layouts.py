@@ -0,0 +1,102 @@
+# utils/layouts.py
+"""
+Registry der Berichtslayouts.
+
+Ein Layout beschreibt, woran es erkannt wird (Marker in der Kopfzeile) und wie
+seine Zeilen aufgebaut sind (Slots, Bewegungsslots, Position der BG Rez.Nr.).
+Neue Berichtstypen werden mit register_layout() ergänzt, ohne den Tokenizer
+anzufassen:
+
+    register_layout(LayoutTemplate("c", "Rezept-Nr.", expected_len=13, movement_slots=5, bg_rez_slot=3), first=True)
+
+DocumentLayouts merkt sich pro Dokument, welches Layout zu welcher Kopfzeile
+gehört, sowie die gelernte Spaltengeometrie (words-Engine).
+"""
+import re
+from typing import NamedTuple
+
+class LayoutTemplate(NamedTuple):
+    name: str                       # Wert für die Spalte 'liste'
+    marker: str | None              # Text in der Kopfzeile; None = Fallback-Layout
+    expected_len: int               # Slots pro Zeile
+    movement_slots: int             # Bewegungsslots am Zeilenende (ein, aus, lager, ...)
+    bg_rez_slot: int | None = None  # Index der BG Rez.Nr. innerhalb der Bewegungsslots
+
+_LAYOUTS: dict[str, LayoutTemplate] = {}
+
+def register_layout(template: LayoutTemplate, first: bool = False):
+    """Layout registrieren; Marker werden in Registrierungsreihenfolge geprüft (first=True → zuerst)."""
+    global _LAYOUTS
+    rest = {name: t for name, t in _LAYOUTS.items() if name != template.name}
+    _LAYOUTS = {template.name: template, **rest} if first else {**rest, template.name: template}
+
+def layouts() -> list[LayoutTemplate]:
+    return list(_LAYOUTS.values())
+
+def get_layout(name: str) -> LayoutTemplate:
+    """Template zum Layoutnamen; unbekannte Namen → Fallback-Layout."""
+    return _LAYOUTS.get(name) or fallback_layout()
+
+def fallback_layout() -> LayoutTemplate:
+    for template in _LAYOUTS.values():
+        if template.marker is None:
+            return template
+    return next(iter(_LAYOUTS.values()))
+
+def detect_layout(text: str) -> LayoutTemplate:
+    """Erstes Layout, dessen Marker im Text vorkommt, sonst das Fallback-Layout."""
+    for template in _LAYOUTS.values():
+        if template.marker is not None and template.marker in text:
+            return template
+    return fallback_layout()
+
+register_layout(LayoutTemplate("a", "BG Rez.Nr.", expected_len=12, movement_slots=5, bg_rez_slot=3))
+register_layout(LayoutTemplate("b", None, expected_len=11, movement_slots=4))
+
+# ---------- Kopfzeilen-Cache pro Dokument ----------
+
+DATENZEILE = re.compile(r"\d{5,}\s+\d{2}\.\d{2}\.\d{4}")
+
+def header_fingerprint(text: str) -> str:
+    """
+    Kopfbereich einer Seite (alles vor der ersten Datenzeile) ohne Medikament-Zeile
+    und ohne Ziffern – gleich für alle Seiten desselben Berichtskopfs.
+    """
+    match = DATENZEILE.search(text)
+    kopf = text[:match.start()] if match else ""
+    zeilen = (
+        re.sub(r"\d+", "", zeile).strip()
+        for zeile in kopf.splitlines()
+        if not zeile.lstrip().lower().startswith("medikament:")
+    )
+    return "\n".join(z for z in zeilen if z)
+
+class DocumentLayouts:
+    """
+    Layout-Cache für ein Dokument: die Marker werden nur beim ersten Auftreten
+    eines Seitenkopfs gesucht, Folgeseiten mit gleichem Kopf übernehmen das Layout.
+    columns hält die gelernten Spaltenstarts pro Layout (words-Engine).
+    """
+
+    def __init__(self):
+        self._templates: dict[str, LayoutTemplate] = {}
+        self.columns: dict[str, tuple[float, ...]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def detect(self, text: str) -> LayoutTemplate:
+        key = header_fingerprint(text)
+        if not key:
+            # Kein erkennbarer Kopf → nicht cachen, ganze Seite prüfen
+            return detect_layout(text)
+        template = self._templates.get(key)
+        if template is None:
+            self.misses += 1
+            template = self._templates[key] = detect_layout(text)
+        else:
+            self.hits += 1
+        return template
+
+    def layout_for(self, text: str) -> LayoutTemplate:
+        """Layout, das detect() für diese Seite liefern würde – ohne den Cache zu verändern."""
+        return self._templates.get(header_fingerprint(text)) or detect_layout(text)
@@ -0,0 +1,130 @@
+# utils/lieferanten.py
+import csv
+import hashlib
+import os
+import time
+import unicodedata
+from utils.env import get_env_var
+
+LIEFERANTEN_PATH = "data/lieferanten.csv"
+
+# Wie oft (Sekunden) höchstens die mtime der CSV geprüft wird
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Kopfzeilen der CSV-Dateien, die keine Namen sind
+HEADER_WERTE = {"name", "lieferant"}
+
+_ENDE = ""  # Markierung im Trie: hier endet ein Eintrag
+
+def schluessel(text: str) -> str:
+    """Normalisierter Vergleichsschlüssel: NFKC, Whitespace zusammengefasst, casefold."""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+class NamensMatcher:
+    """
+    Einmal geladener Index über die erste Spalte einer Namens-CSV
+    (Lieferanten). Wird neu geladen, sobald sich die mtime der Datei ändert.
+
+    - ist_exakt(text):       exakter Treffer (nur strip)
+    - ist_normalisiert(text): Treffer nach schluessel()
+    - hat_praefix(text):     ein Eintrag ist Präfix von schluessel(text) (Trie, O(len(text)))
+
+    Gross-/Kleinschreibung zählt bei ist_normalisiert/hat_praefix nicht. Der Extraktor
+    verglich früher Kopf-Tokens mit der grossgeschriebenen Liste, ohne die Tokens
+    umzuwandeln – "Mepha" aus lieferanten.csv wurde so nie erkannt, nur "MEPHA".
+    """
+
+    def __init__(self, pfad: str):
+        self.pfad = pfad
+        self._mtime = None
+        self._geprueft = 0.0
+        self._exakt = set()
+        self._normalisiert = set()
+        self._trie = {}
+        self.version = ""
+
+    def _laden(self):
+        exakt, normalisiert, trie = set(), set(), {}
+        try:
+            with open(self.pfad, newline="", encoding="utf-8") as f:
+                for row in csv.reader(f):
+                    if not row or not row[0].strip():
+                        continue
+                    wert = row[0].strip()
+                    if wert.lower() in HEADER_WERTE:
+                        continue
+                    key = schluessel(wert)
+                    exakt.add(wert)
+                    normalisiert.add(key)
+                    knoten = trie
+                    for zeichen in key:
+                        knoten = knoten.setdefault(zeichen, {})
+                    knoten[_ENDE] = True
+        except OSError:
+            pass
+        self._exakt, self._normalisiert, self._trie = exakt, normalisiert, trie
+        # Kennung des Listenstands, z. B. für Cache-Schlüssel
+        self.version = hashlib.sha1("\n".join(sorted(normalisiert)).encode("utf-8")).hexdigest()
+
+    def _aktualisieren(self):
+        jetzt = time.monotonic()
+        if self._mtime is not None and jetzt - self._geprueft < RELOAD_CHECK_INTERVAL:
+            return
+        self._geprueft = jetzt
+        try:
+            mtime = os.stat(self.pfad).st_mtime_ns
+        except OSError:
+            mtime = -1
+        if mtime != self._mtime:
+            self._laden()
+            self._mtime = mtime
+
+    def ist_exakt(self, text) -> bool:
+        if not isinstance(text, str):
+            return False
+        self._aktualisieren()
+        return text.strip() in self._exakt
+
+    def ist_normalisiert(self, text) -> bool:
+        if not isinstance(text, str):
+            return False
+        self._aktualisieren()
+        return schluessel(text) in self._normalisiert
+
+    def hat_praefix(self, text) -> bool:
+        if not isinstance(text, str):
+            return False
+        self._aktualisieren()
+        knoten = self._trie
+        for zeichen in schluessel(text):
+            knoten = knoten.get(zeichen)
+            if knoten is None:
+                return False
+            if _ENDE in knoten:
+                return True
+        return False
+
+    def get_version(self) -> str:
+        self._aktualisieren()
+        return self.version
+
+    def namen(self) -> list[str]:
+        self._aktualisieren()
+        return sorted(self._exakt)
+
+    def __len__(self):
+        self._aktualisieren()
+        return len(self._normalisiert)
+
+_MATCHER: dict[str, NamensMatcher] = {}
+
+def get_matcher(pfad: str) -> NamensMatcher:
+    """Ein Matcher pro Datei und Prozess."""
+    matcher = _MATCHER.get(pfad)
+    if matcher is None:
+        matcher = _MATCHER[pfad] = NamensMatcher(pfad)
+    return matcher
+
+def get_lieferanten_matcher(pfad: str | None = None) -> NamensMatcher:
+    return get_matcher(pfad or get_env_var("LIEFERANTEN_PATH", LIEFERANTEN_PATH))
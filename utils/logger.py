@@ -1,5 +1,9 @@
 # utils/logger.py
+import atexit
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from utils.env import get_env_var
 
@@ -8,29 +12,112 @@ log_path_str = get_env_var("LOG_PATH", "log/import.log")
 LOG_PATH = Path(log_path_str)
 LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-logging.basicConfig(
-    filename=LOG_PATH,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
+def _env_flag(key: str, default: bool) -> bool:
+    wert = get_env_var(key, "").strip().lower()
+    if not wert:
+        return default
+    return wert in ("1", "true", "yes", "ja", "on")
+
+# Hot-Path-Stufen des Imports: pro Token, pro Zeile, pro Dokument
+STAGES = ("token", "row", "document")
+
+# Queue-Backend: Datei-/Konsolen-I/O läuft in einem Listener-Thread statt im Parser
+LOG_QUEUE = _env_flag("LOG_QUEUE", True)
+# Token-Tracing komplett abschaltbar; in Produktion standardmässig aus
+LOG_TOKEN_TRACE = _env_flag("LOG_TOKEN_TRACE", get_env_var("APP_ENV", "dev").lower() != "prod")
+
+file_handler = logging.FileHandler(LOG_PATH, encoding="utf-8")
+file_handler.setFormatter(logging.Formatter(
+    "%(asctime)s [%(levelname)s] %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S"
-)
+))
 
 console = logging.StreamHandler()
 console.setLevel(logging.INFO)
 formatter = logging.Formatter("[%(levelname)s] %(message)s")
 console.setFormatter(formatter)
-logging.getLogger("").addHandler(console)
 
-def log_import(msg, level="info"):
+_root = logging.getLogger("")
+_root.setLevel(logging.INFO)
+
+_queue = None
+_listener = None
+_queue_handler = None
+
+if LOG_QUEUE:
+    _queue = queue.Queue(-1)
+    _queue_handler = QueueHandler(_queue)
+    _root.addHandler(_queue_handler)
+    _listener = QueueListener(_queue, file_handler, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+else:
+    _root.addHandler(file_handler)
+    _root.addHandler(console)
+
+def _direkt_nach_fork():
+    # Worker-Prozesse (ProcessPoolExecutor) erben den Listener-Thread nicht → direkt schreiben
+    global _queue_handler
+    if _queue_handler is not None:
+        _root.removeHandler(_queue_handler)
+        _root.addHandler(file_handler)
+        _root.addHandler(console)
+        _queue_handler = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_direkt_nach_fork)
+
+_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+def _stage_level(stage: str) -> int:
+    if stage == "token" and not LOG_TOKEN_TRACE:
+        return logging.CRITICAL + 1
+    name = get_env_var(f"LOG_LEVEL_{stage.upper()}", "INFO").strip().upper()
+    if name == "OFF":
+        return logging.CRITICAL + 1
+    lvl = logging.getLevelName(name)
+    return lvl if isinstance(lvl, int) else logging.INFO
+
+_stage_loggers = {}
+for _stage in STAGES:
+    _stage_loggers[_stage] = logging.getLogger(f"import.{_stage}")
+    _stage_loggers[_stage].setLevel(_stage_level(_stage))
+
+def log_import(msg, *args, level="info"):
     level = level.lower()
     if level == "debug":
-        logging.debug(msg)
+        logging.debug(msg, *args)
     elif level == "warning":
-        logging.warning(msg)
+        logging.warning(msg, *args)
     elif level == "error":
-        logging.error(msg)
+        logging.error(msg, *args)
     else:
-        logging.info(msg)
+        logging.info(msg, *args)
+
+def log_stage(stage: str, msg, *args, level="info"):
+    """
+    Lazy Logging für den Import-Hot-Path: msg wird erst mit args formatiert,
+    wenn die Stufe (token/row/document) auf diesem Level aktiv ist.
+    """
+    logger = _stage_loggers[stage]
+    lvl = _LEVELS.get(level.lower(), logging.INFO)
+    if logger.isEnabledFor(lvl):
+        logger.log(lvl, msg, *args)
+
+def stage_enabled(stage: str, level="info") -> bool:
+    """Für teure Argumente: vorab prüfen, ob die Stufe überhaupt geloggt wird."""
+    return _stage_loggers[stage].isEnabledFor(_LEVELS.get(level.lower(), logging.INFO))
+
+def flush_logs():
+    """Wartet, bis der Listener alle Einträge geschrieben hat (z. B. vor dem Lesen der Logdatei)."""
+    if _queue is not None and _queue_handler is not None:
+        _queue.join()
+    file_handler.flush()
 
 def get_log_path():
     return LOG_PATH
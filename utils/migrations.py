@@ -0,0 +1,582 @@
+# utils/migrations.py
+"""
+Versionierte Schema-Migrationen für laufende_liste.db.
+
+Der Stand steht in PRAGMA user_version. migrate() führt jede noch offene
+Migration genau einmal aus, jede in einer eigenen Transaktion zusammen mit
+dem Hochzählen der Version. utils.db ruft das einmal pro Prozess und
+Datenbank beim Öffnen der ersten Schreibverbindung auf – Seitenaufrufe
+führen danach keine DDL mehr aus.
+
+Neue Migration: Funktion schreiben und ans Ende von MIGRATIONS hängen
+(bestehende Einträge nie ändern oder umsortieren). Migrationen rufen keinen
+Anwendungscode auf: was sie brauchen, steht eingefroren in dieser Datei –
+sonst liefe eine alte Migration später mit geänderter Logik.
+
+    python migrate.py        # offene Migrationen ausführen, Version anzeigen
+"""
+import re
+import sqlite3
+from datetime import date
+from utils.logger import log_import
+
+# Stand von utils.datum bei Migration 7
+ISO_GLOB = "[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]"
+
+def _spalten(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _m001_baseline(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bewegungen (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      pharmacode TEXT, artikel_bezeichnung TEXT, liste TEXT, datum TEXT,
+      ein_mge INTEGER, ein_pack INTEGER, eingang INTEGER,
+      aus_mge INTEGER, aus_pack INTEGER, ausgang INTEGER, total INTEGER,
+      name TEXT, vorname TEXT, lieferant TEXT, ks TEXT, bemerkung TEXT, prirez TEXT,
+      faktura_nummer TEXT, belegnummer TEXT, bg_rez_nr TEXT, quelle TEXT, dirty INTEGER,
+      created_at TEXT, updated_at TEXT
+    )
+    """)
+
+def _m002_views(conn):
+    # Früher bei jedem Seitenaufruf per ensure_views() angelegt
+    conn.execute("DROP VIEW IF EXISTS v_bewegung")
+    conn.execute("""
+    CREATE VIEW v_bewegung AS
+    SELECT
+      id, pharmacode, artikel_bezeichnung, liste, datum,
+      ein_mge, ein_pack, eingang,
+      aus_mge, aus_pack, ausgang,
+      COALESCE(eingang,0) - COALESCE(ausgang,0) AS total,
+      name, vorname, lieferant, prirez, faktura_nummer, quelle, bemerkung,
+      created_at, updated_at
+    FROM bewegungen
+    """)
+    conn.execute("DROP VIEW IF EXISTS v_bestand")
+    conn.execute("""
+    CREATE VIEW v_bestand AS
+    SELECT
+      TRIM(artikel_bezeichnung) AS artikel_bezeichnung,
+      COUNT(DISTINCT pharmacode) AS pharmacode_count,
+      MIN(pharmacode) AS sample_pharmacode,
+      MAX(datum) AS letzte_bewegung,
+      SUM(COALESCE(eingang,0)) AS total_eingang,
+      SUM(COALESCE(ausgang,0)) AS total_ausgang,
+      SUM(COALESCE(eingang,0)) - SUM(COALESCE(ausgang,0)) AS saldo
+    FROM bewegungen
+    WHERE artikel_bezeichnung IS NOT NULL AND TRIM(artikel_bezeichnung) <> ''
+    GROUP BY TRIM(artikel_bezeichnung)
+    """)
+
+def _m003_natural_key(conn):
+    # Upsert-Schlüssel der Importer; Altbestand ohne Schlüssel bleibt NULL
+    if "natural_key" not in _spalten(conn, "bewegungen"):
+        conn.execute("ALTER TABLE bewegungen ADD COLUMN natural_key TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_bewegungen_natural_key ON bewegungen(natural_key)")
+
+def _m004_import_runs(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS import_runs (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      sha256 TEXT NOT NULL,
+      filename TEXT,
+      status TEXT NOT NULL,
+      rows INTEGER,
+      forced INTEGER DEFAULT 0,
+      started_at TEXT,
+      finished_at TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_import_runs_sha256 ON import_runs(sha256, status)")
+
+def _m005_query_indexes(conn):
+    # Filter der Seiten (Quelle/Liste/Datum, Artikel, Lieferant, Name) und Delta-Abgleich (Beleg + Datum)
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS ix_bewegungen_quelle_liste_datum ON bewegungen(quelle, liste, datum)",
+        "CREATE INDEX IF NOT EXISTS ix_bewegungen_datum ON bewegungen(datum, id)",
+        "CREATE INDEX IF NOT EXISTS ix_bewegungen_artikel ON bewegungen(artikel_bezeichnung, datum)",
+        "CREATE INDEX IF NOT EXISTS ix_bewegungen_lieferant ON bewegungen(lieferant, datum)",
+        "CREATE INDEX IF NOT EXISTS ix_bewegungen_name ON bewegungen(name, vorname)",
+        "CREATE INDEX IF NOT EXISTS ix_bewegungen_beleg ON bewegungen(belegnummer, datum, quelle)",
+    ):
+        conn.execute(sql)
+    conn.execute("ANALYZE bewegungen")
+
+# Trigger-Bausteine für den materialisierten Bestand (utils/bestand.py)
+_BESTAND_ABZIEHEN = """
+  UPDATE bestand SET
+    anzahl = anzahl - 1,
+    total_eingang = total_eingang - COALESCE(OLD.eingang,0),
+    total_ausgang = total_ausgang - COALESCE(OLD.ausgang,0),
+    letzte_bewegung = CASE WHEN OLD.datum IS letzte_bewegung
+      THEN (SELECT MAX(datum) FROM bewegungen WHERE TRIM(artikel_bezeichnung) = TRIM(OLD.artikel_bezeichnung))
+      ELSE letzte_bewegung END
+  WHERE artikel_bezeichnung = TRIM(OLD.artikel_bezeichnung);
+  DELETE FROM bestand WHERE artikel_bezeichnung = TRIM(OLD.artikel_bezeichnung) AND anzahl <= 0;
+  UPDATE bestand_pharmacode SET anzahl = anzahl - 1
+  WHERE artikel_bezeichnung = TRIM(OLD.artikel_bezeichnung) AND pharmacode = OLD.pharmacode;
+  DELETE FROM bestand_pharmacode
+  WHERE artikel_bezeichnung = TRIM(OLD.artikel_bezeichnung) AND pharmacode = OLD.pharmacode AND anzahl <= 0;
+"""
+_BESTAND_ADDIEREN = """
+  INSERT INTO bestand(artikel_bezeichnung, anzahl, total_eingang, total_ausgang, letzte_bewegung)
+  SELECT TRIM(NEW.artikel_bezeichnung), 1, COALESCE(NEW.eingang,0), COALESCE(NEW.ausgang,0), NEW.datum
+  WHERE NEW.artikel_bezeichnung IS NOT NULL AND TRIM(NEW.artikel_bezeichnung) <> ''
+  ON CONFLICT(artikel_bezeichnung) DO UPDATE SET
+    anzahl = anzahl + 1,
+    total_eingang = total_eingang + excluded.total_eingang,
+    total_ausgang = total_ausgang + excluded.total_ausgang,
+    letzte_bewegung = CASE WHEN letzte_bewegung IS NULL OR excluded.letzte_bewegung > letzte_bewegung
+      THEN excluded.letzte_bewegung ELSE letzte_bewegung END;
+  INSERT INTO bestand_pharmacode(artikel_bezeichnung, pharmacode, anzahl)
+  SELECT TRIM(NEW.artikel_bezeichnung), NEW.pharmacode, 1
+  WHERE NEW.artikel_bezeichnung IS NOT NULL AND TRIM(NEW.artikel_bezeichnung) <> '' AND NEW.pharmacode IS NOT NULL
+  ON CONFLICT(artikel_bezeichnung, pharmacode) DO UPDATE SET anzahl = anzahl + 1;
+"""
+
+def _m006_bestand(conn):
+    # Bestand pro Artikel per Trigger nachführen statt v_bestand über alle Bewegungen zu gruppieren
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bestand (
+      artikel_bezeichnung TEXT PRIMARY KEY,
+      anzahl INTEGER NOT NULL,
+      total_eingang INTEGER NOT NULL DEFAULT 0,
+      total_ausgang INTEGER NOT NULL DEFAULT 0,
+      letzte_bewegung TEXT
+    )
+    """)
+    # COUNT(DISTINCT pharmacode) / MIN(pharmacode) lassen sich nur mit Zählern pro Paar nachführen
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bestand_pharmacode (
+      artikel_bezeichnung TEXT NOT NULL,
+      pharmacode TEXT NOT NULL,
+      anzahl INTEGER NOT NULL,
+      PRIMARY KEY (artikel_bezeichnung, pharmacode)
+    ) WITHOUT ROWID
+    """)
+    # MAX(datum) nach Löschen der letzten Bewegung eines Artikels per Index nachschlagen
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_bewegungen_artikel_trim ON bewegungen(TRIM(artikel_bezeichnung), datum)")
+    for name, ereignis, body in (
+        ("trg_bewegungen_bestand_ins", "AFTER INSERT", _BESTAND_ADDIEREN),
+        ("trg_bewegungen_bestand_del", "AFTER DELETE", _BESTAND_ABZIEHEN),
+        ("trg_bewegungen_bestand_upd",
+         "AFTER UPDATE OF artikel_bezeichnung, pharmacode, datum, eingang, ausgang",
+         _BESTAND_ABZIEHEN + _BESTAND_ADDIEREN),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {ereignis} ON bewegungen BEGIN {body} END")
+    conn.execute("""
+    INSERT INTO bestand(artikel_bezeichnung, anzahl, total_eingang, total_ausgang, letzte_bewegung)
+    SELECT TRIM(artikel_bezeichnung), COUNT(*), SUM(COALESCE(eingang,0)), SUM(COALESCE(ausgang,0)), MAX(datum)
+    FROM bewegungen
+    WHERE artikel_bezeichnung IS NOT NULL AND TRIM(artikel_bezeichnung) <> ''
+    GROUP BY TRIM(artikel_bezeichnung)
+    """)
+    conn.execute("""
+    INSERT INTO bestand_pharmacode(artikel_bezeichnung, pharmacode, anzahl)
+    SELECT TRIM(artikel_bezeichnung), pharmacode, COUNT(*)
+    FROM bewegungen
+    WHERE artikel_bezeichnung IS NOT NULL AND TRIM(artikel_bezeichnung) <> '' AND pharmacode IS NOT NULL
+    GROUP BY TRIM(artikel_bezeichnung), pharmacode
+    """)
+
+    conn.execute("DROP VIEW IF EXISTS v_bestand")
+    conn.execute("""
+    CREATE VIEW v_bestand AS
+    SELECT
+      b.artikel_bezeichnung,
+      (SELECT COUNT(*) FROM bestand_pharmacode p WHERE p.artikel_bezeichnung = b.artikel_bezeichnung) AS pharmacode_count,
+      (SELECT MIN(pharmacode) FROM bestand_pharmacode p WHERE p.artikel_bezeichnung = b.artikel_bezeichnung) AS sample_pharmacode,
+      b.letzte_bewegung,
+      b.total_eingang,
+      b.total_ausgang,
+      b.total_eingang - b.total_ausgang AS saldo
+    FROM bestand b
+    """)
+
+_M007_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+_M007_DE = re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{4}|\d{2})$")
+
+def _m007_iso(value) -> str | None:
+    # Eingefrorene Kopie von utils.datum.iso_datum() für Textwerte aus der DB
+    text = str(value).strip()
+    if match := _M007_ISO.match(text):
+        jahr, monat, tag = match.groups()
+    elif match := _M007_DE.match(text):
+        tag, monat, jahr = match.groups()
+        jahr = "20" + jahr if len(jahr) == 2 else jahr
+    else:
+        return None
+    try:
+        return date(int(jahr), int(monat), int(tag)).isoformat()
+    except ValueError:
+        return None
+
+def _m007_iso_datum(conn):
+    # Gemischte Formate (TT.MM.JJJJ aus Excel/PDF, ISO aus Formularen) → einheitlich ISO
+    alt = conn.execute(
+        f"SELECT id, datum, natural_key FROM bewegungen WHERE datum IS NOT NULL AND datum NOT GLOB '{ISO_GLOB}'"
+    ).fetchall()
+    datum_updates, key_updates, unlesbar = [], [], 0
+    for row_id, datum, natural_key in alt:
+        iso = _m007_iso(datum)
+        if iso is None and str(datum).strip():
+            unlesbar += 1  # bleibt unverändert stehen
+            continue
+        datum_updates.append((iso, row_id))
+        if natural_key:
+            # Datum steckt auch im Upsert-Schlüssel → sonst legt der nächste Import Duplikate an
+            teile = [(iso or "") if teil == datum else teil for teil in natural_key.split("|")]
+            key_updates.append(("|".join(teile), row_id))
+    conn.executemany("UPDATE bewegungen SET datum = ? WHERE id = ?", datum_updates)
+    conn.executemany("UPDATE OR IGNORE bewegungen SET natural_key = ? WHERE id = ?", key_updates)
+    if alt:
+        log_import(f"📅 {len(datum_updates)} Datumswerte nach ISO umgestellt, {unlesbar} unlesbar belassen")
+
+    # Ab jetzt nur noch ISO oder NULL schreiben
+    for name, ereignis in (
+        ("trg_bewegungen_datum_ins", "BEFORE INSERT"),
+        ("trg_bewegungen_datum_upd", "BEFORE UPDATE OF datum"),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"""
+        CREATE TRIGGER {name} {ereignis} ON bewegungen
+        WHEN NEW.datum IS NOT NULL AND NEW.datum NOT GLOB '{ISO_GLOB}'
+        BEGIN
+          SELECT RAISE(ABORT, 'bewegungen.datum muss ISO (JJJJ-MM-TT) sein');
+        END
+        """)
+    conn.execute("ANALYZE bewegungen")
+
+# Wie _BESTAND_ABZIEHEN/_BESTAND_ADDIEREN, aber über artikel_id (Migration 8)
+_BESTAND_ID_ABZIEHEN = """
+  UPDATE bestand SET
+    anzahl = anzahl - 1,
+    total_eingang = total_eingang - COALESCE(OLD.eingang,0),
+    total_ausgang = total_ausgang - COALESCE(OLD.ausgang,0),
+    letzte_bewegung = CASE WHEN OLD.datum IS letzte_bewegung
+      THEN (SELECT MAX(datum) FROM bewegungen WHERE artikel_id = OLD.artikel_id)
+      ELSE letzte_bewegung END
+  WHERE artikel_id = OLD.artikel_id;
+  DELETE FROM bestand WHERE artikel_id = OLD.artikel_id AND anzahl <= 0;
+  UPDATE bestand_pharmacode SET anzahl = anzahl - 1
+  WHERE artikel_id = OLD.artikel_id AND pharmacode = OLD.pharmacode;
+  DELETE FROM bestand_pharmacode
+  WHERE artikel_id = OLD.artikel_id AND pharmacode = OLD.pharmacode AND anzahl <= 0;
+"""
+_BESTAND_ID_ADDIEREN = """
+  INSERT INTO bestand(artikel_id, anzahl, total_eingang, total_ausgang, letzte_bewegung)
+  SELECT NEW.artikel_id, 1, COALESCE(NEW.eingang,0), COALESCE(NEW.ausgang,0), NEW.datum
+  WHERE NEW.artikel_id IS NOT NULL
+  ON CONFLICT(artikel_id) DO UPDATE SET
+    anzahl = anzahl + 1,
+    total_eingang = total_eingang + excluded.total_eingang,
+    total_ausgang = total_ausgang + excluded.total_ausgang,
+    letzte_bewegung = CASE WHEN letzte_bewegung IS NULL OR excluded.letzte_bewegung > letzte_bewegung
+      THEN excluded.letzte_bewegung ELSE letzte_bewegung END;
+  INSERT INTO bestand_pharmacode(artikel_id, pharmacode, anzahl)
+  SELECT NEW.artikel_id, NEW.pharmacode, 1
+  WHERE NEW.artikel_id IS NOT NULL AND NEW.pharmacode IS NOT NULL
+  ON CONFLICT(artikel_id, pharmacode) DO UPDATE SET anzahl = anzahl + 1;
+"""
+
+def _m008_artikel(conn):
+    # Artikel-Stammdaten; bewegungen verweist per Integer statt über den Bezeichnungstext
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS artikel (
+      id INTEGER PRIMARY KEY,
+      bezeichnung TEXT NOT NULL UNIQUE,
+      bezeichnung_norm TEXT NOT NULL,
+      pharmacode TEXT,
+      packungsgroesse INTEGER
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_artikel_norm ON artikel(bezeichnung_norm)")
+    if "artikel_id" not in _spalten(conn, "bewegungen"):
+        conn.execute("ALTER TABLE bewegungen ADD COLUMN artikel_id INTEGER REFERENCES artikel(id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_bewegungen_artikel_id ON bewegungen(artikel_id, datum)")
+
+    # Bestand neu über artikel_id: alte Trigger/Tabellen (Schlüssel TRIM(Text)) ersetzen
+    for name in ("trg_bewegungen_bestand_ins", "trg_bewegungen_bestand_del", "trg_bewegungen_bestand_upd"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute("DROP VIEW IF EXISTS v_bestand")
+    conn.execute("DROP TABLE IF EXISTS bestand")
+    conn.execute("DROP TABLE IF EXISTS bestand_pharmacode")
+    conn.execute("DROP INDEX IF EXISTS ix_bewegungen_artikel_trim")
+
+    # Artikel aus den Bezeichnungen anlegen und verknüpfen (wie utils.artikel zum Zeitpunkt
+    # von Migration 8: Schlüssel TRIM(Text), normalisiert klein mit einfachem Leerraum)
+    conn.create_function(
+        "m008_norm", 1, lambda text: re.sub(r"\s+", " ", str(text).lower()).strip(), deterministic=True
+    )
+    conn.execute("""
+    INSERT OR IGNORE INTO artikel(bezeichnung, bezeichnung_norm, pharmacode)
+    SELECT bezeichnung, m008_norm(bezeichnung), pharmacode
+    FROM (
+      -- Pharmacode der ersten Bewegung je Bezeichnung (Spalten zur MIN(id)-Zeile)
+      SELECT TRIM(artikel_bezeichnung) AS bezeichnung, CAST(pharmacode AS TEXT) AS pharmacode, MIN(id) AS erste
+      FROM bewegungen
+      WHERE TRIM(artikel_bezeichnung) <> ''
+      GROUP BY TRIM(artikel_bezeichnung)
+    )
+    ORDER BY erste
+    """)
+    conn.execute("""
+    UPDATE bewegungen SET artikel_id = (SELECT a.id FROM artikel a WHERE a.bezeichnung = TRIM(bewegungen.artikel_bezeichnung))
+    WHERE artikel_id IS NOT (SELECT a.id FROM artikel a WHERE a.bezeichnung = TRIM(bewegungen.artikel_bezeichnung))
+    """)
+
+    conn.execute("""
+    CREATE TABLE bestand (
+      artikel_id INTEGER PRIMARY KEY REFERENCES artikel(id),
+      anzahl INTEGER NOT NULL,
+      total_eingang INTEGER NOT NULL DEFAULT 0,
+      total_ausgang INTEGER NOT NULL DEFAULT 0,
+      letzte_bewegung TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE bestand_pharmacode (
+      artikel_id INTEGER NOT NULL,
+      pharmacode TEXT NOT NULL,
+      anzahl INTEGER NOT NULL,
+      PRIMARY KEY (artikel_id, pharmacode)
+    ) WITHOUT ROWID
+    """)
+    for name, ereignis, body in (
+        ("trg_bewegungen_bestand_ins", "AFTER INSERT", _BESTAND_ID_ADDIEREN),
+        ("trg_bewegungen_bestand_del", "AFTER DELETE", _BESTAND_ID_ABZIEHEN),
+        ("trg_bewegungen_bestand_upd",
+         "AFTER UPDATE OF artikel_id, pharmacode, datum, eingang, ausgang",
+         _BESTAND_ID_ABZIEHEN + _BESTAND_ID_ADDIEREN),
+    ):
+        conn.execute(f"CREATE TRIGGER {name} {ereignis} ON bewegungen BEGIN {body} END")
+    conn.execute("""
+    INSERT INTO bestand(artikel_id, anzahl, total_eingang, total_ausgang, letzte_bewegung)
+    SELECT artikel_id, COUNT(*), SUM(COALESCE(eingang,0)), SUM(COALESCE(ausgang,0)), MAX(datum)
+    FROM bewegungen WHERE artikel_id IS NOT NULL GROUP BY artikel_id
+    """)
+    conn.execute("""
+    INSERT INTO bestand_pharmacode(artikel_id, pharmacode, anzahl)
+    SELECT artikel_id, pharmacode, COUNT(*)
+    FROM bewegungen WHERE artikel_id IS NOT NULL AND pharmacode IS NOT NULL GROUP BY artikel_id, pharmacode
+    """)
+
+    conn.execute("""
+    CREATE VIEW v_bestand AS
+    SELECT
+      a.bezeichnung AS artikel_bezeichnung,
+      (SELECT COUNT(*) FROM bestand_pharmacode p WHERE p.artikel_id = b.artikel_id) AS pharmacode_count,
+      (SELECT MIN(pharmacode) FROM bestand_pharmacode p WHERE p.artikel_id = b.artikel_id) AS sample_pharmacode,
+      b.letzte_bewegung,
+      b.total_eingang,
+      b.total_ausgang,
+      b.total_eingang - b.total_ausgang AS saldo
+    FROM bestand b
+    JOIN artikel a ON a.id = b.artikel_id
+    """)
+    conn.execute("ANALYZE")
+
+def _m009_stichtage(conn):
+    # Monatsend-Stände pro Artikel für "Bestand per Stichtag"
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bestand_stichtag (
+      stichtag TEXT NOT NULL,
+      artikel_id INTEGER NOT NULL,
+      total_eingang INTEGER NOT NULL,
+      total_ausgang INTEGER NOT NULL,
+      letzte_bewegung TEXT,
+      PRIMARY KEY (stichtag, artikel_id)
+    ) WITHOUT ROWID
+    """)
+    # Rückdatierte Änderungen machen alle Stichtage ab ihrem Datum ungültig
+    abziehen = _BESTAND_ID_ABZIEHEN + "  DELETE FROM bestand_stichtag WHERE stichtag >= OLD.datum;\n"
+    addieren = _BESTAND_ID_ADDIEREN + "  DELETE FROM bestand_stichtag WHERE stichtag >= NEW.datum;\n"
+    for name, ereignis, body in (
+        ("trg_bewegungen_bestand_ins", "AFTER INSERT", addieren),
+        ("trg_bewegungen_bestand_del", "AFTER DELETE", abziehen),
+        ("trg_bewegungen_bestand_upd",
+         "AFTER UPDATE OF artikel_id, pharmacode, datum, eingang, ausgang",
+         abziehen + addieren),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {ereignis} ON bewegungen BEGIN {body} END")
+
+    # Erstbefüllung bis zum letzten abgeschlossenen Monat, set-basiert: Monatssummen pro
+    # Artikel, kumuliert über ein Raster Artikel × Monatsende (ab dem ersten Bewegungsmonat)
+    conn.execute(f"""
+    WITH RECURSIVE monate(stichtag) AS (
+      SELECT date(MIN(datum), 'start of month', '+1 month', '-1 day')
+      FROM bewegungen WHERE datum GLOB '{ISO_GLOB}'
+      UNION ALL
+      SELECT date(stichtag, '+1 day', '+1 month', '-1 day') FROM monate
+      WHERE date(stichtag, '+1 day', '+1 month', '-1 day') <= date('now', 'localtime', 'start of month', '-1 day')
+    ),
+    pro_monat AS (
+      SELECT artikel_id, date(datum, 'start of month', '+1 month', '-1 day') AS stichtag,
+             SUM(COALESCE(eingang,0)) AS e, SUM(COALESCE(ausgang,0)) AS a, MAX(datum) AS l
+      FROM bewegungen
+      WHERE artikel_id IS NOT NULL AND datum GLOB '{ISO_GLOB}'
+      GROUP BY 1, 2
+    ),
+    kumuliert AS (
+      SELECT m.stichtag, r.artikel_id,
+             SUM(COALESCE(p.e,0)) OVER w AS total_eingang,
+             SUM(COALESCE(p.a,0)) OVER w AS total_ausgang,
+             MAX(p.l) OVER w AS letzte_bewegung,
+             COUNT(p.artikel_id) OVER w AS bewegungsmonate
+      FROM (SELECT DISTINCT artikel_id FROM pro_monat) r
+      CROSS JOIN monate m
+      LEFT JOIN pro_monat p ON p.artikel_id = r.artikel_id AND p.stichtag = m.stichtag
+      WHERE m.stichtag <= date('now', 'localtime', 'start of month', '-1 day')
+      WINDOW w AS (PARTITION BY r.artikel_id ORDER BY m.stichtag)
+    )
+    INSERT INTO bestand_stichtag(stichtag, artikel_id, total_eingang, total_ausgang, letzte_bewegung)
+    SELECT stichtag, artikel_id, total_eingang, total_ausgang, letzte_bewegung
+    FROM kumuliert WHERE bewegungsmonate > 0
+    """)
+
+def _m010_volltext(conn):
+    # Trigramm-Volltextindex für "enthält"-Suchen (Medikament, Pharmacode, Name, Lieferant);
+    # external content → Text nur in bewegungen, der Index hält rowid = bewegungen.id
+    spalten = "artikel_bezeichnung, pharmacode, name, vorname, lieferant"
+    conn.execute(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS bewegungen_fts USING fts5(
+      {spalten}, content='bewegungen', content_rowid='id', tokenize='trigram'
+    )
+    """)
+    alt = ", ".join("OLD." + s for s in spalten.split(", "))
+    neu = ", ".join("NEW." + s for s in spalten.split(", "))
+    entfernen = f"INSERT INTO bewegungen_fts(bewegungen_fts, rowid, {spalten}) VALUES ('delete', OLD.id, {alt});"
+    einfuegen = f"INSERT INTO bewegungen_fts(rowid, {spalten}) VALUES (NEW.id, {neu});"
+    for name, ereignis, body in (
+        ("trg_bewegungen_fts_ins", "AFTER INSERT", einfuegen),
+        ("trg_bewegungen_fts_del", "AFTER DELETE", entfernen),
+        ("trg_bewegungen_fts_upd", f"AFTER UPDATE OF {spalten}", entfernen + " " + einfuegen),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {ereignis} ON bewegungen BEGIN {body} END")
+    conn.execute("INSERT INTO bewegungen_fts(bewegungen_fts) VALUES ('rebuild')")
+
+def _m011_stichtag_pro_artikel(conn):
+    # Rückdatierte Änderungen machen nur noch die Stichtage des betroffenen Artikels ungültig
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_bestand_stichtag_artikel ON bestand_stichtag(artikel_id, stichtag)")
+    abziehen = _BESTAND_ID_ABZIEHEN + (
+        "  DELETE FROM bestand_stichtag WHERE stichtag >= OLD.datum AND artikel_id = OLD.artikel_id;\n"
+    )
+    addieren = _BESTAND_ID_ADDIEREN + (
+        "  DELETE FROM bestand_stichtag WHERE stichtag >= NEW.datum AND artikel_id = NEW.artikel_id;\n"
+    )
+    for name, ereignis, body in (
+        ("trg_bewegungen_bestand_ins", "AFTER INSERT", addieren),
+        ("trg_bewegungen_bestand_del", "AFTER DELETE", abziehen),
+        ("trg_bewegungen_bestand_upd",
+         "AFTER UPDATE OF artikel_id, pharmacode, datum, eingang, ausgang",
+         abziehen + addieren),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {ereignis} ON bewegungen BEGIN {body} END")
+
+def _m012_packungsgroesse(conn):
+    # Migration 8 legte artikel.packungsgroesse nur an; nachtragen wie ArtikelLookup beim
+    # Import: erste Bewegung des Artikels mit ein_pack bzw. aus_pack ungleich 0
+    conn.execute("""
+    UPDATE artikel SET packungsgroesse = (
+      SELECT COALESCE(NULLIF(b.ein_pack, 0), NULLIF(b.aus_pack, 0))
+      FROM bewegungen b
+      WHERE b.artikel_id = artikel.id AND COALESCE(NULLIF(b.ein_pack, 0), NULLIF(b.aus_pack, 0)) IS NOT NULL
+      ORDER BY b.id LIMIT 1
+    )
+    WHERE packungsgroesse IS NULL
+    """)
+
+def _m013_stichtag_stand(conn):
+    # Frühester von den Triggern verworfener Stichtag und Stand der letzten Ergänzung:
+    # offene_stichtage() muss nach einem Import nicht mehr alle Artikel absuchen
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bestand_stichtag_stand (
+      id INTEGER PRIMARY KEY CHECK (id = 1),
+      offen_ab TEXT,
+      gefuellt_bis TEXT
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO bestand_stichtag_stand(id) VALUES (1)")
+    # Bewegungen ohne gültiges Datum stehen in keinem Stichtag; bestand_per() liest sie hierüber
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_bewegungen_undatiert ON bewegungen(artikel_id) "
+        f"WHERE datum IS NULL OR datum NOT GLOB '{ISO_GLOB}'"
+    )
+
+    def offen(zeile: str) -> str:
+        monatsende = f"date({zeile}.datum, 'start of month', '+1 month', '-1 day')"
+        return (
+            f"  UPDATE bestand_stichtag_stand SET offen_ab = {monatsende}\n"
+            f"  WHERE {zeile}.artikel_id IS NOT NULL AND {zeile}.datum GLOB '{ISO_GLOB}'\n"
+            f"    AND (offen_ab IS NULL OR offen_ab > {monatsende});\n"
+        )
+    abziehen = _BESTAND_ID_ABZIEHEN + (
+        "  DELETE FROM bestand_stichtag WHERE stichtag >= OLD.datum AND artikel_id = OLD.artikel_id;\n"
+    ) + offen("OLD")
+    addieren = _BESTAND_ID_ADDIEREN + (
+        "  DELETE FROM bestand_stichtag WHERE stichtag >= NEW.datum AND artikel_id = NEW.artikel_id;\n"
+    ) + offen("NEW")
+    for name, ereignis, body in (
+        ("trg_bewegungen_bestand_ins", "AFTER INSERT", addieren),
+        ("trg_bewegungen_bestand_del", "AFTER DELETE", abziehen),
+        ("trg_bewegungen_bestand_upd",
+         "AFTER UPDATE OF artikel_id, pharmacode, datum, eingang, ausgang",
+         abziehen + addieren),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {ereignis} ON bewegungen BEGIN {body} END")
+
+MIGRATIONS = [
+    (1, "Basisschema bewegungen", _m001_baseline),
+    (2, "Views v_bewegung, v_bestand", _m002_views),
+    (3, "natural_key + eindeutiger Index", _m003_natural_key),
+    (4, "import_runs", _m004_import_runs),
+    (5, "Indizes für Filter und Delta-Abgleich", _m005_query_indexes),
+    (6, "Materialisierter Bestand mit Triggern", _m006_bestand),
+    (7, "Datum einheitlich ISO + Prüf-Trigger", _m007_iso_datum),
+    (8, "Artikel-Stammdaten, artikel_id, Bestand pro Artikel-ID", _m008_artikel),
+    (9, "Monatsend-Stichtage des Bestands", _m009_stichtage),
+    (10, "Volltextindex bewegungen_fts (Trigramme)", _m010_volltext),
+    (11, "Stichtage nur für den geänderten Artikel verwerfen", _m011_stichtag_pro_artikel),
+    (12, "Packungsgrösse der Artikel aus den Bewegungen nachtragen", _m012_packungsgroesse),
+    (13, "Stand der Stichtage, Index für undatierte Bewegungen", _m013_stichtag_stand),
+]
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: sqlite3.Connection) -> list[int]:
+    """Offene Migrationen ausführen; gibt die ausgeführten Versionen zurück."""
+    ziel = MIGRATIONS[-1][0]
+    if schema_version(conn) >= ziel:
+        return []
+
+    isolation = conn.isolation_level
+    conn.isolation_level = None
+    ausgefuehrt = []
+    try:
+        for version, beschreibung, schritt in MIGRATIONS:
+            if schema_version(conn) >= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Nach dem Sperren erneut prüfen: ein anderer Prozess kann schneller gewesen sein
+                if schema_version(conn) >= version:
+                    conn.execute("ROLLBACK")
+                    continue
+                schritt(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            ausgefuehrt.append(version)
+            log_import(f"🧱 Migration {version} ausgeführt: {beschreibung}")
+    finally:
+        conn.isolation_level = isolation
+    return ausgefuehrt
@@ -0,0 +1,133 @@
+# utils/ocr.py
+"""
+OCR-Fallback für gescannte Berichte (Seiten ohne Textebene).
+
+Die Seite wird gerastert, mit OpenCV binarisiert und mit Tesseract gelesen.
+Das Ergebnis sind Wörter im Format von page.get_text("words") (PDF-Punkte),
+die anschliessend durch die words-Engine laufen. OCR-Ergebnisse werden nach
+dem Hash des Seitenbildes gecacht – ein erneuter Import derselben Scans
+braucht kein Tesseract mehr.
+"""
+import hashlib
+import os
+import time
+import fitz
+import numpy as np
+from utils.env import get_env_var
+from utils.logger import log_stage
+from utils.page_cache import PageCache
+
+try:
+    import pytesseract
+except ImportError:  # optional: ohne pytesseract kein OCR
+    pytesseract = None
+
+try:
+    import cv2
+except ImportError:  # optional: ohne OpenCV wird ohne Vorverarbeitung gelesen
+    cv2 = None
+
+OCR_CACHE_PATH = get_env_var("OCR_CACHE_PATH", "data/ocr_cache.db")
+# Bei Änderungen an Vorverarbeitung/Wortformat erhöhen
+OCR_CACHE_VERSION = 1
+
+_verfuegbar = None
+
+def ocr_enabled() -> bool:
+    return get_env_var("OCR", "1").strip().lower() not in ("0", "false", "no", "nein", "off")
+
+def ocr_available() -> bool:
+    """pytesseract installiert und Tesseract-Binary aufrufbar (einmal pro Prozess geprüft)."""
+    global _verfuegbar
+    if _verfuegbar is None:
+        _verfuegbar = False
+        if pytesseract is not None:
+            try:
+                pytesseract.get_tesseract_version()
+                _verfuegbar = True
+            except Exception as e:
+                log_stage("document", "⚠️ Tesseract nicht verfügbar: %s", e, level="warning")
+    return _verfuegbar
+
+def get_ocr_workers() -> int:
+    """Anzahl OCR-Prozesse aus OCR_WORKERS (Default: alle Kerne)."""
+    wert = get_env_var("OCR_WORKERS", "auto").strip().lower()
+    if wert == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(wert))
+    except ValueError:
+        return 1
+
+def ocr_settings() -> tuple[int, str, str]:
+    try:
+        dpi = int(get_env_var("OCR_DPI", "300"))
+    except ValueError:
+        dpi = 300
+    return dpi, get_env_var("OCR_LANG", "deu"), get_env_var("OCR_CONFIG", "--psm 6")
+
+def needs_ocr(page) -> bool:
+    """Seite ohne Schriften, aber mit Bildern → Scan ohne Textebene."""
+    return not page.get_fonts() and bool(page.get_images())
+
+def _preprocess(pix):
+    """Graustufen-Pixmap → numpy-Bild, mit OpenCV binarisiert (Otsu)."""
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    if cv2 is None:
+        return img
+    return cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+def _tesseract_words(img, dpi: int, lang: str, config: str) -> list[tuple]:
+    """image_to_data → Wörter (x0, y0, x1, y1, text, block, line, word) in PDF-Punkten."""
+    data = pytesseract.image_to_data(img, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+    scale = 72 / dpi
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if not text or float(data["conf"][i]) < 0:
+            continue
+        x, y, w, h = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
+        words.append((
+            x * scale, y * scale, (x + w) * scale, (y + h) * scale, text,
+            data["block_num"][i], data["line_num"][i], data["word_num"][i],
+        ))
+    return words
+
+def ocr_page(page) -> tuple[list[tuple], dict]:
+    """
+    OCR einer Seite. Gibt (words, timing) zurück;
+    timing = {"render", "ocr", "total"} in Sekunden plus "cache" (hit/miss).
+    """
+    start = time.perf_counter()
+    dpi, lang, config = ocr_settings()
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    render = time.perf_counter() - start
+
+    h = hashlib.sha256()
+    h.update(f"ocr-v{OCR_CACHE_VERSION}|{dpi}|{lang}|{config}|{pix.width}x{pix.height}".encode())
+    h.update(pix.samples)
+    fingerprint = h.hexdigest()
+
+    timing = {"render": render, "ocr": 0.0, "cache": "hit"}
+    with PageCache(OCR_CACHE_PATH) as cache:
+        words = cache.get(fingerprint)
+        if words is None:
+            timing["cache"] = "miss"
+            t = time.perf_counter()
+            words = _tesseract_words(_preprocess(pix), dpi, lang, config)
+            timing["ocr"] = time.perf_counter() - t
+            cache.put(fingerprint, words)
+    timing["total"] = time.perf_counter() - start
+    return words, timing
+
+def ocr_page_from_file(pdf_path: str, page_no: int) -> tuple[int, list[tuple], dict]:
+    """Worker: eigene fitz-Instanz öffnen und eine Seite per OCR lesen."""
+    with fitz.open(pdf_path) as doc:
+        words, timing = ocr_page(doc[page_no])
+    return page_no, words, timing
+
+def log_ocr_timing(page_no: int, words: list, timing: dict):
+    log_stage(
+        "document", "🔎 OCR Seite %d: %d Wörter | render %.2fs | ocr %.2fs | gesamt %.2fs | cache %s",
+        page_no + 1, len(words), timing["render"], timing["ocr"], timing["total"], timing["cache"]
+    )
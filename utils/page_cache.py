@@ -0,0 +1,126 @@
+# utils/page_cache.py
+import hashlib
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+from utils.env import get_env_var
+
+PAGE_CACHE_PATH = get_env_var("PAGE_CACHE_PATH", "data/page_cache.db")
+
+# Bei Änderungen an Tokenizer/Zeilenformat erhöhen → alte Einträge werden ignoriert
+PAGE_CACHE_VERSION = 3
+
+def page_cache_enabled() -> bool:
+    return get_env_var("PAGE_CACHE", "1").strip().lower() not in ("0", "false", "no", "nein", "off")
+
+def page_cache_max_bytes() -> int:
+    try:
+        return int(float(get_env_var("PAGE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+    except ValueError:
+        return 256 * 1024 * 1024
+
+def page_fingerprint(text: str, block_texts: list[str], *extra) -> str:
+    """Fingerprint einer Seite: Seitentext, Block-Texte und alles, was das Ergebnis sonst beeinflusst."""
+    h = hashlib.sha256()
+    h.update(f"v{PAGE_CACHE_VERSION}".encode())
+    for teil in extra:
+        h.update(b"\x1f")
+        h.update(str(teil).encode("utf-8"))
+    h.update(b"\x1d")
+    h.update(text.encode("utf-8", "surrogatepass"))
+    for block_text in block_texts:
+        h.update(b"\x1e")
+        h.update(block_text.encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+class PageCache:
+    """
+    Lokaler SQLite-Cache: Seiten-Fingerprint → geparste Zeilen (pickle, vom Extraktor
+    zusammen mit den auf der Seite gelernten Spalten abgelegt).
+    Schreibzugriffe werden gesammelt und mit flush() in einer Transaktion
+    geschrieben; danach wird nach last_used verdrängt, bis die Gesamtgrösse
+    unter max_bytes liegt.
+    """
+
+    def __init__(self, path: str = PAGE_CACHE_PATH, max_bytes: int | None = None):
+        self.path = path
+        self.max_bytes = page_cache_max_bytes() if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+        self._touched = set()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS page_cache (
+          fingerprint TEXT PRIMARY KEY,
+          rows BLOB NOT NULL,
+          size INTEGER NOT NULL,
+          last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_page_cache_last_used ON page_cache(last_used);
+        """)
+
+    def get(self, fingerprint: str):
+        data = self._pending.get(fingerprint)
+        if data is None:
+            row = self._conn.execute(
+                "SELECT rows FROM page_cache WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            data = row[0] if row else None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched.add(fingerprint)
+        return pickle.loads(data)
+
+    def put(self, fingerprint: str, rows):
+        # Schon hier serialisieren: flush() schreibt nur noch fertige Bytes (size = len(data))
+        self._pending[fingerprint] = pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def flush(self):
+        if not self._pending and not self._touched:
+            return
+        jetzt = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO page_cache (fingerprint, rows, size, last_used) VALUES (?, ?, ?, ?)",
+                [(fp, data, len(data), jetzt) for fp, data in self._pending.items()]
+            )
+            self._conn.executemany(
+                "UPDATE page_cache SET last_used = ? WHERE fingerprint = ?",
+                [(jetzt, fp) for fp in self._touched - self._pending.keys()]
+            )
+            self._evict()
+        self._pending.clear()
+        self._touched.clear()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Neueste Einträge behalten, bis 90 % von max_bytes erreicht sind
+        self._conn.execute("""
+            DELETE FROM page_cache WHERE fingerprint IN (
+              SELECT fingerprint FROM (
+                SELECT fingerprint, SUM(size) OVER (ORDER BY last_used DESC, fingerprint) AS kumuliert
+                FROM page_cache
+              ) WHERE kumuliert > ?
+            )
+        """, (int(self.max_bytes * 0.9),))
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
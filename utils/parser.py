@@ -1,6 +1,12 @@
+import numpy as np
 import pandas as pd
 import re
+from itertools import islice
+from utils.datum import iso_datum_series
+from utils.env import get_env_var
 from utils.helpers import detect_bewegung_from_structured_tokens
+from utils.layouts import get_layout, detect_layout
+from utils.rows import BewegungsZeile
 
 def is_valid_token(t):
     t_clean = t.strip()
@@ -14,42 +20,73 @@ def safe_int(value):
         return int(value)
     except (ValueError, TypeError):
         return None
-def parse_pdf_to_dataframe_dynamic_layout(rows_with_meta):
-    parsed_rows = []
-
-    for row_dict, meta, layout, dirty_reason in rows_with_meta:
-        tokens_raw = row_dict["tokens"]
-        artikel_bezeichnung = meta.get("artikel_bezeichnung", "Unbekannt")
-        belegnummer = meta.get("belegnummer", "Unbekannt")
-        packungsgroesse = meta.get("packungsgroesse", 0)
-
-        # Bewegungstokens = letzte 5/4 Slots
-        movement_slots = 5 if layout == "a" else 4
-        bewegung_tokens = tokens_raw[-movement_slots:]
-
-        # Ein/Aus-Mengen & BG Rez.Nr. extrahieren
-        ein_mge, aus_mge, bg_rez_nr, dirty_bewegung = detect_bewegung_from_structured_tokens(bewegung_tokens, layout)
-
-        # Name & Bewegung nochmals prüfen
-        name, bewegungstokens, dirty_name = split_name_and_bewegung(tokens_raw, layout)
-
-        dirty = dirty_reason or dirty_bewegung or dirty_name
-
-        row_dict.update({
-            "ein_mge": ein_mge,
-            "aus_mge": aus_mge,
-            "bg_rez_nr": bg_rez_nr,
-            "dirty": 1 if dirty else 0,
-            "dirty_reason": dirty,
-            "artikel_bezeichnung": artikel_bezeichnung,
-            "belegnummer": belegnummer,
-            "liste": layout
-        })
-
-        parsed_rows.append(row_dict)
-
-    df = pd.DataFrame(parsed_rows)
-    return df
+# Spalten des Ergebnisses (artikel wird in artikel_bezeichnung/belegnummer aufgelöst)
+PARSED_COLUMNS = [
+    "lfdnr", "datum", "name", "vorname", "lieferant",
+    "ein_mge", "aus_mge", "ein_pack", "aus_pack", "bg_rez_nr",
+    "artikel_bezeichnung", "belegnummer", "tokens", "liste", "dirty", "quelle",
+]
+_INT_COLUMNS = ("ein_mge", "aus_mge", "ein_pack", "aus_pack", "dirty")
+
+def keep_tokens_default() -> bool:
+    """PARSE_KEEP_TOKENS=0 → Roh-Tokens nach dem Parsen verwerfen (spart Speicher bei grossen Importen)."""
+    return get_env_var("PARSE_KEEP_TOKENS", "1").strip().lower() not in ("0", "false", "no", "nein", "off")
+
+def parse_pdf_to_dataframe_dynamic_layout(rows, keep_tokens: bool | None = None):
+    """
+    Baut aus den BewegungsZeilen des Extraktors spaltenweise ein DataFrame.
+    Die Bewegung (ein/aus/bg_rez_nr) stammt unverändert aus dem Extraktor;
+    dirty wird einmal vektorisiert bestimmt, dirty_reason nennt die Gründe
+    (kommagetrennt, leer bei sauberen Zeilen):
+      - extraktor:   dirty laut Extraktor (Bewegung nicht erkennbar)
+      - ein_und_aus: Ein und Aus gleichzeitig
+      - ohne_name:   keine Kopf-/Namens-Tokens vor den Bewegungsslots
+    Mit keep_tokens=False fehlt die Spalte tokens im Ergebnis.
+    """
+    if keep_tokens is None:
+        keep_tokens = keep_tokens_default()
+    rows = rows if isinstance(rows, list) else list(rows)
+    if not rows:
+        return pd.DataFrame()
+
+    df = pd.DataFrame.from_records(rows, columns=BewegungsZeile._fields)
+    for col in _INT_COLUMNS:
+        df[col] = df[col].astype("int64")
+
+    # Artikel: wenige geteilte ArtikelMeta-Objekte → einmal pro Artikel auflösen
+    codes, artikel = pd.factorize(df.pop("artikel"))
+    df["artikel_bezeichnung"] = np.array([a.artikel_bezeichnung for a in artikel], dtype=object)[codes]
+    df["belegnummer"] = np.array([a.belegnummer for a in artikel], dtype=object)[codes]
+    df["datum"] = iso_datum_series(df["datum"])  # Bericht: TT.MM.JJJJ, DB: ISO
+
+    movement_slots = df["liste"].map(lambda name: get_layout(name).movement_slots)
+    token_count = df["tokens"].map(len)
+    gruende = {
+        "extraktor": df["dirty"] > 0,
+        "ein_und_aus": (df["ein_mge"] > 0) & (df["aus_mge"] > 0),
+        "ohne_name": token_count <= movement_slots,
+    }
+    dirty = np.logical_or.reduce(list(gruende.values()))
+    df["dirty"] = dirty.astype("int64")
+    reason = pd.Series("", index=df.index, dtype=object)
+    for grund, maske in gruende.items():
+        reason = reason + np.where(maske, grund + ",", "")
+    df["dirty_reason"] = reason.str.rstrip(",")
+
+    columns = [c for c in PARSED_COLUMNS if keep_tokens or c != "tokens"] + ["dirty_reason"]
+    return df[columns]
+
+def iter_parsed_batches(rows_with_meta, batch_size: int = 500, keep_tokens: bool | None = None):
+    """
+    Streaming-Variante: nimmt einen (beliebig langen) Zeilen-Iterator entgegen und
+    liefert DataFrames mit höchstens batch_size Zeilen.
+    """
+    rows_iter = iter(rows_with_meta)
+    while True:
+        batch = list(islice(rows_iter, batch_size))
+        if not batch:
+            return
+        yield parse_pdf_to_dataframe_dynamic_layout(batch, keep_tokens)
 
 def split_name_and_bewegung(tokens: list[str], layout: str) -> tuple[str, list[str], bool]:
     """
@@ -57,7 +94,7 @@ def split_name_and_bewegung(tokens: list[str], layout: str) -> tuple[str, list[s
     Entfernt Arztnummern (z. B. Z031031) aus dem Namensteil.
     Nur gültig, wenn die letzten 5 (a) bzw. 4 (b) Tokens numerisch oder leer (\n etc.) sind.
     """
-    bewegung_len = 5 if layout == "a" else 4
+    bewegung_len = get_layout(layout).movement_slots
 
     if len(tokens) < bewegung_len:
         return ("", [], True)
@@ -76,4 +113,4 @@ def split_name_and_bewegung(tokens: list[str], layout: str) -> tuple[str, list[s
     return (name_str, bewegung_tokens, False)
 
 def detect_layout_from_page(page):
-    return "a" if "BG Rez.Nr." in page.get_text("text") else "b"
\ No newline at end of file
+    return detect_layout(page.get_text("text")).name
\ No newline at end of file
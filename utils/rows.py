@@ -0,0 +1,191 @@
+# utils/rows.py
+import re
+from typing import NamedTuple
+from utils.lieferanten import NamensMatcher
+from utils.layouts import DocumentLayouts, detect_layout, get_layout
+from utils.logger import log_stage, stage_enabled
+from utils.helpers import (
+    detect_bewegung_from_structured_tokens,
+    normalize,
+    slot_preserving_tokenizer_fixed,
+    clean_tokens_layout_a,
+    clean_trailing_empty_tokens,
+    extract_article_info
+)
+
+class ArtikelMeta(NamedTuple):
+    artikel_bezeichnung: str
+    belegnummer: str
+    packungsgroesse: int
+
+class BewegungsZeile(NamedTuple):
+    """
+    Eine extrahierte Bewegungszeile. Kompakt als Tuple statt Dict;
+    artikel ist pro Seite ein einziges ArtikelMeta, auf das alle Zeilen der Seite verweisen.
+    """
+    lfdnr: str
+    datum: str
+    name: str
+    vorname: str
+    lieferant: str
+    ein_mge: int
+    aus_mge: int
+    ein_pack: int
+    aus_pack: int
+    bg_rez_nr: str
+    artikel: ArtikelMeta
+    tokens: tuple
+    liste: str
+    dirty: int
+    quelle: str = "pdf"
+    engine: str = "blocks"
+
+KEIN_ARTIKEL = ArtikelMeta("", "", 1)
+
+def page_meta_from_text(text: str, layouts: DocumentLayouts | None = None) -> tuple[str, ArtikelMeta]:
+    """Layout (a/b/…) und Artikel-Metadaten aus dem Seitentext; layouts = Cache des Dokuments."""
+    layout = (layouts.detect(text) if layouts is not None else detect_layout(text)).name
+
+    # Artikel-Metadaten extrahieren (einmal pro Seite, von allen Zeilen referenziert)
+    artikel = KEIN_ARTIKEL
+    for line in text.splitlines():
+        if re.search(r"(?i)^medikament:", line):
+            meta = extract_article_info(line)
+            artikel = ArtikelMeta(meta["artikel_bezeichnung"], meta["belegnummer"], meta["packungsgroesse"])
+            break
+    return layout, artikel
+
+def rows_from_page_text(text: str, block_texts: list[str], lieferanten: NamensMatcher, layouts: DocumentLayouts | None = None) -> list:
+    """Tokenisiert eine Seite (Seitentext + Block-Texte) zu Bewegungszeilen."""
+    all_rows = []
+
+    token_trace = stage_enabled("token")
+
+    layout, artikel = page_meta_from_text(text, layouts)
+    template = get_layout(layout)
+    # Layouts mit BG Rez.Nr.: Bewegung endet bei der BG Rez.Nr. (ein, aus, lager, bg_rez_nr)
+    bg_slots = template.bg_rez_slot + 1 if template.bg_rez_slot is not None else None
+
+    for block_text in block_texts:
+        block_text = block_text.strip()
+        rows = re.split(r"(?=\d{5,}\s+\d{2}\.\d{2}\.\d{4})", block_text)
+        for zeile in rows:
+            zeile = zeile.strip()
+            if not re.match(r"^\d{5,}\s+\d{2}\.\d{2}\.\d{4}", zeile):
+                continue
+
+            tokens_raw = slot_preserving_tokenizer_fixed(zeile, layout)
+            tokens = clean_tokens_layout_a(tokens_raw) if bg_slots else clean_trailing_empty_tokens(tokens_raw, template.expected_len)
+
+            if len(tokens) < 2:
+                continue
+
+            if bg_slots:
+                # Ab letzter Stelle rückwärts: so lange leere Tokens entfernen, bis bg_rez_nr erkennbar ist
+                tokens_cleaned = list(tokens)
+                while tokens_cleaned and tokens_cleaned[-1] == "":
+                    tokens_cleaned.pop()
+
+                if len(tokens_cleaned) < bg_slots:
+                    log_stage("row", "❌ Zu wenige Tokens für Layout %s nach Bereinigung: %s", layout.upper(), tokens_cleaned, level="warning")
+                    continue
+
+                bewegung_tokens = tokens_cleaned[-bg_slots:]  # ['ein', 'aus', 'lager', 'bg_rez_nr']
+                kopf_tokens = tokens[:len(tokens_cleaned) - bg_slots]
+
+            else:
+                bewegung_tokens = tokens[-template.movement_slots:]  # ['ein', 'aus', 'lager', '']
+                kopf_tokens = tokens[:-template.movement_slots]
+
+            all_rows.append(build_row(kopf_tokens, bewegung_tokens, tokens, layout, artikel, lieferanten, token_trace))
+
+    return all_rows
+
+def build_row(
+    kopf_tokens: list[str],
+    bewegung_tokens: list[str],
+    tokens: list[str],
+    layout: str,
+    artikel: ArtikelMeta,
+    lieferanten: NamensMatcher,
+    token_trace: bool,
+    bewegung: tuple | None = None,
+    engine: str = "blocks",
+) -> BewegungsZeile:
+    """
+    Baut aus Kopf- und Bewegungstokens eine BewegungsZeile.
+    bewegung = (ein_mge, aus_mge, bg_rez_nr, dirty) überspringt die Bewegungserkennung,
+    wenn die Engine die Werte schon spaltengenau kennt.
+    """
+    packungsgroesse = artikel.packungsgroesse
+
+    # Basisdaten
+    lfdnr = kopf_tokens[0] if len(kopf_tokens) > 0 else ""
+    datum = kopf_tokens[1] if len(kopf_tokens) > 1 else ""
+    kundennr = kopf_tokens[2] if len(kopf_tokens) > 2 and kopf_tokens[2].isdigit() else ""
+
+    lieferant = ""
+    for idx, token in enumerate(kopf_tokens):
+        if token_trace:
+            log_stage("token", "🔍 Kopf-Token %d: '%s' | Normalisiert: '%s'", idx, token, normalize(token))
+        if lieferanten.ist_normalisiert(token):
+            lieferant = token.strip()
+            log_stage("token", "✅ MATCH mit Lieferant: '%s'", lieferant)
+            break
+
+    # 🧠 Namensfelder nur extrahieren wenn kein Lieferant
+    name, vorname = "", ""
+    if not lieferant:
+        name_tokens = kopf_tokens[3:] if kundennr else kopf_tokens[2:]
+        name_cleaned = []
+        for token in name_tokens:
+            if re.match(r"^[A-Z]\d{6,}$", token):  # Arztnummer z. B. Z031031
+                break
+            name_cleaned.append(token)
+        name_cleaned_str = " ".join(name_cleaned).strip()
+        name_parts = name_cleaned_str.split()
+        vorname = name_parts[0] if len(name_parts) > 1 else ""
+        nachname = name_parts[1] if len(name_parts) > 1 else (name_parts[0] if name_parts else "")
+        name = nachname if vorname else name_cleaned_str
+
+    if lieferant:
+        log_stage("row", "✅ Erkannt als Lieferant: '%s'", lieferant)
+    else:
+        log_stage("row", "❌ Kein Lieferant erkannt. Name: '%s'", name)
+
+    # Bewegung erkennen
+    if bewegung is not None:
+        ein_mge, aus_mge, bg_rez_nr, dirty = bewegung
+        if lieferant:
+            aus_mge, dirty = 0, False
+    else:
+        try:
+            ein_mge, aus_mge, bg_rez_nr, dirty = detect_bewegung_from_structured_tokens(
+                bewegung_tokens, layout, is_lieferant=bool(lieferant)
+            )
+        except Exception as e:
+            log_stage("row", "❌ Fehler Bewegung: %s → %s", bewegung_tokens, e, level="error")
+            ein_mge, aus_mge, bg_rez_nr, dirty = 0, 0, "", True
+    log_stage("row", "📦 Layout: %s | LfdNr: %s | Ein=%s | Aus=%s | Dirty=%s", layout, lfdnr, ein_mge, aus_mge, dirty)
+
+    ein_pack, aus_pack = 0, 0
+
+    if ein_mge > 0:
+        ein_pack = packungsgroesse
+        log_stage("row", "EIN: %s", packungsgroesse)
+    else:
+        ein_pack = 0
+
+    if aus_mge > 0:
+        aus_pack = packungsgroesse
+        log_stage("row", "AUS: %s", packungsgroesse)
+    else:
+        aus_pack = 0
+
+    row = BewegungsZeile(
+        lfdnr, datum, name, vorname, lieferant,
+        ein_mge, aus_mge, ein_pack, aus_pack, bg_rez_nr,
+        artikel, tuple(tokens), layout, 1 if dirty else 0, "pdf", engine,
+    )
+    log_stage("row", "➡️ Row to be saved: %s", row)
+    return row
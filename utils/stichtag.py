@@ -0,0 +1,20 @@
+# utils/stichtag.py
+"""
+Bestand per Stichtag für Dashboard und Export.
+
+Heute (oder ohne Datum): laufender Bestand aus v_bestand. Vergangene Tage:
+letzter Monatsend-Stichtag davor + Bewegungen seither (utils/bestand.py) –
+die Antwortzeit hängt nicht von der Länge der Historie ab. Nur lesend:
+fehlende Stichtage ergänzen die Importer; bis dahin rechnet bestand_per_sql()
+für die betroffenen Artikel ab ihrem letzten vorhandenen Stichtag.
+"""
+from datetime import date
+import pandas as pd
+from utils.bestand import bestand_per_sql
+from utils.db import read_sql
+
+def lade_bestand_per(stichtag: date | None = None, db_path: str | None = None) -> pd.DataFrame:
+    """Bestand pro Artikel am Ende von stichtag, negativer Saldo zuerst."""
+    if stichtag is None or stichtag >= date.today():
+        return read_sql("SELECT * FROM v_bestand ORDER BY saldo ASC", db_path=db_path)
+    return read_sql(bestand_per_sql() + " ORDER BY saldo ASC", {"stichtag": stichtag.isoformat()}, db_path)
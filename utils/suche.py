@@ -0,0 +1,44 @@
+# utils/suche.py
+"""
+Teilstring- und Präfixsuche in bewegungen über den Volltextindex
+bewegungen_fts (FTS5, Trigramme, Migration 10).
+
+Ab 3 Zeichen beantwortet der Index die Suche (MATCH auf eine Phrase,
+Gross/Klein egal, Präfix per ^); kürzere Suchtexte haben keine Trigramme
+und laufen als LIKE über den Index-Inhalt (Gross/Klein dort nur bei ASCII
+egal, "ü" findet also kein "Ü"). Ergebnis sind bewegungen.id –
+als Menge (suche_ids) oder als Teilabfrage für "id IN (…)" (suche_sql).
+"""
+import sqlite3
+from utils.db import get_read_connection
+
+SUCHSPALTEN = ("artikel_bezeichnung", "pharmacode", "name", "vorname", "lieferant")
+
+def _like_muster(text: str, anfang: bool) -> str:
+    text = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return ("" if anfang else "%") + text + "%"
+
+def suche_sql(text: str, spalte: str | None = None, anfang: bool = False) -> tuple[str, list]:
+    """
+    SELECT rowid FROM bewegungen_fts … für text in spalte (None = alle Suchspalten);
+    anfang=True → Wert beginnt mit text, sonst enthält ihn.
+    """
+    if spalte is not None and spalte not in SUCHSPALTEN:
+        raise ValueError(f"Keine Suchspalte: {spalte}")
+    if len(text) >= 3:
+        phrase = '"' + text.replace('"', '""') + '"'
+        ausdruck = ("^" if anfang else "") + phrase
+        if spalte is not None:
+            ausdruck = f"{{{spalte}}} : {ausdruck}"
+        return "SELECT rowid FROM bewegungen_fts WHERE bewegungen_fts MATCH ?", [ausdruck]
+    muster = _like_muster(text, anfang)
+    spalten = SUCHSPALTEN if spalte is None else (spalte,)
+    bedingung = " OR ".join(f"{s} LIKE ? ESCAPE '\\'" for s in spalten)
+    return f"SELECT rowid FROM bewegungen_fts WHERE {bedingung}", [muster] * len(spalten)
+
+def suche_ids(text: str, spalte: str | None = None, anfang: bool = False,
+              conn: sqlite3.Connection | None = None) -> set[int]:
+    """IDs aller Bewegungen, deren spalte text enthält (bzw. damit beginnt)."""
+    sql, params = suche_sql(text, spalte, anfang)
+    conn = conn or get_read_connection()
+    return {row[0] for row in conn.execute(sql, params)}
@@ -0,0 +1,123 @@
+# utils/upload_store.py
+import hashlib
+import os
+import pickle
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from utils.env import get_env_var
+from utils.db import get_read_connection, transaction
+
+# Content-adressierter Ablageort für Uploads: <sha256>.pdf + <sha256>.rows.v<N>.pkl
+UPLOAD_STORE_DIR = Path(get_env_var("UPLOAD_STORE_DIR", "upload/store"))
+
+# Zeilen pro pickle-Abschnitt im Zeilen-Cache (Streaming-Schreiben)
+ROWS_CACHE_CHUNK = 1000
+# Bei Änderungen am Zeilenformat (utils/rows.py) erhöhen → alte Zeilen-Caches werden ignoriert
+ROWS_CACHE_VERSION = 2
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def store_path(sha256: str) -> Path:
+    return UPLOAD_STORE_DIR / f"{sha256}.pdf"
+
+def rows_cache_path(sha256: str) -> Path:
+    return UPLOAD_STORE_DIR / f"{sha256}.rows.v{ROWS_CACHE_VERSION}.pkl"
+
+def store_upload(data: bytes, filename: str = "") -> tuple[str, Path]:
+    """Legt die Datei unter ihrem SHA-256 ab (nur falls noch nicht vorhanden)."""
+    sha256 = sha256_bytes(data)
+    path = store_path(sha256)
+    if not path.exists():
+        UPLOAD_STORE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return sha256, path
+
+# ---------- Zeilen-Cache ----------
+
+def has_cached_rows(sha256: str) -> bool:
+    return rows_cache_path(sha256).exists()
+
+def iter_cached_rows(sha256: str):
+    """Liest die gecachten Extraktor-Zeilen abschnittsweise zurück."""
+    with open(rows_cache_path(sha256), "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+def cache_rows(sha256: str, rows_iter):
+    """
+    Reicht die Zeilen unverändert durch und schreibt sie nebenbei in den Cache.
+    Die Cache-Datei wird erst nach vollständigem Durchlauf freigegeben.
+    """
+    UPLOAD_STORE_DIR.mkdir(parents=True, exist_ok=True)
+    path = rows_cache_path(sha256)
+    tmp = path.with_suffix(".tmp")
+    complete = False
+    try:
+        with open(tmp, "wb") as f:
+            chunk = []
+            for row in rows_iter:
+                chunk.append(row)
+                if len(chunk) >= ROWS_CACHE_CHUNK:
+                    pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    chunk = []
+                yield row
+            if chunk:
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        complete = True
+    finally:
+        if not complete and tmp.exists():
+            tmp.unlink()
+
+# ---------- import_runs ----------
+
+def find_import_run(sha256: str) -> dict | None:
+    """Letzter erfolgreicher Import dieser Datei oder None."""
+    cur = get_read_connection().execute(
+        "SELECT * FROM import_runs WHERE sha256 = ? AND status = 'ok' ORDER BY id DESC LIMIT 1",
+        (sha256,)
+    )
+    row = cur.fetchone()
+    return dict(zip([d[0] for d in cur.description], row)) if row else None
+
+def start_import_run(sha256: str, filename: str, forced: bool = False) -> int:
+    with transaction() as conn:
+        cur = conn.execute(
+            "INSERT INTO import_runs (sha256, filename, status, forced, started_at) VALUES (?, ?, 'running', ?, ?)",
+            (sha256, filename, 1 if forced else 0, datetime.now().isoformat(timespec="seconds"))
+        )
+        return cur.lastrowid
+
+def record_import_run(conn: sqlite3.Connection, sha256: str, filename: str, status: str, rows: int | None = None, forced: bool = False):
+    """Abgeschlossenen Lauf über eine bestehende Verbindung eintragen (ohne Commit)."""
+    jetzt = datetime.now().isoformat(timespec="seconds")
+    conn.execute(
+        "INSERT INTO import_runs (sha256, filename, status, rows, forced, started_at, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (sha256, filename, status, rows, 1 if forced else 0, jetzt, jetzt)
+    )
+
+def imported_hashes(conn: sqlite3.Connection) -> set[str]:
+    return {row[0] for row in conn.execute("SELECT DISTINCT sha256 FROM import_runs WHERE status = 'ok'")}
+
+def finish_import_run(run_id: int, status: str, rows: int | None = None):
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE import_runs SET status = ?, rows = ?, finished_at = ? WHERE id = ?",
+            (status, rows, datetime.now().isoformat(timespec="seconds"), run_id)
+        )
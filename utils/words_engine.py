@@ -0,0 +1,133 @@
+# utils/words_engine.py
+"""
+Extraktions-Engine "words": ein einziger get_text("words")-Durchlauf pro Seite.
+
+Wörter werden nach y zu Zeilen gruppiert; die Spaltengrenzen werden einmal pro
+Dokument und Layout aus der Kopfzeile gelernt (x-Position der Spaltentitel) und
+in DocumentLayouts abgelegt.
+Jedes Wort einer Datenzeile landet anhand seiner x-Position im passenden Slot –
+leere Zellen verschieben also keine Tokens mehr.
+"""
+import re
+from bisect import bisect_right
+from utils.layouts import DocumentLayouts, LayoutTemplate, get_layout
+from utils.lieferanten import NamensMatcher
+from utils.logger import log_stage, stage_enabled
+from utils.rows import build_row, page_meta_from_text, rows_from_page_text
+
+# Toleranz (pt): Zellen dürfen leicht links vom Spaltentitel beginnen
+COLUMN_TOLERANCE = 3.0
+
+DATENZEILE = re.compile(r"^\d{5,}$")
+DATUM = re.compile(r"^\d{2}\.\d{2}\.\d{4}$")
+
+def group_lines(words: list) -> list[list]:
+    """Gruppiert Wörter (x0, y0, x1, y1, text, ...) zu Zeilen, sortiert nach y und x."""
+    lines = []
+    current, current_y, current_h = [], None, 0.0
+    for w in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        y = (w[1] + w[3]) / 2
+        if current and abs(y - current_y) > max(current_h, w[3] - w[1]) / 2:
+            lines.append(sorted(current, key=lambda w: w[0]))
+            current = []
+        if not current:
+            current_y, current_h = y, w[3] - w[1]
+        current.append(w)
+    if current:
+        lines.append(sorted(current, key=lambda w: w[0]))
+    return lines
+
+def is_data_line(line: list) -> bool:
+    return len(line) >= 2 and DATENZEILE.match(line[0][4]) is not None and DATUM.match(line[1][4]) is not None
+
+def header_labels(line: list) -> list[tuple[float, str]]:
+    """Fasst nahe beieinander liegende Wörter zu Spaltentiteln zusammen → [(x0, titel)]."""
+    labels = []
+    for w in line:
+        hoehe = w[3] - w[1]
+        if labels and w[0] - labels[-1][2] < hoehe * 0.6:
+            x0, titel, _ = labels[-1]
+            labels[-1] = (x0, f"{titel} {w[4]}", w[2])
+        else:
+            labels.append((w[0], w[4], w[2]))
+    return [(x0, titel) for x0, titel, _ in labels]
+
+def line_cells(line: list) -> list[str]:
+    """Zellentexte einer Zeile (nahe Wörter verbunden) – wie die Zeilen eines PyMuPDF-Blocks."""
+    return [text for _, text in header_labels(line)]
+
+def learn_columns(lines: list[list], template: LayoutTemplate) -> tuple[float, ...] | None:
+    """Spaltenstarts aus der Kopfzeile direkt über der ersten Datenzeile."""
+    for i, line in enumerate(lines):
+        if not is_data_line(line):
+            continue
+        if i == 0:
+            return None
+        labels = header_labels(lines[i - 1])
+        if len(labels) != template.expected_len:
+            log_stage(
+                "document", "⚠️ Kopfzeile mit %d statt %d Spalten: %s",
+                len(labels), template.expected_len, [t for _, t in labels], level="debug"
+            )
+            return None
+        return tuple(x0 - COLUMN_TOLERANCE for x0, _ in labels)
+    return None
+
+def slots_from_line(line: list, starts: tuple[float, ...]) -> list[str]:
+    """Ordnet die Wörter einer Zeile per x0 den Spalten zu; mehrere Wörter pro Zelle werden verbunden."""
+    slots = [[] for _ in starts]
+    for w in line:
+        idx = max(0, bisect_right(starts, w[0]) - 1)
+        slots[idx].append(w[4])
+    return [" ".join(s) for s in slots]
+
+def detect_bewegung_from_slots(slots: list[str], template: LayoutTemplate) -> tuple[int, int, str, bool]:
+    """Ein/Aus/BG Rez.Nr. direkt aus den Spalten – kein Rückwärtssuchen über leere Tokens."""
+    def safe_int(val: str) -> int:
+        try:
+            return int(val.strip())
+        except ValueError:
+            return 0
+
+    bewegung = slots[-template.movement_slots:]
+    ein, aus = safe_int(bewegung[0]), safe_int(bewegung[1])
+    bg_rez_nr = bewegung[template.bg_rez_slot] if template.bg_rez_slot is not None else ""
+    return ein, aus, bg_rez_nr, ein > 0 and aus > 0
+
+def rows_from_page_words(words: list, lieferanten: NamensMatcher, layouts: DocumentLayouts) -> list:
+    """
+    Tokenisiert eine Seite aus get_text("words").
+    layouts: Layout- und Spalten-Cache, wird über alle Seiten eines Dokuments geteilt.
+    """
+    lines = group_lines(words)
+    text = "\n".join(" ".join(w[4] for w in line) for line in lines)
+    layout, artikel = page_meta_from_text(text, layouts)
+    template = get_layout(layout)
+
+    starts = layouts.columns.get(layout)
+    if starts is None:
+        starts = learn_columns(lines, template)
+        if starts is None:
+            # Ohne Kopfzeile: zeilenweise an die Block-Tokenisierung übergeben, eine Zelle pro Token
+            # (mehrteilige Namen bleiben zusammen, die Bewegungsspalten verrutschen nicht)
+            block_texts = ["\n".join(line_cells(line)) for line in lines if is_data_line(line)]
+            return rows_from_page_text(text, block_texts, lieferanten, layouts)
+        layouts.columns[layout] = starts
+        log_stage("document", "📐 Spalten gelernt (Layout %s): %s", layout, [round(x, 1) for x in starts])
+
+    token_trace = stage_enabled("token")
+    movement = template.movement_slots
+    all_rows = []
+    for line in lines:
+        if not is_data_line(line):
+            continue
+        tokens = slots_from_line(line, starts)
+        if token_trace:
+            log_stage("token", "🎉 Tokens WORDS: %s", tokens)
+        kopf_tokens = [t for t in tokens[:-movement] if t]
+        bewegung_tokens = tokens[-movement:]
+        all_rows.append(build_row(
+            kopf_tokens, bewegung_tokens, tokens, layout, artikel, lieferanten, token_trace,
+            bewegung=detect_bewegung_from_slots(tokens, template), engine="words"
+        ))
+    return all_rows